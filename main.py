@@ -1,12 +1,20 @@
+import sys
+
+# profiling needs to start before anything else is imported
+startup_profiler = None
+if "--profile-startup" in sys.argv:
+    from wlw.utils.profiler import StartupProfiler
+    startup_profiler = StartupProfiler()
+    startup_profiler.install()
+
 import curses
 import time
-import logging, sys, os, platform
-import random
+import logging, os, platform
 import re
 import math
 
 # the logger needs to be initialized before we load any other modules that require it
-from wlw.utils.logger import WLWLogger
+from wlw.utils.logger import WLWLogger, set_level
 logging.setLoggerClass(WLWLogger)
 log = logging.getLogger("WLWLogger")
 log: WLWLogger # getLogger wont expose our custom functions
@@ -15,16 +23,45 @@ from wlw.utils.renderer import Renderer
 from wlw.utils.manager import Manager
 from wlw.utils.errors import *
 from wlw.utils.chapter import ChapterThread
-from wlw.utils.battle import Battle, BattleCharacter
-from wlw.utils.discord import RichPresence
+from wlw.utils.script import ScriptChapter, ScriptRunner
+from wlw.utils.battle import Battle
+from wlw.utils.discord import RichPresence, PresenceWorker
 from wlw.utils.formatting import format_line, get_format_max_length, get_format_up_to, FormatType
-from wlw.packaging.package import load_package
 
-if len(sys.argv) > 1 and sys.argv[1] in ["--source", "-s"]:
-    log.debug("Loading chapter modules via '__init__.py'!")
-    from wlw.game import chapter_modules
-else:
-    chapter_modules = load_package("[n1h1raxem1l::4::eva]", "chp.pkg.wlw")
+if startup_profiler:
+    startup_profiler.mark("imports")
+
+def load_chapters(cache = None) -> list:
+    """
+    Load every chapter, either from source or from the chapter package.
+
+    Deferred until the player actually starts (or loads) a game, so the main menu shows up right away.
+
+    Args:
+        cache (WarmCache | None): The warm-start cache to use when loading from the chapter package.
+
+    Returns:
+        list: The chapters, sorted by their number.
+    """
+    if "--source" in sys.argv or "-s" in sys.argv:
+        log.debug("Loading chapter modules via '__init__.py'!")
+        from wlw.game import chapter_modules
+    else:
+        from wlw.packaging.package import load_package
+        chapter_modules = load_package("[n1h1raxem1l::4::eva]", "chp.pkg.wlw", cache)
+
+    return sorted(chapter_modules, key=lambda x: x.CHAPTER_NUMBER)
+
+def finish_startup_profile(path: str = "startup-profile.txt"):
+    """
+    Write the startup breakdown once the main menu is first shown, if `--profile-startup` was passed.
+    """
+    global startup_profiler
+    if startup_profiler:
+        startup_profiler.mark("first menu frame")
+        startup_profiler.write(path)
+        log.info("Wrote startup profile to '%s' (%.1f ms).", path, startup_profiler.elapsed*1000)
+        startup_profiler = None
 
 class WhatLurksWithin:
     def __init__(self, stdscr: curses.window):
@@ -36,12 +73,14 @@ class WhatLurksWithin:
         self.VERSION = "0.0.0"
         self.RPC_ID = "1333980355010629765"
         self.RPC_PING_INTERVAL = 15
-        self.RPC_LAST_PING = 0
 
-        self.renderer = Renderer(self.stdscr)
         self.manager = Manager(os.path.join(self.save_location, "save.dat"))
-        self.rpc = RichPresence(self.RPC_ID)
+        self.renderer = Renderer(self.stdscr, self.manager.checkpoint, self.manager.take_frame)
+        self.manager.subscribe(lambda event: log.event("state.changed", persistent=event.persistent, characters=event.characters, section=event.section))
+        self.rpc = PresenceWorker(RichPresence(self.RPC_ID), self.RPC_PING_INTERVAL)
         self.chapter_thread = None
+        self.chapter_runner = None
+        self.warm_cache = None
         self.h, self.w = stdscr.getmaxyx()
 
         self.TEXT_SPEED = 0.05
@@ -174,216 +213,125 @@ class WhatLurksWithin:
         Returns:
             int: The battle's result.
         """
-        battle_party = batt.allies+batt.foes
+        from wlw.utils.battle_scene import BattleScene # battles are rare, so this isn't imported at startup
+
+        battle_party = batt.party
+        scene = BattleScene(self.renderer, batt)
 
         acted = False
-        turn = 0
 
         user_input = ""
         user_select = 0
         command = ""
 
         mode = "command" # command, select, view
-        last_render = time.time()
 
-        display = None
-        display_padding_x = 5
-        display_padding_y = 2
+        try:
+            while True:
+                if acted:
+                    batt.next_turn()
+                    acted = False
 
-        while True:
-            if acted:
-                batt.next_turn()
-                turn += 1
-                acted = False
+                # height stuff
+                k = self.renderer.stdscr.getch()
+                self.h, self.w = stdscr.getmaxyx()
+                scene.resize(self.h, self.w)
 
-            # height stuff
-            k = self.renderer.stdscr.getch()
-            newh, neww = stdscr.getmaxyx()
-            if newh != self.h or neww != self.w:
-                self.renderer.stdscr.clear()
-            self.h, self.w = newh, neww
-            h_center = self.h//2
-            w_center = self.w//2
+                if all([not _.alive for _ in batt.allies]): # all allies down
+                    return 0
+                if all([not _.alive for _ in batt.foes]): # all foes down (yay!)
+                    return 1
 
-            if all([not _.alive for _ in batt.allies]): # all allies down
-                return 0
-            if all([not _.alive for _ in batt.foes]): # all foes down (yay!)
-                return 1
+                # only the parts of the scene that changed are redrawn
+                scene.selected = user_select
+                scene.status = f"COMMAND MODE >>> {user_input}" if mode == "command" else "VISUAL MODE ~~~"
+                scene.draw()
 
 
-            # render foes
-            box_number = len(batt.foes)
-            box_width = max([len(_.name) for _ in battle_party]) + 5 + len(str(len(battle_party))) # auto resize based on maximum name length
-            box_height = 10
-            box_offset = (self.w-(box_number*box_width))//(box_number+1)
-
-            draw_startx = box_offset
-            for i, foe in enumerate(batt.foes):
-                title = f"> {battle_party.index(foe)}:{foe.name} <" if foe == battle_party[batt.turn] else f"{battle_party.index(foe)}:{foe.name}"
-                color = self.renderer.color_red_black if foe == battle_party[user_select] else -1
-
-                draw_starty = 0
-
-                self.renderer.draw_box(draw_startx, draw_starty, draw_startx+box_width, draw_starty+box_height)
-                self.renderer.place_line((draw_startx+1)+(box_width//2)-(len(title)//2), draw_starty+1, title, color=color)
-                self.renderer.place_line((draw_startx+1), draw_starty+2, "─"*box_width)
-                self.renderer.place_line((draw_startx+1), draw_starty+3, f"HP:{foe.hitpoints}" if foe.hitpoints > 0 else "!DOWN!")
-                self.renderer.place_line((draw_startx+1), draw_starty+5, "─"*box_width)
-
-                for b, buff in enumerate(foe.buffs):
-                    self.renderer.place_line((draw_startx+1), draw_starty+6+b, f"{buff.name}:{buff.buff_length}T")
-                draw_startx += box_width+box_offset
-
-            # render midtext
-            message = f"TURN {turn+1} ({battle_party[batt.turn].name})"
-            self.renderer.stdscr.move(h_center-1, 0)
-            self.renderer.stdscr.clrtoeol()
-            self.renderer.place_line(w_center-len(message)//2, h_center-1, message)
-            # battle messages
-            message = f"{batt.get_display(time.time()-last_render)[0]}"
-            self.renderer.stdscr.move(h_center, 0)
-            self.renderer.stdscr.clrtoeol()
-            self.renderer.place_line(w_center-len(message)//2, h_center, message)
-
-            # render allies
-            box_number = len(batt.allies)
-            box_offset = (self.w-(box_number*box_width))//(box_number+1)
-
-            draw_startx = box_offset
-            for i, ally in enumerate(batt.allies):
-                title = f"> {battle_party.index(ally)}:{ally.name} <" if ally == battle_party[batt.turn] else f"{battle_party.index(ally)}:{ally.name}"
-                color = self.renderer.color_green_black if ally == battle_party[user_select] else -1
-
-                draw_starty = self.h-box_height-1
-                self.renderer.draw_box(draw_startx, draw_starty, draw_startx+box_width, draw_starty+box_height)
-                self.renderer.place_line((draw_startx+1)+(box_width//2)-(len(title)//2), draw_starty+1, title, color=color)
-                self.renderer.place_line((draw_startx+1), draw_starty+2, "─"*box_width)
-                self.renderer.place_line((draw_startx+1), draw_starty+3, f"HP:{ally.hitpoints}" if ally.hitpoints > 0 else "!DOWN!")
-                self.renderer.place_line((draw_startx+1), draw_starty+5, "─"*box_width)
-
-                for b, buff in enumerate(ally.buffs):
-                    self.renderer.place_line((draw_startx+1), draw_starty+6+b, f"{buff.name}:{buff.buff_length}T")
-                draw_startx += box_width+box_offset
-
-            # render visuals
-            if mode == "visual" and isinstance(display, BattleCharacter):
-                title_color = self.renderer.color_green_black if display in batt.allies else self.renderer.color_red_black
-                title = f"\"{display.name}\" ({battle_party.index(display)})"
-
-                self.renderer.draw_box(display_padding_x, display_padding_y, self.w-display_padding_x, self.h-display_padding_y)
-                self.renderer.place_line((self.w//2)-len(title)//2, display_padding_y+1, title, color=title_color) # title
-
-                self.renderer.place_line(display_padding_x+1, display_padding_y+3, "─"*(self.w-display_padding_x*2)) # line
-                stats_title = " STATS "
-                self.renderer.place_line((self.w//2)-(len(stats_title)//2), display_padding_y+3, stats_title)
-                self.renderer.place_line(display_padding_x+1, display_padding_y+4, f"HP:{display.hitpoints}") # HP
-
-                self.renderer.place_line(display_padding_x+1, display_padding_y+6, "─"*(self.w-display_padding_x*2)) # line
-                buff_title = " ACTIVE BUFFS "
-                self.renderer.place_line((self.w//2)-(len(buff_title)//2), display_padding_y+6, buff_title)
-                for i, buff in enumerate(display.buffs):
-                    self.renderer.place_line(display_padding_x+1, display_padding_y+7+i, f"{i} - {buff.name}:{buff.buff_length}T")
-
-                self.renderer.place_line(display_padding_x+1, display_padding_y+8+len(display.buffs), "─"*(self.w-display_padding_x*2)) # line
-                atk_title = " ATTACKS "
-                self.renderer.place_line((self.w//2)-(len(atk_title)//2), display_padding_y+8+len(display.buffs), atk_title)
-                for i, atk in enumerate(display.attacks):
-                    self.renderer.place_line(display_padding_x+1, display_padding_y+9+len(display.buffs)+i, f"{atk.name} ({atk.damage}/{atk.buff.name if atk.buff else "NONE"}): '{atk.description}'")
-
-            # render ui
-            if mode == "command":
-                self.renderer.place_line(0, self.h-1, f"COMMAND MODE >>> {user_input}")
-                self.renderer.stdscr.clrtoeol()
-            elif mode == "visual":
-                self.renderer.place_line(0, self.h-1, f"VISUAL MODE ~~~")
-                self.renderer.stdscr.clrtoeol()
-
-
-            # auto foe attacking stuff
-            if (battle_party[batt.turn] in batt.foes and battle_party[batt.turn].hitpoints > 0) and not batt.get_display()[1]:
-                atk_u = battle_party[batt.turn].attacks[random.randint(0, len(battle_party[batt.turn].attacks)-1)]
-                atk_w = random.choice([_ for _ in batt.allies if _.hitpoints > 0])
-
-                # print(f"CPU  ATK: {battle_party[batt.turn].name} -> {atk_w.name}, {atk_u.name}")
-
-                batt.attack(atk_w, battle_party[batt.turn], atk_u)
-                batt.set_display(f"'{battle_party[batt.turn].name} ({batt.turn})' uses '{atk_u.name}' on '{atk_w.name}'!", 2)
-
-                acted = True
-            elif battle_party[batt.turn] in batt.foes and not batt.get_display()[1]: # skip dead 
-                batt.set_display(f"'{battle_party[batt.turn].name} ({batt.turn})' skipped!", 1)
-                acted = True
-
-            # skip dead allies
-            if battle_party[batt.turn] in batt.allies and battle_party[batt.turn].hitpoints <= 0:
-                acted = True
-                continue
+                # auto foe attacking stuff
+                if (battle_party[batt.turn] in batt.foes and battle_party[batt.turn].hitpoints > 0) and not batt.get_display()[1] and (foe_choice := batt.foe_ai.choose(batt, battle_party[batt.turn])):
+                    atk_u, atk_w = foe_choice
 
-            # prevent user interaction on enemy turns
-            if battle_party[batt.turn] in batt.foes:
-                last_render = time.time()
-                time.sleep(0.05)
-                continue
+                    # print(f"CPU  ATK: {battle_party[batt.turn].name} -> {atk_w.name}, {atk_u.name}")
 
-            elif command == "view":
-                mode = "visual"
-                command = ""
-                display = battle_party[user_select]
-            elif command.startswith("attack "):
-                by = battle_party[batt.turn]
-                whom = battle_party[user_select]
+                    batt.attack(atk_w, battle_party[batt.turn], atk_u)
+                    batt.set_display(f"'{battle_party[batt.turn].name} ({batt.turn})' uses '{atk_u.name}' on '{atk_w.name}'!", 2)
 
-                if whom.hitpoints <= 0:
-                    batt.set_display(f"'{whom.name}' is already down!", 2)
-                    command = ""
-                    continue
+                    acted = True
+                elif battle_party[batt.turn] in batt.foes and not batt.get_display()[1]: # skip dead 
+                    batt.set_display(f"'{battle_party[batt.turn].name} ({batt.turn})' skipped!", 1)
+                    acted = True
 
-                try:
-                    attack = by.get_attack(command.split(" ")[1])
-                    batt.set_display(f"'{by.name} ({batt.turn})' uses '{attack.name}' on '{whom.name}'!", 2)
-                    
-                    batt.attack(whom, by, attack)
+                # skip dead allies
+                if battle_party[batt.turn] in batt.allies and battle_party[batt.turn].hitpoints <= 0:
                     acted = True
-                except ValueError:
-                    batt.set_display(f"No such attack '{command.split(" ")[1]}'!", 2)
-                except InvalidTargetError as e:
-                    batt.set_display(e, 3)
-                command = ""
-            elif command == "skip":
-                acted = True
-                command = ""
-
-            if k in [8, 127, curses.KEY_BACKSPACE]: # backspace (duh)
-                user_input = user_input[:len(user_input)-1]
-            elif k == curses.KEY_RIGHT:
-                user_select += 1
-                user_select %= len(battle_party)
-            elif k == curses.KEY_LEFT:
-                user_select -= 1
-                user_select %= len(battle_party)
-            elif k in [10, 13, curses.KEY_ENTER] and mode == "command":
-                command = user_input
-                user_input = ""
-                
-            elif 0 <= k <= 255:  # ASCII range
-                char = chr(k)
-                if char.isalpha() or char.isdigit() or char == " ":  # Check if it's an alphabetic character
-                    user_input = user_input + char
-                    k = -1
-                elif k == 27:  # ESC key
-                    self.renderer.stdscr.clear()
-                    if mode == "visual":
-                        mode = "command"
-                        user_input = ""
+                    continue
+
+                # prevent user interaction on enemy turns
+                if battle_party[batt.turn] in batt.foes:
+                    time.sleep(0.05)
+                    continue
+
+                elif command == "view":
+                    mode = "visual"
+                    command = ""
+                    scene.viewing = battle_party[user_select]
+                elif command.startswith("attack "):
+                    by = battle_party[batt.turn]
+                    whom = battle_party[user_select]
+
+                    if whom.hitpoints <= 0:
+                        batt.set_display(f"'{whom.name}' is already down!", 2)
                         command = ""
-                        display = None
+                        continue
+
+                    try:
+                        attack = by.get_attack(command.split(" ")[1])
+                        batt.set_display(f"'{by.name} ({batt.turn})' uses '{attack.name}' on '{whom.name}'!", 2)
+                        
+                        batt.attack(whom, by, attack)
+                        acted = True
+                    except ValueError:
+                        batt.set_display(f"No such attack '{command.split(" ")[1]}'!", 2)
+                    except InvalidTargetError as e:
+                        batt.set_display(e, 3)
+                    command = ""
+                elif command == "skip":
+                    acted = True
+                    command = ""
+
+                if k in [8, 127, curses.KEY_BACKSPACE]: # backspace (duh)
+                    user_input = user_input[:len(user_input)-1]
+                elif k == curses.KEY_RIGHT:
+                    user_select += 1
+                    user_select %= len(battle_party)
+                elif k == curses.KEY_LEFT:
+                    user_select -= 1
+                    user_select %= len(battle_party)
+                elif k in [10, 13, curses.KEY_ENTER] and mode == "command":
+                    command = user_input
+                    user_input = ""
+                    
+                elif 0 <= k <= 255:  # ASCII range
+                    char = chr(k)
+                    if char.isalpha() or char.isdigit() or char == " ":  # Check if it's an alphabetic character
+                        user_input = user_input + char
+                        k = -1
+                    elif k == 27:  # ESC key
+                        if mode == "visual":
+                            mode = "command"
+                            user_input = ""
+                            command = ""
+                            scene.viewing = None
+                        else:
+                            self.renderer.stdscr.clear()
+                            raise KeyboardInterrupt("ESC Pressed.")
                     else:
-                        raise KeyboardInterrupt("ESC Pressed.")
-                else:
-                    pass
+                        pass
 
-            last_render = time.time()
-            time.sleep(0.05)
+                time.sleep(0.05)
+        finally:
+            scene.close()
 
 
     def play_chapter(self, start):
@@ -394,41 +342,43 @@ class WhatLurksWithin:
 
         This is the heavy lifting function, as it handles the display of most
         features in the engine.
+
+        Args:
+            start (callable | ScriptRunner): The chapter section to start at. Script chapters are stepped on
+                the main thread, anything else is run on a chapter thread.
         """
 
         ###
         ## Quite an ugly function, with MANY loops due to the complexities with formatting. Pay attention to comments!
         ###
 
-        # chapters rely on blocking functions, so it needs to run in the background
-        log.info(f"Launching chapter {start.__module__} ({start.__name__})")
-        self.chapter_thread = ChapterThread(target=start, daemon=True, name=f"chapter-thread_{start.__module__.replace('.', '_')}")
-        self.chapter_thread.start()
+        runner = self.chapter_runner = start if isinstance(start, ScriptRunner) else None
+        chapter = runner.chapter if runner else start.__self__
+        self.manager.begin_rollback(chapter.title, runner.section if runner else start.__name__)
+
+        def launch(start):
+            # chapters rely on blocking functions, so it needs to run in the background
+            log.info(f"Launching chapter {start.__module__} ({start.__name__})")
+            self.chapter_thread = ChapterThread(target=start, daemon=True, name=f"chapter-thread_{start.__module__.replace('.', '_')}")
+            self.chapter_thread.start()
+
+        if runner:
+            log.info(f"Launching script chapter {runner.name}")
+            self.chapter_thread = None
+        else:
+            launch(start)
         last_char = time.time()
         temp_wait = 0
         user_read = False
         waiting_on_user = False
 
-        self.RPC_LAST_PING = time.time()
-
-        while self.chapter_thread.is_alive():
+        while runner.step() if runner else self.chapter_thread.is_alive():
             k = self.stdscr.getch()
             newh, neww = stdscr.getmaxyx()
             if newh != self.h or neww != self.w:
                 self.stdscr.clear()
             self.h, self.w = newh, neww
 
-            # rpc health check, we should try and re-establish the connection if it dies
-            if time.time() - self.RPC_LAST_PING > self.RPC_PING_INTERVAL:
-                self.RPC_LAST_PING = time.time()
-                if not self.rpc.is_ready and self.rpc.rpc_supported: # connection was broken
-                    log.debug("RPC connection was lost! Attempting to re-establish...")
-                    self.rpc._disconnect() # cleanup
-                    self.rpc._connect() # try to reconnect
-                    self.rpc._authenticate()
-                    self.rpc.reload_state()
-
-
             # user input
             # 'choice' input
             if k == curses.KEY_DOWN and self.renderer.choices:
@@ -443,18 +393,43 @@ class WhatLurksWithin:
             # normal input
             elif k in [curses.KEY_ENTER, 10]:
                 user_read = True
+            elif k == curses.KEY_F12: # toggle debug logging without restarting
+                set_level(logging.INFO if log.isEnabledFor(logging.DEBUG) else logging.DEBUG)
+                log.info("Log level is now %s.", logging.getLevelName(log.getEffectiveLevel()))
             elif k != -1 and chr(k) in ["h", "H"]:
                 self.stdscr.clear()
                 log.debug("Opening History.")
                 self.history()
                 log.debug("Returning to main Renderer.")
                 self.stdscr.clear()
+            elif k != -1 and chr(k) in ["r", "R"] and self.manager.can_rewind:
+                if self.chapter_thread: # stop the chapter wherever it's waiting, it's restarted from the section below
+                    self.manager.checkpoint.interrupt()
+                    try:
+                        self.chapter_thread.join()
+                    except ThreadError as e:
+                        if not isinstance(e.__cause__, ChapterInterrupt):
+                            raise
+                    finally:
+                        self.manager.checkpoint.clear_interrupt()
+
+                section = self.manager.rewind()
+                self.renderer.clear_choices()
+                self.current_choice = 0
+                temp_wait = 0
+                user_read = waiting_on_user = False
+                self.stdscr.clear()
+
+                if runner:
+                    runner = self.chapter_runner = chapter.runner(section)
+                else:
+                    launch(getattr(chapter, section))
 
             if self.renderer.battle:
                 self.stdscr.clear()
                 log.debug("Starting battle!")
                 out = self.battsys(self.renderer.battle)
-                log.debug(f"Battle ended with result: {out}")
+                log.debug("Battle ended with result: %s", out)
                 self.renderer.battle_result = out
                 self.stdscr.clear()
 
@@ -557,7 +532,7 @@ class WhatLurksWithin:
                     # self.renderer.place_line(0, 0, f"{char.name}: {char.saying[0][:char.saying[1]]}")
 
             # 'help' rendering
-            help_text = " <ENTER>: Continue, h: History "
+            help_text = " <ENTER>: Continue, h: History, r: Rollback "
             self.renderer.place_line(self.w-len(help_text)-2, self.h-2, help_text)
 
             user_read = False
@@ -588,7 +563,9 @@ class WhatLurksWithin:
             loading (bool): Whether to load from save.
 
         """
-        chapter_modules.sort(key=lambda x: x.CHAPTER_NUMBER)
+        from wlw.packaging.warm_cache import WarmCache
+        self.warm_cache = WarmCache(os.path.join(self.save_location, "warm.cache"))
+        chapter_modules = load_chapters(self.warm_cache)
 
         if loading:
             self.manager.load()
@@ -600,21 +577,25 @@ class WhatLurksWithin:
                 chapter_instance = chap.Main(self.manager, self.renderer)
                 section_name = self.manager.section["section"]
 
-                if hasattr(chapter_instance, section_name):
-                    # set the state while we still have access to these
-                    self.rpc.set_state(self.rpc.ActivityType.PLAYING, f"Chapter {chap.CHAPTER_NUMBER}: {chap.CHAPTER_TITLE}", "Continuing their story...", int(time.time()), "nihira_goober_1", "wlwlwlw")
-                    self.play_chapter(getattr(chapter_instance, section_name))
-                    loading = False
-                    continue
+                if isinstance(chapter_instance, ScriptChapter):
+                    section = chapter_instance.runner(section_name)
+                elif hasattr(chapter_instance, section_name):
+                    section = getattr(chapter_instance, section_name)
                 else:
                     raise SectionNotFoundError(f"Section '{section_name}' does not exist within chapter '{chap.CHAPTER_TITLE}'.")
+
+                # set the state while we still have access to these
+                self.rpc.set_state(self.rpc.ActivityType.PLAYING, f"Chapter {chap.CHAPTER_NUMBER}: {chap.CHAPTER_TITLE}", "Continuing their story...", int(time.time()), "nihira_goober_1", "wlwlwlw")
+                self.play_chapter(section)
+                loading = False
+                continue
             elif loading:
                 continue
 
             # print(f"Starting chapter: {chap.CHAPTER_TITLE} ({chap.CHAPTER_NUMBER})")
             chapter_instance = chap.Main(self.manager, self.renderer)
             self.rpc.set_state(self.rpc.ActivityType.PLAYING, f"Chapter {chap.CHAPTER_NUMBER}: {chap.CHAPTER_TITLE}", "Writing their story...", int(time.time()), "nihira_goober_1", "wlwlwlw")
-            self.play_chapter(chapter_instance.start)
+            self.play_chapter(chapter_instance.runner() if isinstance(chapter_instance, ScriptChapter) else chapter_instance.start)
 
 
 
@@ -628,7 +609,6 @@ class WhatLurksWithin:
                         {"title": "Quit", "id": "quit"}])
 
         while True:
-            time.sleep(0.05)
             k = stdscr.getch()
             newh, neww = stdscr.getmaxyx()
             if newh != self.h or neww != self.w:
@@ -667,6 +647,8 @@ class WhatLurksWithin:
                 return 2
 
             stdscr.refresh()
+            finish_startup_profile()
+            time.sleep(0.05)
 
 if __name__ == "__main__":
     log.info("Hello from WLW!")
@@ -679,16 +661,21 @@ if __name__ == "__main__":
 
     try:
         stdscr = curses.initscr()
+        if startup_profiler:
+            startup_profiler.mark("curses")
         game = WhatLurksWithin(stdscr)
+        if startup_profiler:
+            startup_profiler.mark("game init")
 
         log.info(f"WHAT LURKS WITHIN v{game.VERSION}")
         log.debug(f"Saving app data to: {game.save_location}.")
         log.debug(f"Saving config data to: {game.config_location}.")
         log.log_blank()
 
-        # spin up Rich Presence
-        game.rpc._connect()
-        game.rpc._authenticate()
+        # spin up Rich Presence, it connects (and reconnects) in the background
+        game.rpc.start()
+        if startup_profiler:
+            startup_profiler.mark("rich presence")
 
         log.debug("Entering main menu.")
         user_choice = game.main_menu()
@@ -708,10 +695,11 @@ if __name__ == "__main__":
 
     except KeyboardInterrupt: # user wants out, so we shouldn't wait on the chapter thread
         log.info("WLW exit via KeyboardInterrupt!")
-        pass
+        if (game.chapter_thread and game.chapter_thread.is_alive()) or (game.chapter_runner and not game.chapter_runner.finished):
+            game.manager.save() # keep the checkpoint, so the player can resume mid-section
     except Exception as e:
         curses.endwin()
-        game.rpc._disconnect()
+        game.rpc.stop()
         log.critical("WLW encountered an unrecoverable error!")
         log.error(e, exc_info=True)
 
@@ -721,5 +709,10 @@ if __name__ == "__main__":
         # raise e
 
     curses.endwin()
-    game.rpc._disconnect()
+    game.rpc.stop()
+    if game.warm_cache:
+        try:
+            game.warm_cache.save()
+        except OSError as e:
+            log.warning(f"Unable to write warm-start cache ({e}).")
     log.info("WLW exiting gracefully.")
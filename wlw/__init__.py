@@ -2,9 +2,22 @@
 Top-level package for What Lurks Within (WLW).
 
 Mainly used for context when importing modules.
-"""
 
-from .utils import *
-from .game import *
+Subpackages (and the names they export) are only imported once they're first used, so importing
+a single module doesn't pull in the entire game.
+"""
+import importlib
 
 __all__ = ["utils", "game"]
+
+def __getattr__(name: str):
+    if name in ["utils", "game", "packaging", "battle_sim", "fake_discord"]:
+        return importlib.import_module(f".{name}", __name__)
+
+    # names that used to be star-imported from utils and game
+    for package in ["utils", "game"]:
+        module = importlib.import_module(f".{package}", __name__)
+        if name in module.__all__:
+            return getattr(module, name)
+
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -0,0 +1,9 @@
+"""
+Battle simulation utility.
+
+Allows battles to be played headlessly, so encounters can be balanced without playing them by hand.
+"""
+
+from .simulator import BattleSimulator, SimulationResult, Policy, RandomPolicy, AggressivePolicy, valid_targets
+
+__all__ = ["BattleSimulator", "SimulationResult", "Policy", "RandomPolicy", "AggressivePolicy", "valid_targets"]
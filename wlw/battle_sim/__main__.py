@@ -0,0 +1,111 @@
+"""
+Battle simulation runner.
+
+Designed to be run as a standalone script, playing many seeded encounters across a process pool
+and reporting how they went.
+"""
+
+import argparse
+import importlib
+import statistics
+import time
+import concurrent.futures
+
+POLICIES = ["random", "aggressive", "greedy", "expectimax"]
+
+def load_encounter(spec: str):
+    """
+    Resolve a `module:function` encounter spec.
+    """
+    module_name, _, func_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+def make_policy(name: str):
+    from wlw.battle_sim.simulator import RandomPolicy, AggressivePolicy
+    from wlw.utils.battle_ai import GreedyAI, ExpectimaxAI
+
+    if name == "greedy":
+        return GreedyAI()
+    elif name == "expectimax": # no time budget, so results don't depend on how busy the machine is
+        return ExpectimaxAI(max_depth=2, time_budget=float("inf"))
+    return RandomPolicy() if name == "random" else AggressivePolicy()
+
+def simulate(encounter: str, seeds: range, ally_policy: str, foe_policy: str, max_turns: int, use_array: bool = False) -> list[tuple[int, int, dict]]:
+    """
+    Simulate one encounter per seed.
+
+    Run inside the process pool, so it has to be a module level function.
+    """
+    from wlw.battle_sim.simulator import BattleSimulator
+    from wlw.utils.battle_array import ArrayBattle
+
+    factory = load_encounter(encounter)
+    out = []
+
+    for seed in seeds:
+        battle = factory()
+        if use_array: # same characters, run on the array backed core instead
+            battle = ArrayBattle(battle.allies, battle.foes, foe_ai=battle.foe_ai)
+        battle.reseed(seed) # buffs and policies all draw from the battle's generators
+        result = BattleSimulator(battle, make_policy(ally_policy), make_policy(foe_policy), max_turns).run()
+        if use_array:
+            battle.release()
+        out.append((result.winner, result.turns, result.damage))
+
+    return out
+
+def report(results: list[tuple[int, int, dict]]):
+    """
+    Print the win rate, turn count distribution and damage per attack.
+    """
+    total = len(results)
+    wins = len([_ for _ in results if _[0] == 1])
+    draws = len([_ for _ in results if _[0] == -1])
+    turns = sorted([_[1] for _ in results])
+
+    print(f"Encounters: {total}")
+    print(f"Win rate: {wins/total:.1%} ({wins} won, {total-wins-draws} lost, {draws} hit the turn limit)")
+
+    print("Turns:")
+    print(f"  min {turns[0]}, mean {statistics.mean(turns):.1f}, median {statistics.median(turns)}, "
+          f"p90 {turns[min(total-1, int(total*0.9))]}, max {turns[-1]}")
+    width = max(1, (turns[-1]-turns[0]+10)//10) # ~10 buckets
+    for start in range(turns[0], turns[-1]+1, width):
+        count = len([_ for _ in turns if start <= _ < start+width])
+        print(f"  {start:>5}-{start+width-1:<5} {'#'*round(40*count/total)} {count}")
+
+    damage = {}
+    for _, _, dealt in results:
+        for attack, hits in dealt.items():
+            damage.setdefault(attack, []).extend(hits)
+
+    print("Damage per attack:")
+    for attack, hits in sorted(damage.items()):
+        print(f"  {attack}: {len(hits)} uses, mean {statistics.mean(hits):.2f}, min {min(hits)}, max {max(hits)}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate many seeded battles and report how they went.")
+    parser.add_argument("encounter", nargs="?", default="wlw.battle_sim.encounters:training", help="Encounter to simulate, as 'module:function'. The function must return a new Battle.")
+    parser.add_argument("-n", "--count", type=int, default=1000, help="How many encounters to simulate.")
+    parser.add_argument("-s", "--seed", type=int, default=0, help="Seed of the first encounter. Each encounter uses the next seed.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="How many processes to simulate with. Defaults to the CPU count.")
+    parser.add_argument("--allies", choices=POLICIES, default="random", help="Policy used by allies.")
+    parser.add_argument("--foes", choices=POLICIES, default="random", help="Policy used by foes.")
+    parser.add_argument("--max-turns", type=int, default=1000, help="Turns to play before calling an encounter a draw.")
+    parser.add_argument("--array", action="store_true", help="Simulate using the array backed battle core (ArrayBattle).")
+    args = parser.parse_args()
+
+    print(f"Simulating {args.count} encounters of '{args.encounter}'{' (array core)' if args.array else ''}...")
+
+    chunk = max(1, args.count // ((args.jobs or 8) * 4))
+    seeds = [range(start, min(start+chunk, args.seed+args.count)) for start in range(args.seed, args.seed+args.count, chunk)]
+    results = []
+
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for out in pool.map(simulate, *zip(*[(args.encounter, _, args.allies, args.foes, args.max_turns, args.array) for _ in seeds])):
+            results.extend(out)
+    elapsed = time.perf_counter() - start
+
+    report(results)
+    print(f"Simulated in {elapsed:.2f}s ({len(results)/elapsed:.0f} encounters/s)")
@@ -0,0 +1,29 @@
+"""
+Sample encounters for the battle simulator.
+
+Encounters are functions that return a fresh `Battle` each time they're called.
+"""
+from wlw.utils.battle import Battle, BattleCharacter, Attack, Target, EvadeBuff, WeakenedBuff, create_units
+
+def training() -> Battle:
+    """
+    A small squad against a group of drones.
+    """
+    commander = BattleCharacter("Commander", "f", hitpoints=30)
+    commander.set_attacks([
+        Attack("strike", "A quick strike.", 4),
+        Attack("expose", "Leaves the target open to attacks.", 1, buff=WeakenedBuff(2)),
+        Attack("cover", "Calls for cover fire.", 0, Target.A_ALLY, EvadeBuff(2))
+    ])
+    analyst = BattleCharacter("Analyst", "f", hitpoints=25)
+    analyst.set_attacks([
+        Attack("volley", "Fires at every foe.", 2, Target.A_FOE),
+        Attack("strike", "A quick strike.", 3)
+    ])
+
+    drones = create_units("Drone", "m", 12, [
+        Attack("zap", "A weak zap.", 2),
+        Attack("ram", "Rams into the target.", 3)
+    ], 4)
+
+    return Battle([commander, analyst], drones)
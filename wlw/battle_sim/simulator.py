@@ -0,0 +1,146 @@
+"""
+Headless battle simulation.
+
+Runs a `Battle` to completion without any rendering or waiting, using pluggable policies to pick
+each character's actions.
+"""
+import random
+from wlw.utils.battle import Battle, BattleCharacter, Attack
+
+class Policy:
+    """
+    Base class for all battle policies.
+
+    Policies decide what a character does on their turn.
+    """
+    def choose(self, battle: Battle, actor: BattleCharacter) -> tuple[Attack, BattleCharacter] | None:
+        """
+        Choose an attack and its target for `actor`.
+
+        Should be overridden by any child classes.
+
+        Args:
+            battle (Battle): The ongoing battle.
+            actor (BattleCharacter): The character whose turn it is.
+
+        Returns:
+            tuple[Attack, BattleCharacter] | None: The attack and its target, or None to skip the turn.
+        """
+        raise NotImplementedError(f"Policy '{self.__class__.__name__}' does not implement choose()!")
+
+class RandomPolicy(Policy):
+    """
+    Picks a random attack, then a random valid target for it.
+
+    Draws from the battle's decision generator (`ai_rng`) unless given its own.
+    """
+    def __init__(self, rng: random.Random = None):
+        self.rng = rng
+
+    def choose(self, battle, actor):
+        attacks = [_ for _ in actor.attacks if valid_targets(battle, actor, _)]
+        if not attacks:
+            return None
+
+        rng = self.rng if self.rng else battle.ai_rng
+        attack = rng.choice(attacks)
+        return attack, rng.choice(valid_targets(battle, actor, attack))
+
+class AggressivePolicy(Policy):
+    """
+    Uses the most damaging attack available on the living target with the least hitpoints.
+    """
+    def choose(self, battle, actor):
+        options = [(atk, whom) for atk in actor.attacks for whom in valid_targets(battle, actor, atk)]
+        if not options:
+            return None
+
+        return max(options, key=lambda _: (_[0].damage, -_[1].hitpoints))
+
+def valid_targets(battle: Battle, actor: BattleCharacter, attack: Attack) -> list[BattleCharacter]:
+    """
+    Get every living character `actor` can target using `attack`.
+
+    Args:
+        battle (Battle): The ongoing battle.
+        actor (BattleCharacter): The attacking character.
+        attack (Attack): The attack to use.
+
+    Returns:
+        list[BattleCharacter]: All valid targets.
+    """
+    return battle.valid_targets(actor, attack)
+
+class SimulationResult:
+    """
+    The outcome of a single simulated battle.
+    """
+    def __init__(self, winner: int, turns: int, damage: dict[str, list[int]], actions: list[tuple[int, int, int]] = None):
+        """
+        Args:
+            winner (int): 1 if the allies won, 0 if the foes won, -1 if the turn limit was reached.
+            turns (int): How many turns were played.
+            damage (dict[str, list[int]]): The total damage dealt by each use of each attack, by attack name.
+            actions (list[tuple[int, int, int]]): The battle's action log, see `Battle.actions`.
+        """
+        self.winner = winner
+        self.turns = turns
+        self.damage = damage
+        self.actions = actions if actions else []
+
+    def __repr__(self):
+        return f"<SimulationResult winner={self.winner} turns={self.turns}>"
+
+class BattleSimulator:
+    """
+    Runs a `Battle` to completion without rendering it.
+
+    Follows the same turn order as the game's battle system: characters act in party order
+    (allies, then foes), and downed characters skip their turn.
+    """
+    def __init__(self, battle: Battle, ally_policy: Policy, foe_policy: Policy, max_turns: int = 1000):
+        """
+        Args:
+            battle (Battle): The battle to simulate. Will be modified.
+            ally_policy (Policy): Decides what allies do.
+            foe_policy (Policy): Decides what foes do.
+            max_turns (int): How many turns to play before calling it a draw.
+        """
+        self.battle = battle
+        self.ally_policy = ally_policy
+        self.foe_policy = foe_policy
+        self.max_turns = max_turns
+
+    def run(self) -> SimulationResult:
+        """
+        Simulate the battle until either side is down, or the turn limit is reached.
+
+        Returns:
+            SimulationResult: The battle's outcome.
+        """
+        batt = self.battle
+        party = batt.party
+        damage = {}
+        turns = 0
+
+        while turns < self.max_turns:
+            if all([not _.alive for _ in batt.allies]): # all allies down
+                return SimulationResult(0, turns, damage, batt.actions)
+            if all([not _.alive for _ in batt.foes]): # all foes down
+                return SimulationResult(1, turns, damage, batt.actions)
+
+            actor = party[batt.turn]
+            if actor.alive:
+                policy = self.ally_policy if batt.team_of(actor) == 0 else self.foe_policy
+                action = policy.choose(batt, actor)
+
+                if action:
+                    attack, whom = action
+                    before = sum([_.hitpoints for _ in party])
+                    batt.attack(whom, actor, attack)
+                    damage.setdefault(attack.name, []).append(before - sum([_.hitpoints for _ in party]))
+
+            batt.next_turn()
+            turns += 1
+
+        return SimulationResult(-1, turns, damage, batt.actions)
@@ -0,0 +1,10 @@
+"""
+Chapter explorer utility.
+
+Plays every branch of a chapter headlessly, so routes can be checked for crashes and coverage without
+playing them by hand.
+"""
+
+from .explorer import Explorer, BranchResult, ExplorerManager, ExplorerRenderer, play_branch, state_key
+
+__all__ = ["Explorer", "BranchResult", "ExplorerManager", "ExplorerRenderer", "play_branch", "state_key"]
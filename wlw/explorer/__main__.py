@@ -0,0 +1,70 @@
+"""
+Chapter explorer runner.
+
+Designed to be run as a standalone script, exploring every branch of a chapter across a process pool
+and reporting coverage, crashes and how long each branch took.
+"""
+
+import argparse
+import importlib.util
+import statistics
+import sys
+
+def report(explorer, sections: list[str], choices: list[str]):
+    """
+    Print coverage, crashes and timings.
+    """
+    results = explorer.results
+    ended = [_ for _ in results if _.status == "end"]
+    crashes = explorer.crashes
+
+    print(f"Explored {len(results)} branches in {explorer.elapsed:.2f}s: {len(ended)} ended, {len(crashes)} crashed, "
+          f"{len(explorer.merged)} merged into an explored state, {len(explorer.truncated)} too deep.")
+
+    if sections:
+        visited = explorer.visited
+        print(f"Sections: {len([_ for _ in sections if _ in visited])}/{len(sections)} covered")
+        for section in sections:
+            if section not in visited:
+                print(f"  never entered: {section}")
+    if choices:
+        chosen = explorer.chosen
+        print(f"Choices: {len([_ for _ in choices if _ in chosen])}/{len(choices)} covered")
+        for choice in choices:
+            if choice not in chosen:
+                print(f"  never chosen: {choice}")
+
+    times = sorted(_.elapsed for _ in results)
+    print(f"Time per branch: min {times[0]*1000:.2f} ms, mean {statistics.mean(times)*1000:.2f} ms, max {times[-1]*1000:.2f} ms")
+    for result in sorted(results, key=lambda _: _.elapsed, reverse=True)[:5]:
+        print(f"  {result.elapsed*1000:8.2f} ms  {'/'.join(result.branch) or '(root)'} ({result.status})")
+
+    for result in crashes:
+        print(f"\nCrash in branch {'/'.join(result.branch) or '(root)'} (after {' -> '.join(result.visited)}):")
+        print(result.error.rstrip())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Explore every branch of a chapter headlessly.")
+    parser.add_argument("chapter", nargs="?", default="wlw.game.chp1", help="The chapter's module. Defaults to 'wlw.game.chp1'.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="How many processes to explore with. Defaults to the CPU count.")
+    parser.add_argument("--max-depth", type=int, default=64, help="The most choices a branch can make.")
+    args = parser.parse_args()
+
+    from wlw.explorer.explorer import Explorer
+    from wlw.story_graph.indexer import index_chapter
+
+    # the story graph knows every section and choice, so we know what wasn't covered
+    sections, choices = [], []
+    spec = importlib.util.find_spec(args.chapter)
+    source = spec.loader.get_source(args.chapter) if spec and hasattr(spec.loader, "get_source") else None
+    graph = index_chapter(args.chapter.split(".")[-1], source) if source else None
+    if graph:
+        sections = list(graph.sections)
+        choices = list(dict.fromkeys(choice for section in graph.sections.values() for choice in section.choices))
+
+    print(f"Exploring '{args.chapter}'...")
+    explorer = Explorer(args.chapter, args.jobs, args.max_depth)
+    explorer.run()
+    report(explorer, sections, choices)
+
+    sys.exit(1 if explorer.crashes else 0)
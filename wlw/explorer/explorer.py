@@ -0,0 +1,255 @@
+"""
+Chapter branch explorer.
+
+Plays chapters headlessly against a stub renderer and manager, following a fixed list of choices (a branch).
+Every line is fast-forwarded using the checkpoint's replay mode, so a branch only costs as much as running the
+chapter's logic. Once a branch runs out of choices, it stops at the next choice and reports the options, so each
+option can be explored as a branch of its own.
+"""
+import time
+import hashlib
+import importlib
+import traceback
+import concurrent.futures
+import logging
+from wlw.utils.manager import Manager
+from wlw.utils.logger import WLWLogger
+
+logging.setLoggerClass(WLWLogger)
+log = logging.getLogger("WLWLogger")
+log: WLWLogger
+
+REPLAY_ALL = {"line": float("inf"), "choices": []} # a checkpoint that never stops fast-forwarding
+BATTLE_OUTCOMES = ["battle:win", "battle:lose"]
+
+class _Fork(Exception):
+    """
+    Raised when a branch reaches a choice it has no answer for.
+
+    Carries the state it forked in, since anything unwinding past it (such as a script chapter's batch) may undo it.
+    """
+    def __init__(self, options: list[str], state: str = None):
+        super().__init__(options)
+        self.options = options
+        self.state = state
+
+class ExplorerManager(Manager):
+    """
+    Manager that never touches the disk, and remembers every section entered.
+    """
+    def __init__(self):
+        super().__init__("")
+        self.visited: list[str] = []
+
+    def set_section(self, chapter_title: str, section_name: str):
+        super().set_section(chapter_title, section_name)
+        self.visited.append(section_name)
+
+    def save(self):
+        pass
+
+    def load(self):
+        pass
+
+class ExplorerRenderer:
+    """
+    Renderer stand-in, answering choices and battles from a branch instead of the player.
+    """
+    def __init__(self, branch: list[str], manager: Manager = None):
+        """
+        Args:
+            branch (list[str]): The choice ids (or battle outcomes) to answer with, in order.
+            manager (Manager | None): The branch's manager, used to hash the state it forks in.
+        """
+        self.stdscr = None
+        self.manager = manager
+        self.checkpoint = None
+        self.branch = list(branch)
+        self.taken = 0
+
+        self.choices = []
+        self.battle = None
+        self.battle_result = -1
+
+    @property
+    def user_chose(self) -> str:
+        return ""
+
+    def set_choices(self, choices: list[dict]):
+        self.choices = choices
+
+    def clear_choices(self):
+        self.choices = []
+
+    def __answer(self, options: list[str]) -> str:
+        if self.taken >= len(self.branch):
+            raise _Fork(options, state_key(self.manager, options) if self.manager else None)
+
+        answer = self.branch[self.taken]
+        self.taken += 1
+        return answer
+
+    def poll_choice(self) -> str:
+        answer = self.__answer([_["id"] for _ in self.choices])
+        self.choices = []
+        return answer
+
+    wait_choice = poll_choice
+
+    def begin_battle(self, battle):
+        self.battle_result = 1 if self.__answer(BATTLE_OUTCOMES) == "battle:win" else 0
+        self.battle = None
+
+    def start_battle(self, battle):
+        self.begin_battle(battle)
+        return self.battle_result
+
+class BranchResult:
+    """
+    What happened when a single branch was played.
+    """
+    def __init__(self, branch: list[str], status: str, elapsed: float, visited: list[str], options: list[str] = None,
+                 state: str = None, error: str = None):
+        """
+        Args:
+            branch (list[str]): The choices the branch made.
+            status (str): 'end' if the chapter ended, 'fork' if it reached a new choice, or 'crash'.
+            elapsed (float): How long the branch took to play, in seconds.
+            visited (list[str]): Every section entered, in order.
+            options (list[str] | None): The new choice's options, if it forked.
+            state (str | None): Hash of the persistent data, section and options where it forked.
+            error (str | None): The traceback, if it crashed.
+        """
+        self.branch = branch
+        self.status = status
+        self.elapsed = elapsed
+        self.visited = visited
+        self.options = options or []
+        self.state = state
+        self.error = error
+
+    def __repr__(self):
+        return f"<BranchResult {'/'.join(self.branch) or '(root)'}: {self.status} ({self.elapsed*1000:.1f} ms)>"
+
+def state_key(manager: Manager, options: list[str]) -> str:
+    """
+    Hash the state a branch forked in. Branches that fork in the same state play out the same from there.
+
+    Args:
+        manager (Manager): The branch's manager.
+        options (list[str]): The options of the choice it forked at.
+
+    Returns:
+        str: The state's hash.
+    """
+    state = repr((sorted(manager.persistent.items(), key=repr), manager.section["section"], options))
+    return hashlib.sha256(state.encode("utf-8")).hexdigest()
+
+def play_branch(chapter: str, branch: list[str]) -> BranchResult:
+    """
+    Play a chapter from its start, making the choices in `branch`.
+
+    Run inside the explorer's process pool, so it has to be a module level function.
+
+    Args:
+        chapter (str): The chapter's module name, e.g. 'wlw.game.chp1'.
+        branch (list[str]): The choices to make.
+
+    Returns:
+        BranchResult: How the branch went.
+    """
+    manager = ExplorerManager()
+    manager.checkpoint.restore(REPLAY_ALL)
+    renderer = ExplorerRenderer(branch, manager)
+
+    start = time.perf_counter()
+    try:
+        instance = importlib.import_module(chapter).Main(manager, renderer)
+        manager.visited.append("start") # never saved, so never passed to set_section
+        instance.start()
+    except _Fork as fork:
+        return BranchResult(branch, "fork", time.perf_counter() - start, manager.visited, fork.options, fork.state)
+    except Exception:
+        return BranchResult(branch, "crash", time.perf_counter() - start, manager.visited, error=traceback.format_exc())
+
+    return BranchResult(branch, "end", time.perf_counter() - start, manager.visited)
+
+class Explorer:
+    """
+    Explorer class.
+
+    Explores every branch of a chapter across a process pool, starting with no choices made and forking at
+    every choice. Branches that fork in a state that was already explored are merged instead of explored again.
+    """
+    def __init__(self, chapter: str, jobs: int = None, max_depth: int = 64):
+        """
+        Args:
+            chapter (str): The chapter's module name, e.g. 'wlw.game.chp1'.
+            jobs (int | None): How many processes to explore with. Defaults to the CPU count.
+            max_depth (int): The most choices a branch can make before it stops being explored.
+        """
+        self.chapter = chapter
+        self.jobs = jobs
+        self.max_depth = max_depth
+
+        self.results: list[BranchResult] = []
+        self.merged: list[list[str]] = [] # branches skipped, since their state was already explored
+        self.truncated: list[list[str]] = [] # branches skipped for being too deep
+        self.elapsed = 0.0
+
+    def run(self) -> list[BranchResult]:
+        """
+        Explore every branch.
+
+        Returns:
+            list[BranchResult]: Every branch that was played.
+        """
+        seen = set()
+        start = time.perf_counter()
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs) as pool:
+            pending = {pool.submit(play_branch, self.chapter, [])}
+
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    result = future.result()
+                    self.results.append(result)
+                    if result.status != "fork":
+                        continue
+
+                    if result.state in seen:
+                        self.merged.append(result.branch)
+                        continue
+                    seen.add(result.state)
+
+                    for option in result.options:
+                        branch = [*result.branch, option]
+                        if len(branch) > self.max_depth:
+                            self.truncated.append(branch)
+                        else:
+                            pending.add(pool.submit(play_branch, self.chapter, branch))
+
+        self.elapsed = time.perf_counter() - start
+        return self.results
+
+    @property
+    def visited(self) -> set[str]:
+        """
+        Every section entered by any branch.
+        """
+        return {section for result in self.results for section in result.visited}
+
+    @property
+    def chosen(self) -> set[str]:
+        """
+        Every choice made by any branch.
+        """
+        return {choice for result in self.results for choice in result.branch}
+
+    @property
+    def crashes(self) -> list[BranchResult]:
+        """
+        Every branch that crashed.
+        """
+        return [_ for _ in self.results if _.status == "crash"]
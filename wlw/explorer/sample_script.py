@@ -0,0 +1,30 @@
+"""
+Sample script chapter for the explorer.
+
+Stores a choice, then only reads it after another choice, so exploring it only covers every section if the state
+a branch forks in is hashed before the script's step is unwound. Run it using `python -m wlw.explorer wlw.explorer.sample_script`.
+"""
+from wlw.utils.script import ScriptChapter, say, choice, when, goto
+
+CHAPTER_TITLE = "Explorer Sample"
+CHAPTER_NUMBER = 0
+
+class Main(ScriptChapter):
+    CHARACTERS = {
+        "narr": {"name": "Narrator", "special": True}
+    }
+    SCRIPT = {
+        "start": [
+            say("narr", "Were you asleep?", thought=True),
+            choice([("Tell the truth", "tell", None), ("Lie", "lie", None)], store="first"),
+            choice([("Carry on", "carry_on", None)]),
+            when("first", "lie", "liar"),
+            goto("honest")
+        ],
+        "liar": [
+            say("narr", "Nobody believes you.", thought=True)
+        ],
+        "honest": [
+            say("narr", "At least you're honest.", thought=True)
+        ]
+    }
@@ -0,0 +1,9 @@
+"""
+Fake Discord IPC utility.
+
+Allows `RichPresence` to be tested and benchmarked offline, against a local stand-in for Discord.
+"""
+
+from .server import FakeDiscordServer
+
+__all__ = ["FakeDiscordServer"]
@@ -0,0 +1,98 @@
+"""
+Fake Discord IPC runner.
+
+Designed to be run as a standalone script, either serving a fake Discord for the game to connect to,
+or benchmarking `RichPresence` against one.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+def bench(server, count: int, window: int):
+    """
+    Time `count` presence updates, sent one at a time, then with up to `window` in flight at once.
+    """
+    from wlw.utils.discord import RichPresence
+
+    rpc = RichPresence("0", server.path)
+    rpc._connect()
+    rpc._authenticate()
+
+    start = time.perf_counter()
+    for i in range(count):
+        rpc.set_state(rpc.ActivityType.PLAYING, f"State {i}", "Benchmarking...")
+    sequential = time.perf_counter() - start
+
+    start = time.perf_counter()
+    in_flight = []
+    for i in range(count):
+        in_flight.append(rpc._send_request(rpc._activity_payload(rpc.ActivityType.PLAYING, f"State {i}", "Benchmarking...")))
+        if len(in_flight) >= window:
+            rpc._wait_response(in_flight.pop(0))
+    for nonce in in_flight:
+        rpc._wait_response(nonce)
+    pipelined = time.perf_counter() - start
+
+    rpc._disconnect()
+
+    print(f"Sequential: {count} updates in {sequential:.3f}s ({count/sequential:.0f}/s)")
+    print(f"Pipelined (window {window}): {count} updates in {pipelined:.3f}s ({count/pipelined:.0f}/s)")
+
+def reconnect(server, seconds: float):
+    """
+    Run a `PresenceWorker` for `seconds`, counting how often it had to reconnect.
+    """
+    from wlw.utils.discord import RichPresence, PresenceWorker, TokenBucket
+
+    # the default rate limit would only let a handful of updates through
+    worker = PresenceWorker(RichPresence("0", server.path), ping_interval=0.1, min_backoff=0.05, max_backoff=0.5, rate_limit=TokenBucket(20, 20))
+    worker.start()
+
+    end = time.monotonic() + seconds
+    i = 0
+    while time.monotonic() < end:
+        worker.set_state(worker.ActivityType.PLAYING, f"State {i}", "Reconnecting...")
+        i += 1
+        time.sleep(0.01)
+
+    time.sleep(0.2) # let the worker catch up before it clears the presence
+    last = server.activity
+    worker.stop()
+
+    print(f"Requested {i} states, server saw {server.connections} connection(s), {server.frames} frames and {server.updates} updates.")
+    print(f"Last state shown: {last['state'] if last else None} (expected 'State {i-1}')")
+
+if __name__ == "__main__":
+    from wlw.fake_discord.server import FakeDiscordServer
+
+    parser = argparse.ArgumentParser(description="Run a fake Discord IPC server, or benchmark RichPresence against one.")
+    parser.add_argument("-p", "--path", default=None, help="Where to create the socket. Defaults to '$XDG_RUNTIME_DIR/discord-ipc-0' when serving, and a temporary file otherwise.")
+    parser.add_argument("--bench", type=int, default=0, metavar="N", help="Benchmark N presence updates, then exit.")
+    parser.add_argument("--window", type=int, default=16, help="How many updates to keep in flight when benchmarking.")
+    parser.add_argument("--reconnect", type=float, default=0, metavar="SECONDS", help="Run a presence worker for SECONDS, dropping connections every --drop-after frames.")
+    parser.add_argument("--chunk-size", type=int, default=0, help="Fragment replies into chunks of this many bytes.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before every reply.")
+    parser.add_argument("--drop-after", type=int, default=0, help="Close connections after this many frames.")
+    args = parser.parse_args()
+
+    serving = not (args.bench or args.reconnect)
+    path = args.path
+    if path is None:
+        directory = os.getenv("XDG_RUNTIME_DIR", "/tmp") if serving else tempfile.mkdtemp()
+        path = os.path.join(directory, "discord-ipc-0")
+
+    with FakeDiscordServer(path, args.chunk_size, args.latency, args.drop_after) as server:
+        if args.bench:
+            bench(server, args.bench, args.window)
+        if args.reconnect:
+            reconnect(server, args.reconnect)
+
+        if serving:
+            print(f"Serving a fake Discord on '{path}', press Ctrl+C to stop.")
+            try:
+                while True:
+                    time.sleep(1)
+            except KeyboardInterrupt:
+                pass
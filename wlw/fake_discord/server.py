@@ -0,0 +1,166 @@
+"""
+A fake Discord IPC server.
+
+Speaks just enough of Discord's IPC protocol (handshake, SET_ACTIVITY, ping, close) for `RichPresence` to run against it,
+without Discord.
+"""
+import json
+import os
+import socket
+import struct
+import threading
+import time
+
+FRAME_HEADER = struct.Struct("<II") # OpCode, payload length
+
+class FakeDiscordServer:
+    """
+    FakeDiscordServer class.
+
+    Listens on a Unix socket, answering every client on its own thread. Can be made to misbehave, so a
+    client's framing and reconnect handling can be tested.
+    """
+    def __init__(self, path: str, chunk_size: int = 0, latency: float = 0.0, drop_after: int = 0):
+        """
+        Args:
+            path (str): Where to create the socket.
+            chunk_size (int): Send replies in chunks of this many bytes, fragmenting every frame. 0 sends whole frames.
+            latency (float): How long to wait before replying, in seconds.
+            drop_after (int): Close each connection after this many frames. 0 never does.
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+        self.latency = latency
+        self.drop_after = drop_after
+
+        self.__socket = None
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+        self.connections = 0
+        self.frames = 0
+        self.updates = 0 # SET_ACTIVITY commands received
+        self.activity = None # the last activity that was set
+
+    def start(self):
+        """
+        Start listening in the background.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.__socket.bind(self.path)
+        self.__socket.listen()
+
+        self.__thread = threading.Thread(target=self.__accept, name="fake-discord", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """
+        Stop listening and remove the socket. Open connections are closed by their clients.
+        """
+        if self.__socket:
+            self.__socket.close()
+            self.__socket = None
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def __accept(self):
+        while self.__socket:
+            try:
+                conn, _ = self.__socket.accept()
+            except OSError: # stopped
+                return
+
+            with self.__lock:
+                self.connections += 1
+            threading.Thread(target=self.__serve, args=(conn,), name="fake-discord-conn", daemon=True).start()
+
+    def __serve(self, conn: socket.socket):
+        frames = 0
+        buffer = bytearray()
+
+        with conn:
+            while True:
+                try:
+                    frame = self.__read_frame(conn, buffer)
+                except OSError:
+                    return
+                if frame is None: # client hung up
+                    return
+
+                op, payload = frame
+                frames += 1
+                with self.__lock:
+                    self.frames += 1
+
+                if self.drop_after and frames > self.drop_after:
+                    return
+
+                reply = self.handle(op, payload)
+                if reply is None:
+                    return
+
+                if self.latency:
+                    time.sleep(self.latency)
+                try:
+                    self.__send_frame(conn, *reply)
+                except OSError:
+                    return
+
+    def handle(self, op: int, payload: dict) -> tuple[int, dict] | None:
+        """
+        Answer a frame.
+
+        Args:
+            op (int): The frame's OpCode.
+            payload (dict): The frame's payload.
+
+        Returns:
+            tuple[int, dict] | None: The reply's OpCode and payload, or None to close the connection.
+        """
+        if op == 0: # handshake
+            return 1, {"cmd": "DISPATCH", "evt": "READY", "data": {"v": 1, "config": {}, "user": {"id": "0", "username": "fake"}}, "nonce": None}
+        elif op == 1: # command
+            if payload.get("cmd") == "SET_ACTIVITY":
+                self.activity = payload.get("args", {}).get("activity")
+                with self.__lock:
+                    self.updates += 1
+            return 1, {"cmd": payload.get("cmd"), "evt": None, "data": self.activity, "nonce": payload.get("nonce")}
+        elif op == 3: # ping
+            return 4, payload
+        return None # close, or anything we don't know about
+
+    def __read_frame(self, conn: socket.socket, buffer: bytearray) -> tuple[int, dict] | None:
+        while True:
+            if len(buffer) >= FRAME_HEADER.size:
+                op, length = FRAME_HEADER.unpack_from(buffer)
+                if len(buffer) >= FRAME_HEADER.size + length:
+                    data = bytes(buffer[FRAME_HEADER.size:FRAME_HEADER.size+length])
+                    del buffer[:FRAME_HEADER.size+length]
+                    return op, json.loads(data.decode("utf-8"))
+
+            chunk = conn.recv(65536)
+            if not chunk:
+                return None
+            buffer += chunk
+
+    def __send_frame(self, conn: socket.socket, op: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        packet = FRAME_HEADER.pack(op, len(data)) + data
+
+        if not self.chunk_size:
+            conn.sendall(packet)
+            return
+
+        for i in range(0, len(packet), self.chunk_size):
+            conn.sendall(packet[i:i+self.chunk_size])
+            time.sleep(0) # let the client see each fragment on its own
@@ -1,41 +1,74 @@
 """
 Scripts for WLW, intended to be run from main.py.
 
-Dynamically loads all chapter modules in the game package.
+Dynamically discovers all chapter modules in the game package.
 
 All chapters should inherit from wlw.utils.chapter.Chapter, be named Main, and implement the start method.
 Additionally, they should define the constants CHAPTER_TITLE and CHAPTER_NUMBER.
+
+Chapters are only discovered once they are first accessed, and only imported once they are actually needed.
+Their metadata is read from source instead.
 """
 import importlib
+import importlib.util
 import pkgutil
-import inspect
 import logging
-from wlw.utils.chapter import Chapter
+from wlw.utils.chapter import LazyChapter, read_chapter_metadata
 from wlw.utils.logger import WLWLogger
 
 logging.setLoggerClass(WLWLogger)
 log = logging.getLogger("WLWLogger")
 log: WLWLogger
 
-# Dynamically import all chapter modules
-# When built, requires the Nuitka --include-package='wlw.game' flag to be set so that pkgutil can find chapters.
-chapter_modules = []
-for package in pkgutil.iter_modules([__path__][0]): # pkgutil will function when built with nuitka
-    if package.name != "__init__.py":
-        module_name = f"wlw.game.{package.name}"
-        try:
-            module = importlib.import_module(module_name)
-            if hasattr(module, 'Main') and inspect.isclass(module.Main) and issubclass(module.Main, Chapter):
-                if hasattr(module, 'CHAPTER_NUMBER') and hasattr(module, 'CHAPTER_TITLE'):
-                    chapter_modules.append(module)
-                    log.debug(f"Successfully loaded chapter {module_name}")
+def _chapter_loader(module_name: str):
+    return lambda: importlib.import_module(module_name)
+
+def discover_chapters() -> list[LazyChapter]:
+    """
+    Find every chapter module in this package, without importing them (if possible).
+
+    Runs once, the first time `chapter_modules` (or a chapter) is accessed.
+
+    Returns:
+        list[LazyChapter]: Every chapter found.
+    """
+    global _chapters
+    if _chapters is not None:
+        return _chapters
+
+    # When built, requires the Nuitka --include-package='wlw.game' flag to be set so that pkgutil can find chapters.
+    _chapters = {}
+    for package in pkgutil.iter_modules([__path__][0]): # pkgutil will function when built with nuitka
+        if package.name != "__init__.py":
+            module_name = f"wlw.game.{package.name}"
+            try:
+                spec = importlib.util.find_spec(module_name)
+                source = spec.loader.get_source(module_name) if spec and hasattr(spec.loader, "get_source") else None
+
+                if source is None: # compiled builds won't have any source to read, so we have to import it now
+                    module = importlib.import_module(module_name)
+                    meta = (module.CHAPTER_NUMBER, module.CHAPTER_TITLE) if hasattr(module, 'CHAPTER_NUMBER') and hasattr(module, 'CHAPTER_TITLE') else None
+                else:
+                    meta = read_chapter_metadata(source)
+
+                if meta:
+                    _chapters[package.name] = LazyChapter(module_name, *meta, _chapter_loader(module_name))
+                    log.debug("Successfully found chapter %s", module_name)
                 else:
                     log.warning(f"{module_name} does not define CHAPTER_NUMBER and CHAPTER_TITLE, skipping.")
-            else:
-                log.warning(f"{module_name} does not define a valid Main class inheriting from Chapter, skipping.")
-        except Exception as e:
-            log.warning(f"Error importing {module_name}: {e}")
-
-# Expose chapter classes
-__all__ = [module.__name__.split('.')[-1] for module in chapter_modules]
-__all__.append("chapter_modules")
\ No newline at end of file
+            except Exception as e:
+                log.warning(f"Error reading {module_name}: {e}")
+
+    return _chapters
+
+_chapters: dict[str, LazyChapter] | None = None
+
+def __getattr__(name: str):
+    # discovery only happens once chapters are actually needed
+    if name == "chapter_modules":
+        return list(discover_chapters().values())
+    elif name == "__all__": # exposes chapter classes
+        return list(discover_chapters()) + ["chapter_modules"]
+    elif not name.startswith("__") and name in discover_chapters():
+        return _chapters[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
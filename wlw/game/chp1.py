@@ -1,6 +1,5 @@
 from wlw.utils.chapter import Chapter
 from wlw.utils.character import Character, Sex
-import time
 
 CHAPTER_TITLE = "False Beginnings"
 CHAPTER_NUMBER = 1
@@ -53,25 +52,25 @@ class Main(Chapter):
         self.nih.speak("Arcallis.")
         self.nih.speak("The New Order.")
         self.nih.speak("The Enemy.")
-        time.sleep(0.5)
+        self.pause(0.5)
         self.nih.speak("Alone, these things may have been perfectly docile.")
         self.nih.speak("But together, they've brewed a chaos that destroys anything and anyone involved.")
         self.nih.speak("Our Ancestors knew this well. Yet they're the ones who brought this upon us.")
         self.nih.speak("This fact alone paints a foul picture over the cataclysmic event that brought us here.")
-        time.sleep(0.3)
+        self.pause(0.3)
         self.emi.speak("...commander...")
-        time.sleep(0.3)
+        self.pause(0.3)
         self.nih.speak("The Great Rebirth, they call it.")
         self.nih.speak("An eye for an eye, a universe for a universe—such is all they make it out to be.")
         self.nih.speak("Our self-proclaimed scientists claim it is an event to cherish,")
         self.nih.speak("after all, it <i>did</i> birth Arcallis from the ashes.")
         self.nih.speak("But nobody ever stops to consider where the ashes came from.")
         self.nih.speak("Or rather...")
-        time.sleep(0.5)
+        self.pause(0.5)
         self.nih.speak("Whom.")
-        time.sleep(1)
+        self.pause(1)
         self.emi.speak("..commander.")
-        time.sleep(1)
+        self.pause(1)
         self.nih.speak("Now, all because of our collective ignorance, they've returned, like a phoenix.")
         self.nih.speak("And they are <i>anything</i> but happy.")
         self.nih.speak("First, they started burning villages.")
@@ -96,7 +95,7 @@ class Main(Chapter):
         self.nih.speak("Her EdEn System, undisguised and in its default cuboid form, has also moved, now hanging beside her waist, still shimmering lightly in the dark.", True)
         self.nih.speak("Knowing her, she had likely taken a visit to the battle simulator and hadn't bothered to change.", True)
         self.nih.speak("I'm not sure just how long she's been here watching me though, but judging by the intensity of her iconic glare, probably too long.", True)
-        time.sleep(0.2)
+        self.pause(0.2)
         self.nih.speak("She continues:", True)
         self.emi.speak("Commander, are you <i>sure</i> you received enough sleep last night? This is the third time today you've dozed off.")
 
@@ -288,8 +287,9 @@ class Main(Chapter):
         self.manager.set_section(CHAPTER_TITLE, "f_s1_mavrn_defend")
         self.manager.save()
 
-        self.emi.affinity += 1
-        self.manager.persistent["nihira_emil_s1-mavrn_defend"] = True
+        with self.manager.batch():
+            self.emi.affinity += 1
+            self.manager.persistent["nihira_emil_s1-mavrn_defend"] = True
 
         self.nih.speak("Mavrn, although plenty annoying, still follows orders, so I quickly interject, my voice stern.", True)
         self.nih.speak("Her body is just as organic as yours, Doctor. I suggest you watch your tone.")
@@ -309,8 +309,9 @@ class Main(Chapter):
         self.manager.set_section(CHAPTER_TITLE, "f_s1_mavrn_silent")
         self.manager.save()
 
-        self.emi.affinity -= 3
-        self.manager.persistent["nihira_emil_s1-mavrn_defend"] = False
+        with self.manager.batch():
+            self.emi.affinity -= 3
+            self.manager.persistent["nihira_emil_s1-mavrn_defend"] = False
 
     def f_s2(self):
         self.manager.set_section(CHAPTER_TITLE, "f_s2")
@@ -5,8 +5,24 @@ Allows for the 'compilation' of chapters into a single file, which can then be r
 indepedently of the main game executable.
 
 Does not actually compile code, though does obfuscate it.
+
+Modules are only imported once they're first used.
 """
+import importlib
+
+_LAZY = {
+    "load_package": ".package",
+    "package_chapters": ".package",
+    "PackageReader": ".container",
+    "PackageWriter": ".container",
+    "PackageEntry": ".container",
+    "Compression": ".container",
+    "WarmCache": ".warm_cache"
+}
 
-from .package import load_package, package_chapters
+__all__ = ["load_package", "package_chapters", "PackageReader", "PackageWriter", "PackageEntry", "Compression", "WarmCache"]
 
-__all__ = ["load_package", "package_chapters"]
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
@@ -9,10 +9,15 @@ import argparse
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Package chapters into a single file.")
     parser.add_argument("chapters_dir", help="Directory containing chapters to package.")
+    parser.add_argument("--compress", action="store_true", help="Compress chapters inside the package, using zlib or lzma (whichever is smaller) per chapter.")
+    parser.add_argument("--bytecode", action="store_true", help="Ship precompiled bytecode for this Python version alongside chapter sources.")
+    parser.add_argument("-o", "--output", default="chp.pkg.wlw", help="Where to write the package. Defaults to 'chp.pkg.wlw'.")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="How many processes to encode chapters with. Defaults to the CPU count.")
+    parser.add_argument("--full", action="store_true", help="Rebuild every chapter, even if it hasn't changed.")
     args = parser.parse_args()
 
     from wlw.packaging.package import package_chapters
 
-    print(f"Packaging chapters in '{args.chapters_dir}'...")
-    package_chapters("[n1h1raxem1l::4::eva]", args.chapters_dir)
+    print(f"Packaging chapters in '{args.chapters_dir}' to '{args.output}'...")
+    package_chapters("[n1h1raxem1l::4::eva]", args.chapters_dir, args.compress, args.bytecode, args.output, args.jobs, not args.full)
     print("Done.")
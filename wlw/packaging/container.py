@@ -0,0 +1,411 @@
+"""
+Chapter package container.
+
+Versioned, indexed container format for chapter packages, allowing any single entry to be
+located and read without touching the rest of the package.
+
+Layout:
+    `<HEADER>` - magic, format version, entry count and table length.
+    `<ENTRY>meta` * entry count - the entry table. `meta` is obfuscated JSON (name, path, number, title).
+    data - every entry's (optionally compressed) obfuscated data, back to back.
+
+Entries may additionally carry marshalled code objects, stored directly after their data and
+tagged with the magic number of the interpreter that compiled them.
+
+Entry offsets are relative to the start of the data section.
+"""
+import mmap
+import hashlib
+import json
+import struct
+import zlib
+import lzma
+import marshal
+import importlib.util
+from enum import IntEnum
+from wlw.utils.xor import obfuscate, obfuscate_into, XOR_CHUNK_SIZE
+from wlw.utils.errors import PackageError
+
+PKG_MAGIC = b"WLWP"
+PKG_VERSION = 3 # bump whenever the entry format changes or gains values (3: lzma compression)
+
+HEADER = struct.Struct("<4sHII") # magic, version, entry count, entry table length
+ENTRY = struct.Struct("<QIIIB4sIIH") # offset, stored length, original length, crc32 (of stored data), compression, code magic, code length, code crc32, meta length
+NO_CODE = b"\0" * 4 # code magic for entries without any code
+
+class Compression(IntEnum):
+    """
+    Compression applied to an entry's data, before obfuscation.
+    """
+    NONE = 0
+    ZLIB = 1
+    LZMA = 2
+
+def _compress(compression: Compression, data: bytes) -> bytes:
+    if compression == Compression.ZLIB:
+        return zlib.compress(data, 9)
+    elif compression == Compression.LZMA:
+        return lzma.compress(data, preset=9)
+    return data
+
+def _decompressor(compression: Compression):
+    if compression == Compression.ZLIB:
+        return zlib.decompressobj()
+    elif compression == Compression.LZMA:
+        return lzma.LZMADecompressor()
+    return None
+
+class PackageEntry:
+    """
+    A single entry in a package's entry table.
+    """
+    def __init__(self, name: str, path: str, number: int, title: str, offset: int = 0, length: int = 0, size: int = 0, checksum: int = 0, compression: Compression = Compression.NONE,
+                 code_magic: bytes = NO_CODE, code_length: int = 0, code_checksum: int = 0):
+        """
+        Args:
+            name (str): The entry's module name.
+            path (str): The entry's mock file path.
+            number (int): The chapter's number.
+            title (str): The chapter's title.
+            offset (int): Where the entry's data starts, relative to the data section.
+            length (int): How many bytes are stored.
+            size (int): How many bytes the data takes up once decoded.
+            checksum (int): CRC32 of the stored bytes.
+            compression (Compression): How the data (and code) was compressed.
+            code_magic (bytes): Magic number of the interpreter the code was compiled with.
+            code_length (int): How many bytes of code are stored after the data, if any.
+            code_checksum (int): CRC32 of the stored code.
+        """
+        self.name = name
+        self.path = path
+        self.number = number
+        self.title = title
+        self.offset = offset
+        self.length = length
+        self.size = size
+        self.checksum = checksum
+        self.compression = Compression(compression)
+        self.code_magic = code_magic
+        self.code_length = code_length
+        self.code_checksum = code_checksum
+
+    @property
+    def has_code(self) -> bool:
+        """
+        Whether the entry ships a precompiled code object.
+        """
+        return self.code_length > 0
+
+    def __repr__(self):
+        return f"<PackageEntry {self.name} ({self.number}: {self.title}, {self.length}B)>"
+
+def encode_entry(key: bytes, name: str, path: str, number: int, title: str, data: bytes, compress: bool = False, code = None) -> tuple[PackageEntry, bytes]:
+    """
+    Compress, obfuscate and checksum an entry's data (and code), ready to be written.
+
+    Args:
+        key (bytes): The obfuscation key.
+        name (str): The entry's module name.
+        path (str): The entry's mock file path.
+        number (int): The chapter's number.
+        title (str): The chapter's title.
+        data (bytes): The entry's (raw) data.
+        compress (bool): Whether to compress the data, using whichever algorithm makes it smallest. Skipped if none would make it smaller.
+        code (code | None): The entry's compiled code object, if any.
+
+    Returns:
+        tuple[PackageEntry, bytes]: The entry (offset unset), and its stored bytes.
+    """
+    compression = Compression.NONE
+    stored = data
+
+    if compress:
+        for algorithm in (Compression.ZLIB, Compression.LZMA):
+            compressed = _compress(algorithm, data)
+            if len(compressed) < len(stored):
+                compression = algorithm
+                stored = compressed
+
+    stored = obfuscate(key, stored)
+    entry = PackageEntry(name, path, number, title, 0, len(stored), len(data), zlib.crc32(stored), compression)
+
+    if code is not None:
+        code = marshal.dumps(code)
+        code = obfuscate(key, _compress(compression, code))
+
+        entry.code_magic = importlib.util.MAGIC_NUMBER
+        entry.code_length = len(code)
+        entry.code_checksum = zlib.crc32(code)
+        stored += code
+
+    return entry, stored
+
+class PackageWriter:
+    """
+    Writes chapter packages.
+
+    Entries are buffered by `add`, then written all at once by `write`.
+    """
+    def __init__(self, path: str, obfuscation_key: str):
+        """
+        Args:
+            path (str): Where to write the package.
+            obfuscation_key (str): The key used to obfuscate the package.
+        """
+        self.path = path
+        self.__key = obfuscation_key.encode()
+        self.__entries: list[tuple[PackageEntry, bytes]] = []
+
+    def add(self, name: str, path: str, number: int, title: str, data: bytes, compress: bool = False, code = None) -> PackageEntry:
+        """
+        Add an entry to the package.
+
+        Args:
+            name (str): The entry's module name.
+            path (str): The entry's mock file path.
+            number (int): The chapter's number.
+            title (str): The chapter's title.
+            data (bytes): The entry's (raw) data.
+            compress (bool): Whether to compress the data, using whichever algorithm makes it smallest. Skipped if none would make it smaller.
+            code (code | None): The entry's compiled code object, if any.
+
+        Returns:
+            PackageEntry: The new entry.
+        """
+        entry, stored = encode_entry(self.__key, name, path, number, title, data, compress, code)
+        self.__entries.append((entry, stored))
+
+        return entry
+
+    def add_raw(self, entry: PackageEntry, stored: bytes) -> PackageEntry:
+        """
+        Add an already encoded entry to the package, such as one read by `PackageReader.read_raw`.
+
+        Must have been encoded using the same obfuscation key.
+
+        Args:
+            entry (PackageEntry): The entry.
+            stored (bytes): The entry's stored data (and code).
+
+        Returns:
+            PackageEntry: The entry.
+        """
+        self.__entries.append((entry, stored))
+
+        return entry
+
+    def write(self):
+        """
+        Write all added entries to the package file.
+        """
+        table = bytearray()
+        offset = 0
+
+        for entry, stored in self.__entries:
+            entry.offset = offset
+            meta = obfuscate(self.__key, json.dumps({"name": entry.name, "path": entry.path, "number": entry.number, "title": entry.title}).encode('utf-8'))
+            table += ENTRY.pack(entry.offset, entry.length, entry.size, entry.checksum, entry.compression, entry.code_magic, entry.code_length, entry.code_checksum, len(meta))
+            table += meta
+            offset += len(stored)
+
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(PKG_MAGIC, PKG_VERSION, len(self.__entries), len(table)))
+            f.write(table)
+            for entry, stored in self.__entries:
+                f.write(stored)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.write()
+
+class PackageReader:
+    """
+    Reads chapter packages.
+
+    The package is memory mapped, so only the entry table is read upon opening, and entries
+    are only read once requested.
+    """
+    def __init__(self, path: str, obfuscation_key: str):
+        """
+        Args:
+            path (str): The path to the package.
+            obfuscation_key (str): The key used to deobfuscate the package.
+
+        Raises:
+            PackageError: The package is malformed or uses an unsupported version.
+        """
+        self.path = path
+        self.__key = obfuscation_key.encode()
+        self.__entries: list[PackageEntry] = []
+        self.__digest = None
+
+        with open(path, "rb") as f:
+            try:
+                self.__map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError: # empty files can't be mapped
+                raise PackageError(f"Package '{path}' is empty!") from None
+
+        try:
+            self.__read_table()
+        except (struct.error, UnicodeDecodeError, json.JSONDecodeError, KeyError, ValueError) as e: # ValueError: unknown compression
+            self.close()
+            raise PackageError(f"Package '{path}' is malformed! ({e})") from None
+        except PackageError:
+            self.close()
+            raise
+
+    def __read_table(self):
+        magic, version, count, table_length = HEADER.unpack_from(self.__map, 0)
+
+        if magic != PKG_MAGIC:
+            raise PackageError(f"'{self.path}' is not a chapter package!")
+        elif version != PKG_VERSION:
+            raise PackageError(f"Package '{self.path}' uses format version {version}, expected {PKG_VERSION}. Please repackage it.")
+
+        pos = HEADER.size
+        for _ in range(count):
+            offset, length, size, checksum, compression, code_magic, code_length, code_checksum, meta_length = ENTRY.unpack_from(self.__map, pos)
+            pos += ENTRY.size
+            meta = json.loads(obfuscate(self.__key, self.__map[pos:pos+meta_length]).decode('utf-8'))
+            pos += meta_length
+
+            self.__entries.append(PackageEntry(meta["name"], meta["path"], meta["number"], meta["title"], offset, length, size, checksum, compression,
+                                               code_magic, code_length, code_checksum))
+
+        self.__data_start = HEADER.size + table_length
+
+    @property
+    def entries(self) -> list[PackageEntry]:
+        """
+        The package's entries, in the order they were written.
+        """
+        return self.__entries
+
+    def digest(self) -> bytes:
+        """
+        Hash the entire package, e.g. to check whether anything derived from it is still valid.
+
+        Returns:
+            bytes: The package's SHA-256 digest.
+        """
+        if self.__digest is None:
+            self.__digest = hashlib.sha256(self.__map).digest()
+        return self.__digest
+
+    def find(self, name: str) -> PackageEntry:
+        """
+        Find an entry by its module name.
+
+        Raises:
+            KeyError: No such entry exists.
+        """
+        for entry in self.__entries:
+            if entry.name == name:
+                return entry
+        raise KeyError(f"No such entry '{name}' in package '{self.path}'.")
+
+    def __decode(self, entry: PackageEntry, start: int, length: int, checksum: int) -> bytearray | None:
+        # verify and deobfuscate straight out of the map, into a single buffer
+        start += self.__data_start
+        if start + length > len(self.__map):
+            return None
+
+        # checksum the stored bytes before decoding anything, so a corrupt entry can't expand into a huge output
+        with memoryview(self.__map) as view, view[start:start+length] as stored:
+            if zlib.crc32(stored) != checksum:
+                return None
+
+        decompressor = _decompressor(entry.compression)
+        if decompressor is None:
+            data = bytearray(length)
+            with memoryview(self.__map) as view, view[start:start+length] as stored:
+                obfuscate_into(self.__key, stored, data)
+            return data
+
+        # compressed, so stream it: every chunk is deobfuscated and decompressed in one pass,
+        # only ever holding a single chunk of stored data. chunks stay aligned to the key.
+        chunk_size = max(XOR_CHUNK_SIZE // len(self.__key), 1) * len(self.__key)
+        chunk = bytearray(chunk_size)
+        data = bytearray()
+
+        try:
+            with memoryview(self.__map) as view, memoryview(chunk) as buffer:
+                for pos in range(start, start+length, chunk_size):
+                    with view[pos:min(pos+chunk_size, start+length)] as stored:
+                        size = obfuscate_into(self.__key, stored, buffer)
+                    data += decompressor.decompress(buffer[:size])
+        except (zlib.error, lzma.LZMAError):
+            return None
+
+        if not decompressor.eof:
+            return None
+        return data
+
+    def read(self, entry: PackageEntry) -> bytearray:
+        """
+        Read, verify and decode a single entry.
+
+        Args:
+            entry (PackageEntry): The entry to read.
+
+        Returns:
+            bytearray: The entry's original data.
+
+        Raises:
+            PackageError: The entry is corrupt.
+        """
+        data = self.__decode(entry, entry.offset, entry.length, entry.checksum)
+        if data is None:
+            raise PackageError(f"Entry '{entry.name}' in package '{self.path}' is corrupt!")
+
+        return data
+
+    def read_raw(self, entry: PackageEntry) -> bytes:
+        """
+        Read an entry's stored bytes (data and code) without decoding them.
+
+        Args:
+            entry (PackageEntry): The entry to read.
+
+        Returns:
+            bytes: The stored bytes, as accepted by `PackageWriter.add_raw`.
+        """
+        start = self.__data_start + entry.offset
+        return self.__map[start:start+entry.length+entry.code_length]
+
+    def read_code(self, entry: PackageEntry):
+        """
+        Read an entry's precompiled code object.
+
+        Args:
+            entry (PackageEntry): The entry to read.
+
+        Returns:
+            code | None: The code object, or None if the entry has none or it was compiled by a different interpreter.
+
+        Raises:
+            PackageError: The entry's code is corrupt.
+        """
+        if not entry.has_code or entry.code_magic != importlib.util.MAGIC_NUMBER:
+            return None
+
+        code = self.__decode(entry, entry.offset + entry.length, entry.code_length, entry.code_checksum)
+        if code is None:
+            raise PackageError(f"Code for entry '{entry.name}' in package '{self.path}' is corrupt!")
+
+        return marshal.loads(code)
+
+    def close(self):
+        """
+        Close the package's memory map.
+        """
+        self.__map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -1,13 +1,18 @@
 """
 Packaging utlities.
 """
-from wlw.utils.xor import obfuscate
 import os
 import importlib.util
 import sys
-import inspect
+import json
+import hashlib
+import functools
+import concurrent.futures
 import logging
-from wlw.utils.chapter import Chapter
+from wlw.utils.chapter import LazyChapter, read_chapter_metadata
+from wlw.utils.errors import PackageError, SectionNotFoundError
+from wlw.packaging.container import PackageReader, PackageWriter, PackageEntry, encode_entry, PKG_VERSION
+from wlw.packaging.warm_cache import WarmCache
 from wlw.utils.logger import WLWLogger
 
 logging.setLoggerClass(WLWLogger)
@@ -15,60 +20,197 @@ log = logging.getLogger("WLWLogger")
 log: WLWLogger
 
 
-PKG_DELIMETER = b"\x03" * 16 # 16 bytes of 0x03, used to delimit chapters
-PKG_SPACER = b"\x03" * 2 # 2 bytes of 0x03, used to separate metadata from chapter content
+def _manifest_path(output_path: str) -> str:
+    return f"{output_path}.manifest"
 
-def package_chapters(obfuscation_key: str, chapters_dir: str):
+def _graph_path(output_path: str) -> str:
+    return f"{output_path}.graph"
+
+def _encode_chapter(obfuscation_key: str, name: str, mock_file_path: str, number: int, title: str, source: bytes, compress: bool, bytecode: bool) -> tuple[PackageEntry, bytes]:
+    """
+    Compile, compress and obfuscate a single chapter.
+
+    Run inside the packaging process pool, so it has to be a module level function.
+    """
+    code = compile(source, mock_file_path, 'exec', dont_inherit=True) if bytecode else None
+    return encode_entry(obfuscation_key.encode(), name, mock_file_path, number, title, source, compress, code)
+
+def package_chapters(obfuscation_key: str, chapters_dir: str, compress: bool = False, bytecode: bool = False, output_path: str = "chp.pkg.wlw", jobs: int = None, incremental: bool = True):
     """
     Package all chapter files (excluding special files) into a single file.
 
     Can then be reloaded using `load_package`.
 
+    A manifest of source hashes is kept alongside the package (`<output_path>.manifest`). When `incremental`
+    is set, chapters that haven't changed since the last build are copied over from the previous package
+    as-is, and only changed chapters are re-encoded (in parallel).
+
+    Every chapter is indexed into a story graph first (cached as `<output_path>.graph`), and packaging stops
+    if any chapter refers to a section that doesn't exist.
+
     Args:
         obfuscation_key (str): The key used to obfuscate the package.
         chapters_dir (str): The directory containing the chapters to package.
+        compress (bool): Whether to compress chapters (only kept for chapters it actually shrinks).
+        bytecode (bool): Whether to also ship compiled code for each chapter. Only used when loaded by the same Python version.
+        output_path (str): Where to write the package.
+        jobs (int | None): How many processes to encode chapters with. Defaults to the CPU count.
+        incremental (bool): Whether to reuse unchanged chapters from the previous build.
+
+    Raises:
+        SectionNotFoundError: A chapter refers to a section that doesn't exist.
 
     Format:
-        `filepath<ZERO>filename<PKG_SPACER>content<PKG_DELIMETER>`
+        See `wlw.packaging.container`.
     """
-    with open("chp.pkg.wlw", "wb") as f:
-        for root, dirs, files in os.walk(chapters_dir):
-            files = [_ for _ in files if _ not in ["__pycache__", "__init__.py"]] # filter out special files
-            for file in files:
-                if file.endswith(".py"):
-                    mock_file_path = f"wlw.game.pkg.{os.path.basename(file)}" # mock file path to be used when the module is loaded
-                    file_path = os.path.abspath(os.path.join(root, file))
-                    print(f"'{file_path}'...")
-                    with open(file_path, "rb") as f2:
-                        # metadata
-                        f.write(f"{mock_file_path}\0{file.split('.')[0]}".encode('utf-8'))
-                        f.write(PKG_SPACER)
-                        # script data
-                        f.write(obfuscate(obfuscation_key.encode(), f2.read()))
-                        f.write(PKG_DELIMETER) if file != files[-1] else None
-
-def load_package(obfuscation_key: str, package_path: str) -> list:
+    # anything that changes how chapters are encoded invalidates the whole previous build
+    options = {
+        "version": PKG_VERSION,
+        "key": hashlib.sha256(obfuscation_key.encode()).hexdigest(),
+        "compress": compress,
+        "bytecode": importlib.util.MAGIC_NUMBER.hex() if bytecode else None
+    }
+
+    chapters = []
+    for root, dirs, files in os.walk(chapters_dir):
+        files = [_ for _ in files if _ not in ["__pycache__", "__init__.py"]] # filter out special files
+        for file in files:
+            if file.endswith(".py"):
+                mock_file_path = f"wlw.game.pkg.{os.path.basename(file)}" # mock file path to be used when the module is loaded
+                file_path = os.path.abspath(os.path.join(root, file))
+                with open(file_path, "rb") as f2:
+                    source = f2.read()
+
+                meta = read_chapter_metadata(source)
+                if not meta:
+                    log.warning(f"'{file_path}' does not define CHAPTER_NUMBER and CHAPTER_TITLE, skipping.")
+                    continue
+
+                chapters.append((file.split('.')[0], mock_file_path, *meta, source, hashlib.sha256(source).hexdigest()))
+
+    # saves made in a missing section could never be loaded, so catch them now instead
+    from wlw.story_graph.graph import StoryGraph
+    graph = StoryGraph(_graph_path(output_path))
+    for name, path, number, title, source, digest in chapters:
+        graph.add(name, source)
+
+    missing = graph.missing_sections()
+    if missing:
+        raise SectionNotFoundError("Chapters refer to sections that don't exist: " + ", ".join(f"'{target}' ({chapter}:{section}, line {line})" for chapter, section, target, line in missing))
+
+    # find anything we can reuse from the previous build
+    previous = {}
+    if incremental and os.path.exists(output_path) and os.path.exists(_manifest_path(output_path)):
+        try:
+            with open(_manifest_path(output_path), "r") as f:
+                manifest = json.load(f) # may be truncated, e.g. by an interrupted build
+
+            if manifest.get("options") == options:
+                with PackageReader(output_path, obfuscation_key) as reader:
+                    for name, path, number, title, source, digest in chapters:
+                        if manifest["chapters"].get(name) != digest:
+                            continue
+                        entry = reader.find(name)
+                        if entry.path == path and entry.number == number and entry.title == title:
+                            previous[name] = (entry, reader.read_raw(entry))
+        except (PackageError, KeyError, AttributeError, ValueError, OSError) as e:
+            log.warning(f"Unable to reuse previous package '{output_path}' ({e}), rebuilding everything.")
+            previous = {}
+
+    changed = [_ for _ in chapters if _[0] not in previous]
+    encoded = {}
+
+    for name, *_ in chapters:
+        print(f"'{name}'... {'unchanged' if name in previous else 'encoding'}")
+
+    if len(changed) > 1 and jobs != 1:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = {pool.submit(_encode_chapter, obfuscation_key, name, path, number, title, source, compress, bytecode): name
+                       for name, path, number, title, source, digest in changed}
+            for future in concurrent.futures.as_completed(futures):
+                encoded[futures[future]] = future.result()
+    else: # not worth spinning up any processes
+        for name, path, number, title, source, digest in changed:
+            encoded[name] = _encode_chapter(obfuscation_key, name, path, number, title, source, compress, bytecode)
+
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+    with PackageWriter(output_path, obfuscation_key) as writer:
+        for name, *_ in chapters:
+            writer.add_raw(*(previous[name] if name in previous else encoded[name]))
+
+    with open(_manifest_path(output_path), "w") as f:
+        json.dump({"options": options, "chapters": {name: digest for name, path, number, title, source, digest in chapters}}, f, indent=4)
+    graph.save()
+
+def _load_chapter(reader: PackageReader, entry: PackageEntry, cache: WarmCache = None):
     """
-    Load a chapter package file and return a list of chapter modules that pass
-    all validation checks.
+    Read, deobfuscate and execute a single chapter from a package.
+
+    Uses the chapter's code from `cache` if it's there. Otherwise, uses the chapter's precompiled code if it
+    was compiled by this interpreter, or compiles its source, then stores it in `cache`.
+
+    Args:
+        reader (PackageReader): The package's reader.
+        entry (PackageEntry): The chapter's entry.
+        cache (WarmCache | None): The validated warm-start cache, if any.
+
+    Returns:
+        module: The chapter's module.
+    """
+    script_name = entry.name
+    script_path = entry.path
+
+    log.debug(f"Loading packaged chapter {script_name} from {reader.path}...")
+
+    # mainly used for the following lines, doesn't actually import the module
+    spec = importlib.util.spec_from_loader(script_name, loader=None)
+    module = importlib.util.module_from_spec(spec)
+
+    module.__file__ = script_path
+    module.__name__ = script_name
+    module.__path__ = [os.path.dirname(script_path)]
+    module.__package__ = script_name
+    module.__loader__ = None
+
+    # compile the script (if required) and execute it. acts as a manual import.
+    code = cache.code(script_name) if cache else None
+    if code is None:
+        code = reader.read_code(entry)
+    if code is None:
+        log.debug(f"No usable bytecode for {script_name}, compiling from source.")
+        code = compile(reader.read(entry).decode('utf-8'), script_path, 'exec')
+    if cache:
+        cache.store_code(script_name, code)
+    exec(code, module.__dict__)
+    sys.modules[script_name] = module
+
+    return module
+
+def load_package(obfuscation_key: str, package_path: str, cache: WarmCache = None) -> list[LazyChapter]:
+    """
+    Load a chapter package file's entry table and return a list of chapters.
 
     Nearly identical to `wlw.game`'s `__init__.py` file, but allows for
     drag-and-drop loading.
 
-    Note that invalid chapters are still imported despite not being returned.
+    Only chapter metadata is read here. Each chapter is read, verified and executed the first
+    time anything other than its metadata is accessed, and is validated at that point.
     Additionally, this function should only be used in production, as
     the chapters will be imported twice (or more times) otherwise.
     
     Args:
         obfuscation_key (str): The key used to deobfuscate the package.
         package_path (str): The path to the package file.
+        cache (WarmCache | None): A warm-start cache to take chapter code from (and store it in). Validated against this package.
     
     Returns:
-        list: A list of chapter modules that pass all validation
-        checks.
+        list[LazyChapter]: A list of (not yet loaded) chapters.
 
     Raises:
         FileNotFoundError: If the package file does not exist.
+        PackageError: If the package is malformed or outdated.
     """
     chapter_modules = []
 
@@ -77,48 +219,15 @@ def load_package(obfuscation_key: str, package_path: str) -> list:
     if not os.path.exists(package_path):
         raise FileNotFoundError(f"Package file '{package_path}' does not exist. Please ensure your installation is valid.")
 
+    reader = PackageReader(package_path, obfuscation_key) # stays open, so chapters can be loaded later
+    if cache:
+        cache.validate(reader.digest())
 
-    with open(package_path, "rb") as f:
-        for i, chunk in enumerate(f.read().split(PKG_DELIMETER)):
-            meta, script = chunk.split(PKG_SPACER, maxsplit=1) # split metadata away from the actual script
-            script_path, script_name = meta.split(b'\0')
-            
-            content = obfuscate(obfuscation_key.encode(), script).decode('utf-8')
-
-            script_name = script_name.decode("utf-8")
-            script_path = script_path.decode("utf-8")
-
-            # mainly used for the following lines, doesn't actually import the module
-            spec = importlib.util.spec_from_loader(script_name, loader=None)
-            module = importlib.util.module_from_spec(spec)
-
-            module.__file__ = script_path
-            module.__name__ = script_name
-            module.__path__ = [os.path.dirname(script_path)]
-            module.__package__ = script_name
-            module.__loader__ = None
-
-            try:
-                module_name = f"wlw.game.{script_name}"
-
-                # compile the script and execute it. acts as a manual import.
-                code = compile(content, script_path, 'exec')
-                exec(code, module.__dict__)
-                sys.modules[script_name] = module
-
-                # preform checks against the module to ensure it can actually be run
-                if hasattr(module, 'Main') and inspect.isclass(module.Main) and issubclass(module.Main, Chapter):
-                    if hasattr(module, 'CHAPTER_NUMBER') and hasattr(module, 'CHAPTER_TITLE'):
-                        chapter_modules.append(module)
-                        log.debug(f"Successfully loaded chapter {module_name}")
-                    else:
-                        log.warning(f"{module_name} does not define CHAPTER_NUMBER and CHAPTER_TITLE, skipping.")
-                        continue
-                else:
-                    log.warning(f"{module_name} does not define a valid Main class inheriting from Chapter, skipping.")
-                    continue
-            except Exception as e:
-                log.warning(f"Error importing {module_name}: {e}")
-                continue
-    
-    return chapter_modules
\ No newline at end of file
+    for entry in reader.entries:
+        chapter_modules.append(LazyChapter(
+            f"wlw.game.{entry.name}", entry.number, entry.title,
+            functools.partial(_load_chapter, reader, entry, cache)
+        ))
+        log.debug(f"Found packaged chapter {entry.name} ({entry.number}: {entry.title})")
+
+    return chapter_modules
@@ -0,0 +1,138 @@
+"""
+Warm-start cache.
+
+Keeps work that every launch would otherwise repeat (decoding and compiling chapters, formatting text) in a file
+in the data directory, so later launches can map it in instead. The cache is tied to a single package and
+Python version, and is thrown away as soon as either changes.
+"""
+import os
+import mmap
+import struct
+import marshal
+import importlib.util
+import logging
+from wlw.utils.formatting import FormatType, format_cache, preload_format_cache
+from wlw.utils.logger import WLWLogger
+
+logging.setLoggerClass(WLWLogger)
+log = logging.getLogger("WLWLogger")
+log: WLWLogger
+
+CACHE_MAGIC = b"WLWC"
+CACHE_VERSION = 1
+HEADER = struct.Struct("<4sH4s32s") # magic, version, python magic, package digest
+
+class WarmCache:
+    """
+    WarmCache class.
+
+    Holds decoded chapter code objects and formatted lines. Empty until `validate` is called with the digest
+    of the package in use, which loads the cache file if it was built for that package.
+    """
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Where the cache is stored.
+        """
+        self.path = path
+
+        self.__digest = None
+        self.__code = {}
+        self.__dirty = False
+        self.__lines = 0 # formatted lines when last loaded/saved
+
+    @property
+    def valid(self) -> bool:
+        """
+        Whether the cache has been validated against a package.
+
+        Returns:
+            bool: Whether `validate` has been called.
+        """
+        return self.__digest is not None
+
+    def validate(self, digest: bytes) -> bool:
+        """
+        Load the cache file, if it was built for the package with `digest` by this version of Python.
+
+        Args:
+            digest (bytes): The package's SHA-256 digest, see `PackageReader.digest`.
+
+        Returns:
+            bool: Whether the cache file was loaded.
+        """
+        self.__digest = digest
+        self.__code = {}
+        self.__dirty = True
+
+        if not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                magic, version, python_magic, cached_digest = HEADER.unpack_from(data, 0)
+                if (magic, version, python_magic, cached_digest) != (CACHE_MAGIC, CACHE_VERSION, importlib.util.MAGIC_NUMBER, digest):
+                    log.debug("Warm-start cache '%s' is outdated, ignoring it.", self.path)
+                    return False
+
+                payload = marshal.loads(memoryview(data)[HEADER.size:])
+
+            # a well-formed payload can still hold anything, so check it before using any of it
+            code = dict(payload["code"])
+            formats = {text: [(FormatType(fmt) if fmt else None, value) for fmt, value in chunks] for text, chunks in payload["formats"].items()}
+        except (OSError, ValueError, EOFError, TypeError, KeyError, AttributeError, struct.error) as e:
+            log.warning(f"Unable to read warm-start cache '{self.path}' ({e}), ignoring it.")
+            return False
+
+        self.__code = code
+        preload_format_cache(formats)
+        self.__dirty = False
+        self.__lines = len(format_cache())
+
+        log.debug("Loaded warm-start cache '%s' (%d chapters, %d lines).", self.path, len(self.__code), len(formats))
+        return True
+
+    def code(self, name: str):
+        """
+        Get a chapter's cached code object.
+
+        Args:
+            name (str): The chapter's module name.
+
+        Returns:
+            code | None: The chapter's code, or None if it isn't cached.
+        """
+        return self.__code.get(name)
+
+    def store_code(self, name: str, code):
+        """
+        Cache a chapter's code object.
+
+        Args:
+            name (str): The chapter's module name.
+            code (code): The chapter's compiled code.
+        """
+        if self.__code.get(name) is not code:
+            self.__code[name] = code
+            self.__dirty = True
+
+    def save(self):
+        """
+        Write the cache (including every line formatted so far) to disk, if it was validated and anything changed.
+        """
+        if not self.valid or (not self.__dirty and len(format_cache()) == self.__lines):
+            return
+
+        formats = {text: tuple((fmt.value if fmt else None, value) for fmt, value in chunks) for text, chunks in format_cache().items()}
+        payload = marshal.dumps({"code": self.__code, "formats": formats})
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(HEADER.pack(CACHE_MAGIC, CACHE_VERSION, importlib.util.MAGIC_NUMBER, self.__digest))
+            f.write(payload)
+        os.replace(temp_path, self.path) # never leave a half written cache behind
+
+        self.__dirty = False
+        self.__lines = len(format_cache())
+        log.debug("Wrote warm-start cache '%s' (%d bytes).", self.path, HEADER.size + len(payload))
@@ -0,0 +1,11 @@
+"""
+Story graph utility.
+
+Indexes chapters into a graph of sections, choices and persistent flags without running them, so the story
+can be checked for unreachable or missing sections.
+"""
+
+from .graph import StoryGraph, ChapterGraph, Section
+from .indexer import index_chapter
+
+__all__ = ["StoryGraph", "ChapterGraph", "Section", "index_chapter"]
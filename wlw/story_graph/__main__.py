@@ -0,0 +1,59 @@
+"""
+Story graph runner.
+
+Designed to be run as a standalone script, indexing every chapter in a directory and reporting
+unreachable sections, missing sections and flags that are read but never set.
+"""
+
+import argparse
+import sys
+import time
+
+if __name__ == "__main__":
+    from wlw.story_graph.graph import StoryGraph
+
+    parser = argparse.ArgumentParser(description="Index chapters into a story graph and check it.")
+    parser.add_argument("chapters_dir", nargs="?", default="wlw/game", help="Directory containing the chapters. Defaults to 'wlw/game'.")
+    parser.add_argument("-c", "--cache", default=None, help="Where to cache the graph, e.g. the '<package>.graph' written when packaging.")
+    parser.add_argument("-r", "--reachable", metavar="CHAPTER[:SECTION]", help="List every section reachable from SECTION (defaults to 'start') of CHAPTER.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print every section, what it leads to, and the flags it uses.")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    graph = StoryGraph(args.cache)
+    graph.add_directory(args.chapters_dir)
+    graph.save()
+    elapsed = time.perf_counter() - start
+
+    print(f"Indexed {len(graph.chapters)} chapter(s) in {elapsed*1000:.1f} ms.")
+
+    if args.verbose:
+        for chapter in graph.chapters:
+            print(f"\n{chapter.name} ({chapter.number}: {chapter.title})")
+            for section in chapter.sections.values():
+                leads = ", ".join(f"{target}{f' [{" & ".join(guards)}]' if guards else ''}" for target, guards in section.leads_to) or "-"
+                print(f"  {section.name}{' (saved)' if section.saves else ''} -> {leads}")
+                if section.choices:
+                    print(f"    choices: {', '.join(section.choices)}")
+                if section.reads or section.writes:
+                    print(f"    reads: {', '.join(section.reads) or '-'}  writes: {', '.join(section.writes) or '-'}")
+
+    if args.reachable:
+        chapter, _, section = args.reachable.partition(":")
+        print(f"\nReachable from {chapter}:{section or 'start'}: {', '.join(sorted(graph.reachable(chapter, section or 'start')))}")
+
+    dead = graph.dead_sections()
+    missing = graph.missing_sections()
+    unset = graph.unset_flags()
+
+    print(f"\nDead sections ({len(dead)}):")
+    for chapter, section in dead:
+        print(f"  {chapter}:{section}")
+    print(f"Missing sections ({len(missing)}):")
+    for chapter, section, target, line in missing:
+        print(f"  {chapter}:{section} references '{target}' (line {line})")
+    print(f"Flags read but never set ({len(unset)}):")
+    for chapter, section, flag in unset:
+        print(f"  {chapter}:{section} reads '{flag}'")
+
+    sys.exit(1 if missing else 0)
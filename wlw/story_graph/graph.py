@@ -0,0 +1,255 @@
+"""
+Story graph.
+
+Holds the sections of every chapter, what each section leads to, the choices it offers and the persistent
+flags it reads and writes, as found by `wlw.story_graph.indexer`.
+"""
+import os
+import json
+import hashlib
+import logging
+from wlw.utils.logger import WLWLogger
+
+logging.setLoggerClass(WLWLogger)
+log = logging.getLogger("WLWLogger")
+log: WLWLogger
+
+GRAPH_CACHE_VERSION = 1
+
+class Section:
+    """
+    A single section (a method, or a script section) of a chapter.
+    """
+    def __init__(self, name: str, line: int = 0, saves: bool = False, leads_to: list[tuple[str, list[str]]] = None,
+                 choices: list[str] = None, reads: list[str] = None, writes: list[str] = None):
+        """
+        Args:
+            name (str): The section's name.
+            line (int): Where the section starts in the chapter's source.
+            saves (bool): Whether the section is saved upon entry (calls `set_section`), so it can be resumed.
+            leads_to (list[tuple[str, list[str]]]): Sections this section can continue to, each with the flags guarding the jump.
+            choices (list[str]): The ids of every choice the section offers.
+            reads (list[str]): Persistent flags the section reads.
+            writes (list[str]): Persistent flags the section writes.
+        """
+        self.name = name
+        self.line = line
+        self.saves = saves
+        self.leads_to = leads_to or []
+        self.choices = choices or []
+        self.reads = reads or []
+        self.writes = writes or []
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "line": self.line, "saves": self.saves, "leads_to": self.leads_to,
+                "choices": self.choices, "reads": self.reads, "writes": self.writes}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Section":
+        return cls(data["name"], data["line"], data["saves"], [(target, guards) for target, guards in data["leads_to"]],
+                   data["choices"], data["reads"], data["writes"])
+
+    def __repr__(self):
+        return f"<Section {self.name} (-> {[_[0] for _ in self.leads_to]})>"
+
+class ChapterGraph:
+    """
+    ChapterGraph class.
+
+    Every section of a single chapter, and how they connect. Problems found while indexing (such as
+    `set_section` being given a section that doesn't exist) are kept in `missing`.
+    """
+    def __init__(self, name: str, number: int, title: str, sections: dict[str, Section] = None, missing: list[tuple[str, str, int]] = None):
+        """
+        Args:
+            name (str): The chapter's module name.
+            number (int): The chapter's number.
+            title (str): The chapter's title.
+            sections (dict[str, Section]): The chapter's sections, by name.
+            missing (list[tuple[str, str, int]]): `(section, missing section, line)` for every reference to a section that doesn't exist.
+        """
+        self.name = name
+        self.number = number
+        self.title = title
+        self.sections = sections or {}
+        self.missing = missing or []
+
+    def reachable(self, start: str = "start") -> set[str]:
+        """
+        Find every section that can be reached from `start`.
+
+        Args:
+            start (str): The section to start from.
+
+        Returns:
+            set[str]: The names of every reachable section, including `start`.
+        """
+        seen = set()
+        pending = [start]
+        while pending:
+            name = pending.pop()
+            if name in seen or name not in self.sections:
+                continue
+            seen.add(name)
+            pending.extend(target for target, _ in self.sections[name].leads_to)
+        return seen
+
+    def dead(self) -> list[str]:
+        """
+        Find every section that can't be reached from the chapter's start.
+
+        Returns:
+            list[str]: The names of every unreachable section.
+        """
+        reachable = self.reachable()
+        return [_ for _ in self.sections if _ not in reachable]
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "number": self.number, "title": self.title,
+                "sections": [_.to_dict() for _ in self.sections.values()], "missing": self.missing}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ChapterGraph":
+        sections = [Section.from_dict(_) for _ in data["sections"]]
+        return cls(data["name"], data["number"], data["title"], {_.name: _ for _ in sections}, [tuple(_) for _ in data["missing"]])
+
+    def __repr__(self):
+        return f"<ChapterGraph {self.name} ({self.number}: {self.title}, {len(self.sections)} sections)>"
+
+class StoryGraph:
+    """
+    StoryGraph class.
+
+    The graphs of every chapter in the story, in order. Indexed chapters are cached by the hash of their
+    source, so re-indexing an unchanged story only has to hash it.
+    """
+    def __init__(self, cache_path: str = None):
+        """
+        Args:
+            cache_path (str | None): Where to cache indexed chapters. Nothing is cached if None.
+        """
+        self.cache_path = cache_path
+        self.chapters: list[ChapterGraph] = []
+
+        self.__cache: dict[str, dict] = {} # source digest: chapter graph
+        self.__used: set[str] = set() # digests of the chapters added so far
+        self.__cache_dirty = False
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with open(cache_path, "r") as f:
+                    data = json.load(f)
+                if data.get("version") == GRAPH_CACHE_VERSION:
+                    self.__cache = data["chapters"]
+            except (OSError, ValueError, KeyError) as e:
+                log.warning(f"Unable to read story graph cache '{cache_path}' ({e}), ignoring it.")
+
+    def add(self, name: str, source: str | bytes) -> ChapterGraph | None:
+        """
+        Index a chapter and add it to the story, using the cached graph if its source hasn't changed.
+
+        Args:
+            name (str): The chapter's module name.
+            source (str | bytes): The chapter's source.
+
+        Returns:
+            ChapterGraph | None: The chapter's graph, or None if it isn't a chapter.
+        """
+        from wlw.story_graph.indexer import index_chapter
+
+        if isinstance(source, str):
+            source = source.encode("utf-8")
+        digest = hashlib.sha256(name.encode("utf-8") + b"\0" + source).hexdigest()
+
+        if digest in self.__cache:
+            chapter = ChapterGraph.from_dict(self.__cache[digest])
+        else:
+            chapter = index_chapter(name, source)
+            if chapter is None:
+                return None
+            self.__cache[digest] = chapter.to_dict()
+            self.__cache_dirty = True
+
+        self.__used.add(digest)
+        self.chapters.append(chapter)
+        self.chapters.sort(key=lambda _: _.number)
+        return chapter
+
+    def add_directory(self, chapters_dir: str):
+        """
+        Index every chapter in a directory (excluding special files).
+
+        Args:
+            chapters_dir (str): The directory containing the chapters.
+        """
+        for file in sorted(os.listdir(chapters_dir)):
+            if file.endswith(".py") and file != "__init__.py":
+                with open(os.path.join(chapters_dir, file), "rb") as f:
+                    self.add(file.split('.')[0], f.read())
+
+    def save(self):
+        """
+        Write every indexed chapter to the cache, if anything new was indexed.
+        """
+        if not self.cache_path or not self.__cache_dirty:
+            return
+
+        # only keep what's still in use, so the cache doesn't grow forever
+        chapters = {digest: data for digest, data in self.__cache.items() if digest in self.__used}
+
+        with open(self.cache_path, "w") as f:
+            json.dump({"version": GRAPH_CACHE_VERSION, "chapters": chapters}, f)
+        self.__cache_dirty = False
+
+    def chapter(self, name: str) -> ChapterGraph:
+        """
+        Find a chapter by its module name or title.
+
+        Raises:
+            KeyError: No such chapter exists.
+        """
+        for chapter in self.chapters:
+            if name in (chapter.name, chapter.title):
+                return chapter
+        raise KeyError(f"No such chapter '{name}'.")
+
+    def reachable(self, chapter: str, section: str = "start") -> set[str]:
+        """
+        Find every section of `chapter` that can be reached from `section`.
+
+        Args:
+            chapter (str): The chapter's module name or title.
+            section (str): The section to start from.
+
+        Returns:
+            set[str]: The names of every reachable section.
+        """
+        return self.chapter(chapter).reachable(section)
+
+    def dead_sections(self) -> list[tuple[str, str]]:
+        """
+        Find every section, in every chapter, that can't be reached from its chapter's start.
+
+        Returns:
+            list[tuple[str, str]]: `(chapter, section)` for every unreachable section.
+        """
+        return [(chapter.name, section) for chapter in self.chapters for section in chapter.dead()]
+
+    def missing_sections(self) -> list[tuple[str, str, str, int]]:
+        """
+        Find every reference to a section that doesn't exist. Loading a save made in one would raise `SectionNotFoundError`.
+
+        Returns:
+            list[tuple[str, str, str, int]]: `(chapter, section, missing section, line)` for every missing section.
+        """
+        return [(chapter.name, *missing) for chapter in self.chapters for missing in chapter.missing]
+
+    def unset_flags(self) -> list[tuple[str, str, str]]:
+        """
+        Find every persistent flag that is read somewhere, but never written by any chapter.
+
+        Returns:
+            list[tuple[str, str, str]]: `(chapter, section, flag)` for every read of an unset flag.
+        """
+        written = {flag for chapter in self.chapters for section in chapter.sections.values() for flag in section.writes}
+        return [(chapter.name, section.name, flag) for chapter in self.chapters for section in chapter.sections.values()
+                for flag in section.reads if flag not in written]
@@ -0,0 +1,203 @@
+"""
+Story graph indexer.
+
+Builds a `ChapterGraph` from a chapter's source, without running it. Python chapters are read from their AST:
+every method of `Main` is a section, calling another method (`self.f_s1()`) leads to it, and `set_section`,
+`set_choices` and `self.manager.persistent` are tracked. Script chapters are read from their `SCRIPT` table.
+"""
+import ast
+from wlw.utils.chapter import read_chapter_metadata
+from wlw.story_graph.graph import ChapterGraph, Section
+
+BASE_METHODS = {"start", "pause"} # provided by Chapter, never sections of their own
+SKIPPED_METHODS = {"__init__"}
+
+def _is_self(node: ast.AST, *attrs: str) -> bool:
+    # whether node is `self.<attrs[0]>.<attrs[1]>...`
+    for attr in reversed(attrs):
+        if not (isinstance(node, ast.Attribute) and node.attr == attr):
+            return False
+        node = node.value
+    return isinstance(node, ast.Name) and node.id == "self"
+
+def _constant(node: ast.AST):
+    return node.value if isinstance(node, ast.Constant) else None
+
+class _SectionVisitor(ast.NodeVisitor):
+    """
+    Walks a single method, collecting what it leads to and which flags it touches.
+    """
+    def __init__(self, section: Section, methods: set[str]):
+        self.section = section
+        self.methods = methods
+        self.missing: list[tuple[str, int]] = [] # (missing section, line)
+        self.__guards: list[str] = [] # flags read by every enclosing `if`
+
+    def __flags(self, node: ast.AST) -> list[str]:
+        # persistent flags read anywhere within node
+        visitor = _SectionVisitor(Section(""), self.methods)
+        visitor.visit(node)
+        return visitor.section.reads
+
+    def __add(self, items: list, value):
+        if value is not None and value not in items:
+            items.append(value)
+
+    def visit_If(self, node: ast.If):
+        self.visit(node.test)
+        guards = self.__flags(node.test)
+
+        self.__guards.extend(guards)
+        for child in node.body + node.orelse:
+            self.visit(child)
+        del self.__guards[len(self.__guards)-len(guards):]
+
+    visit_While = visit_If
+
+    def visit_Call(self, node: ast.Call):
+        func = node.func
+
+        if isinstance(func, ast.Attribute) and _is_self(func.value) and func.attr not in BASE_METHODS:
+            if func.attr in self.methods:
+                self.section.leads_to.append((func.attr, list(dict.fromkeys(self.__guards))))
+            else: # would raise an AttributeError once reached
+                self.missing.append((func.attr, node.lineno))
+        elif _is_self(func, "manager", "set_section") and len(node.args) >= 2:
+            name = _constant(node.args[1])
+            if name is not None:
+                self.section.saves = True
+                if name not in self.methods:
+                    self.missing.append((name, node.lineno))
+        elif _is_self(func, "renderer", "set_choices") and node.args and isinstance(node.args[0], ast.List):
+            for choice in node.args[0].elts:
+                if isinstance(choice, ast.Dict):
+                    for key, value in zip(choice.keys, choice.values):
+                        if key is not None and _constant(key) == "id":
+                            self.__add(self.section.choices, _constant(value))
+        elif _is_self(func, "manager", "persistent", "get") and node.args:
+            self.__add(self.section.reads, _constant(node.args[0]))
+
+        self.generic_visit(node)
+
+    def visit_Subscript(self, node: ast.Subscript):
+        if _is_self(node.value, "manager", "persistent"):
+            flag = _constant(node.slice)
+            if isinstance(node.ctx, ast.Store):
+                self.__add(self.section.writes, flag)
+            else:
+                self.__add(self.section.reads, flag)
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        if isinstance(node.target, ast.Subscript) and _is_self(node.target.value, "manager", "persistent"):
+            self.__add(self.section.reads, _constant(node.target.slice)) # reads before it writes
+        self.generic_visit(node)
+
+def _index_methods(chapter: ChapterGraph, main: ast.ClassDef):
+    methods = {_.name: _ for _ in main.body if isinstance(_, (ast.FunctionDef, ast.AsyncFunctionDef)) and _.name not in SKIPPED_METHODS}
+
+    for name, method in methods.items():
+        section = Section(name, method.lineno)
+        visitor = _SectionVisitor(section, set(methods))
+        for statement in method.body:
+            visitor.visit(statement)
+
+        chapter.sections[name] = section
+        chapter.missing.extend((name, missing, line) for missing, line in visitor.missing)
+
+def _index_script(chapter: ChapterGraph, main: ast.ClassDef):
+    script = None
+    for node in main.body:
+        if isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            if any(isinstance(_, ast.Name) and _.id == "SCRIPT" for _ in targets) and isinstance(node.value, ast.Dict):
+                script = node.value
+    if script is None:
+        return
+
+    # labels belong to the section they're in, so jumps can be mapped back to sections
+    owners = {}
+    bodies = {}
+    for key, value in zip(script.keys, script.values):
+        name = _constant(key)
+        if name is None or not isinstance(value, ast.List):
+            continue
+        owners[name] = name
+        bodies[name] = (key.lineno, [_ for _ in value.elts if isinstance(_, ast.Call) and isinstance(_.func, ast.Name)])
+        for call in bodies[name][1]:
+            if call.func.id == "label" and call.args:
+                owners[_constant(call.args[0])] = name
+
+    def args(call: ast.Call) -> list:
+        values = []
+        for arg in call.args:
+            try:
+                values.append(ast.literal_eval(arg))
+            except ValueError:
+                values.append(None)
+        return values
+
+    for name, (line, calls) in bodies.items():
+        section = Section(name, line, name != "start") # same as ScriptChapter, 'start' is never saved
+
+        def lead(target, node: ast.Call, guards: list[str] = None):
+            if target is None:
+                return
+            if target in owners:
+                section.leads_to.append((owners[target], guards or []))
+            else:
+                chapter.missing.append((name, target, node.lineno))
+
+        for call in calls:
+            values = args(call)
+            kind = call.func.id
+            keywords = {_.arg: _constant(_.value) for _ in call.keywords}
+
+            if kind == "goto" and values:
+                lead(values[0], call)
+            elif kind == "when" and len(values) >= 3:
+                if values[0] not in section.reads:
+                    section.reads.append(values[0])
+                lead(values[2], call, [values[0]])
+            elif kind == "choice" and values and values[0]:
+                for option in values[0]:
+                    if len(option) >= 3:
+                        section.choices.append(option[1])
+                        lead(option[2], call)
+                if (key := keywords.get("store", values[1] if len(values) > 1 else None)) and key not in section.writes:
+                    section.writes.append(key)
+            elif kind == "battle" and values:
+                for target in [*values[1:3], keywords.get("win"), keywords.get("lose")]:
+                    lead(target, call)
+            elif kind == "store" and values and values[0] not in section.writes:
+                section.writes.append(values[0])
+
+        chapter.sections[name] = section
+
+def index_chapter(name: str, source: str | bytes) -> ChapterGraph | None:
+    """
+    Build a chapter's graph from its source.
+
+    Args:
+        name (str): The chapter's module name.
+        source (str | bytes): The chapter's source.
+
+    Returns:
+        ChapterGraph | None: The chapter's graph, or None if it doesn't define its metadata and a `Main` class.
+    """
+    meta = read_chapter_metadata(source)
+    if not meta:
+        return None
+
+    main = next((_ for _ in ast.parse(source).body if isinstance(_, ast.ClassDef) and _.name == "Main"), None)
+    if main is None:
+        return None
+
+    chapter = ChapterGraph(name, *meta)
+    bases = {_.id if isinstance(_, ast.Name) else getattr(_, "attr", None) for _ in main.bases}
+    if "ScriptChapter" in bases:
+        _index_script(chapter, main)
+    else:
+        _index_methods(chapter, main)
+
+    return chapter
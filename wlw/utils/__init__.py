@@ -1,13 +1,23 @@
 """
 Utility classes and functions for WLW.
-"""
 
-from .character import Character
-from .manager import Manager
-from .chapter import Chapter
-from .renderer import Renderer
+Classes are only imported once they're first used.
+"""
+import importlib
 from .errors import *
 
 VERSION = "0.0.0"
 
+_LAZY = {
+    "Character": ".character",
+    "Manager": ".manager",
+    "Chapter": ".chapter",
+    "Renderer": ".renderer"
+}
+
 __all__ = ["Character", "Manager", "Chapter", "Renderer"]
+
+def __getattr__(name: str):
+    if name in _LAZY:
+        return getattr(importlib.import_module(_LAZY[name], __name__), name)
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
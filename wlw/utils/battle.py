@@ -3,17 +3,35 @@ from wlw.utils.character import Character
 from wlw.utils.errors import InvalidTargetError
 import random
 import copy
+import heapq
+import time
+from array import array
 
 class Buff:
     """
     Base class for all buffs.
+
+    Buffs only receive the hooks (`on_attack`, `on_attacked`, `on_turn`) they implement. By default,
+    these are the hook methods a subclass overrides, but they can be declared explicitly using `HOOKS`.
     """
+    HOOKS: frozenset[str] = frozenset()
+    HOOK_NAMES = ("on_attack", "on_attacked", "on_turn")
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        if "HOOKS" not in cls.__dict__:
+            cls.HOOKS = frozenset([_ for _ in cls.HOOK_NAMES if getattr(cls, _) is not getattr(Buff, _)])
+
     def __init__(self, name, description, buff_length: int = 1, hot: int = 1):
         self.__buff_length = buff_length
         self.__hot = hot
         self.__name = name
         self.__description = description
 
+        self.__owner = None # the character this buff was applied to, see `_attach`
+        self.__applied_at = 0
+
     @property
     def buff_length(self):
         """
@@ -22,7 +40,9 @@ class Buff:
         Returns:
             int: The buff's remaining length (in turns)
         """
-        return self.__buff_length
+        if self.__owner is None:
+            return self.__buff_length
+        return min(self.__buff_length, self.expires_at - self.__owner.turns_taken)
 
     @buff_length.setter
     def buff_length(self, to: int):
@@ -31,7 +51,13 @@ class Buff:
         except ValueError as e:
             raise TypeError(f"buff_length must be an 'int', not '{to.__class__.__name__}'.") from e
 
-        self.__buff_length = to
+        if self.__owner is None:
+            self.__buff_length = to
+        else: # restart the buff's clock with whatever heat it had left
+            self.__hot = self.hot
+            self.__buff_length = to
+            self.__applied_at = self.__owner.turns_taken
+            self.__owner._schedule_buff(self)
 
     @property
     def hot(self):
@@ -40,7 +66,29 @@ class Buff:
 
         Hot Buffs should not decrement per turn.
         """
-        return self.__hot
+        if self.__owner is None:
+            return self.__hot
+        return max(0, self.__hot - (self.__owner.turns_taken - self.__applied_at))
+
+    @property
+    def rng(self) -> random.Random:
+        """
+        The random number generator this buff should draw from.
+
+        Returns:
+            random.Random: The owner's battle generator, or the global `random` module if unattached.
+        """
+        return self.__owner.rng if self.__owner is not None else random
+
+    @property
+    def expires_at(self) -> int:
+        """
+        The owner's turn count at which this buff expires.
+
+        Returns:
+            int: The expiry turn.
+        """
+        return self.__applied_at + self.__hot + self.__buff_length
 
     @property
     def name(self):
@@ -62,6 +110,26 @@ class Buff:
         """
         return self.__description
 
+    def clone(self):
+        """
+        Create a fresh copy of this buff, to be applied to a character.
+
+        Buffs act as prototypes, so a shallow copy is enough. Buffs holding mutable state should override this.
+
+        Returns:
+            Buff: The copy.
+        """
+        out = copy.copy(self)
+        out.__owner = None
+        return out
+
+    def _attach(self, owner: "BattleCharacter"):
+        """
+        Attach the buff to `owner`, starting its clock from their current turn.
+        """
+        self.__owner = owner
+        self.__applied_at = owner.turns_taken
+
     def on_attack(self):
         """
         Should be called each time a character with this buff attacks.
@@ -80,16 +148,27 @@ class Buff:
         """
         return original_damage * 1
 
+    def damage_outcomes(self, original_damage: int) -> list[tuple[float, int]]:
+        """
+        Every possible result of `on_attacked`, with its probability.
+
+        Used by AI to predict damage without rolling any dice. Buffs with random effects should override this.
+
+        Args:
+            original_damage (int): The attack's original damage.
+
+        Returns:
+            list[tuple[float, int]]: (probability, damage) pairs.
+        """
+        return [(1.0, self.on_attacked(original_damage))]
+
     def on_turn(self):
         """
         Should be called each time a character uses a turn.
 
-        Ideally, also decrements the `__buff_length` count.
+        Expiry is handled by the character, so this doesn't need to touch `buff_length`.
         """
-        if self.__hot <= 0:
-            self.__buff_length -= 1
-        else:
-            self.__hot -= 1
+        pass
 
 class Target(Enum):
     """
@@ -152,8 +231,15 @@ class BattleCharacter(Character):
             raise TypeError(f"Hitpoints must be 'int', not '{hitpoints.__class__.__name__}'") from e
         
         self.__hitpoints = hitpoints
+        self.__hp_store = None # external hitpoint storage, see `_bind_hitpoints`
+        self.__hp_index = 0
         self.__attacks = []
         self.__buffs: list[Buff] = []
+        self.__buff_hooks: dict[str, list[Buff]] = {_: [] for _ in Buff.HOOK_NAMES} # buffs listening to each hook
+        self.__buff_expiry: list[tuple[int, int, Buff]] = [] # min-heap of (expires_at, sequence, buff)
+        self.__buff_sequence = 0 # tie breaker, so buffs never need to be compared
+        self.__turns_taken = 0
+        self.__rng = random # set by the Battle this character joins
 
     @property
     def attacks(self):
@@ -163,6 +249,32 @@ class BattleCharacter(Character):
     def buffs(self):
         return self.__buffs
 
+    @property
+    def rng(self) -> random.Random:
+        """
+        The random number generator of the battle this character is part of.
+
+        Returns:
+            random.Random: The battle's generator, or the global `random` module outside of battles.
+        """
+        return self.__rng
+
+    def _join_battle(self, rng: random.Random):
+        """
+        Make the character (and their buffs) draw from `rng`.
+        """
+        self.__rng = rng
+
+    @property
+    def turns_taken(self) -> int:
+        """
+        How many turns this character has had, used to time buffs.
+
+        Returns:
+            int: The character's turn count.
+        """
+        return self.__turns_taken
+
     @property
     def hitpoints(self):
         """
@@ -171,6 +283,8 @@ class BattleCharacter(Character):
         Returns:
             int: The character's remaining hitpoints.
         """
+        if self.__hp_store is not None:
+            return int(self.__hp_store[self.__hp_index])
         return self.__hitpoints
 
     @property
@@ -190,16 +304,40 @@ class BattleCharacter(Character):
         except ValueError as e:
             raise TypeError(f"Hitpoints must be 'int', not '{to.__class__.__name__}'") from e
 
+        if self.__hp_store is not None:
+            self.__hp_store[self.__hp_index] = self.__hitpoints
+
+    def _bind_hitpoints(self, store, index: int):
+        """
+        Store the character's hitpoints in `store[index]` instead of on the character itself.
+
+        Used by array backed battles, so hitpoints can be updated in bulk without going out of sync.
+
+        Args:
+            store: Any mutable sequence of ints, such as an `array` or NumPy array.
+            index (int): The character's slot in `store`.
+        """
+        store[index] = self.hitpoints
+        self.__hp_store = store
+        self.__hp_index = index
+
+    def _unbind_hitpoints(self):
+        """
+        Move the character's hitpoints back out of their external storage.
+        """
+        self.__hitpoints = self.hitpoints
+        self.__hp_store = None
+
     def damage(self, hitpoints: int):
         """
         Damage a character for `hitpoints`.
 
-        Automatically triggers any buffs listening for `on_attacked`.
+        Automatically triggers any buffs listening for `on_attacked`, each one receiving
+        the damage as modified by the buffs before it.
         """
         new = hitpoints
-        if self.__buffs:
-            for buff in self.__buffs:
-                new = buff.on_attacked(hitpoints)
+        for buff in self.__buff_hooks["on_attacked"]:
+            new = buff.on_attacked(new)
 
         self.hitpoints -= new
 
@@ -207,12 +345,64 @@ class BattleCharacter(Character):
         """
         Add a Buff to a character.
 
-        Copies `buff`, then adds it the the character's buff list.
+        Clones `buff`, then adds it the the character's buff list.
         """
         if not isinstance(buff, Buff):
             raise TypeError(f"Buff {buff} is not a valid Buff object.")
-        
-        self.__buffs.append(copy.deepcopy(buff))
+
+        buff = buff.clone()
+        buff._attach(self)
+
+        self.__buffs.append(buff)
+        for hook in buff.HOOKS:
+            self.__buff_hooks[hook].append(buff)
+        self._schedule_buff(buff)
+
+    def remove_buff(self, buff: Buff):
+        """
+        Remove a Buff from a character.
+
+        Raises:
+            ValueError: The character doesn't have this buff.
+        """
+        self.__buffs.remove(buff)
+        for hook in buff.HOOKS:
+            self.__buff_hooks[hook].remove(buff)
+
+    def _schedule_buff(self, buff: Buff):
+        """
+        (Re)schedule a buff's expiry. Outdated entries are skipped once they're popped.
+        """
+        self.__buff_sequence += 1
+        heapq.heappush(self.__buff_expiry, (buff.expires_at, self.__buff_sequence, buff))
+
+    def _trigger_attack(self):
+        """
+        Trigger every buff listening for `on_attack`.
+        """
+        for buff in self.__buff_hooks["on_attack"]:
+            buff.on_attack()
+
+    def _tick_buffs(self) -> list[Buff]:
+        """
+        Advance the character's turn, triggering every buff listening for `on_turn`, and remove any buffs that expired.
+
+        Returns:
+            list[Buff]: The buffs that expired.
+        """
+        self.__turns_taken += 1
+
+        for buff in self.__buff_hooks["on_turn"]:
+            buff.on_turn()
+
+        expired = []
+        while self.__buff_expiry and self.__buff_expiry[0][0] <= self.__turns_taken:
+            expires_at, _, buff = heapq.heappop(self.__buff_expiry)
+            if expires_at == buff.expires_at and buff in self.__buffs: # skip rescheduled/removed buffs
+                self.remove_buff(buff)
+                expired.append(buff)
+
+        return expired
 
     def set_attacks(self, attacks: list[Attack]):
         for atk in attacks:
@@ -230,7 +420,16 @@ class BattleCharacter(Character):
 
 
 class Battle:
-    def __init__(self, allies: list[BattleCharacter], foes: list[BattleCharacter]):
+    """
+    Battle class.
+
+    Owns seeded random number generators that every buff (`rng`) and AI (`ai_rng`) should draw from, and logs
+    every turn as (actor, attack, target) indexes, so a battle can be replayed exactly using `replay`.
+
+    Decisions and outcomes use separate generators, so replaying the logged decisions reproduces
+    the same outcomes.
+    """
+    def __init__(self, allies: list[BattleCharacter], foes: list[BattleCharacter], seed: int = None, foe_ai = None):
         for ally in allies:
             if not isinstance(ally, BattleCharacter):
                 raise TypeError(f"Ally '{ally}' is not a BattleCharacter object!")
@@ -238,11 +437,27 @@ class Battle:
             if not isinstance(foe, BattleCharacter):
                 raise TypeError(f"Foe '{foe}' is not a BattleCharacter object!")
 
-        self.__display = {"text": "", "length": 0.0}
+        self.__display = {"text": "", "deadline": 0.0}
+        self.__listeners = []
         self.__allies = allies
         self.__foes = foes
         self.__turn = 0
 
+        # the teams are fixed once the battle starts, so party order/teams can be looked up instead of searched
+        self.__party = allies+foes
+        self.__index = {id(char): i for i, char in enumerate(self.__party)}
+        self.__team = {id(char): 0 for char in allies} | {id(char): 1 for char in foes}
+
+        self.__rng = random.Random()
+        self.__ai_rng = random.Random()
+        self.reseed(seed)
+
+        self.__foe_ai = foe_ai
+        self.__actions = array("h") # flat (actor, attack, target) triplets, one per turn
+        self.__pending = None # the current turn's action, logged once the turn ends
+        for char in self.__party:
+            char._join_battle(self.__rng)
+
     @property
     def allies(self):
         return self.__allies
@@ -255,39 +470,159 @@ class Battle:
     def turn(self):
         return self.__turn
 
+    @property
+    def rng(self) -> random.Random:
+        """
+        The battle's random number generator.
+
+        Returns:
+            random.Random: The generator.
+        """
+        return self.__rng
+
+    @property
+    def foe_ai(self):
+        """
+        The AI that decides what foes do on their turn.
+
+        Returns:
+            FoeAI: The battle's foe AI. Defaults to `RandomAI`.
+        """
+        if self.__foe_ai is None:
+            from wlw.utils.battle_ai import RandomAI # battle_ai depends on this module
+            self.__foe_ai = RandomAI()
+        return self.__foe_ai
+
+    @foe_ai.setter
+    def foe_ai(self, to):
+        self.__foe_ai = to
+
+    @property
+    def ai_rng(self) -> random.Random:
+        """
+        The random number generator for decisions (AI, policies).
+
+        Returns:
+            random.Random: The generator.
+        """
+        return self.__ai_rng
+
+    def reseed(self, seed: int = None):
+        """
+        Reseed the battle's generators.
+
+        Args:
+            seed (int | None): The new seed. If None, the generators are seeded randomly.
+        """
+        self.__rng.seed(seed)
+        self.__ai_rng.seed(None if seed is None else f"{seed}:ai")
+
+    @property
+    def actions(self) -> list[tuple[int, int, int]]:
+        """
+        Every completed turn, as (actor, attack, target) indexes.
+
+        Skipped turns have an attack and target of -1.
+
+        Returns:
+            list[tuple[int, int, int]]: The action log.
+        """
+        return [tuple(self.__actions[i:i+3]) for i in range(0, len(self.__actions), 3)]
+
+    @property
+    def party(self) -> list[BattleCharacter]:
+        """
+        Every character in the battle, in turn order (allies, then foes).
+
+        Returns:
+            list[BattleCharacter]: The battle party.
+        """
+        return self.__party
+
+    def index_of(self, character: BattleCharacter) -> int:
+        """
+        Get a character's position in the battle party.
+
+        Args:
+            character (BattleCharacter): The character.
+
+        Returns:
+            int: The character's index in `party`.
+
+        Raises:
+            ValueError: The character isn't part of this battle.
+        """
+        try:
+            return self.__index[id(character)]
+        except KeyError:
+            raise ValueError(f"Character '{character.name}' is not part of this battle!") from None
+
+    def team_of(self, character: BattleCharacter) -> int:
+        """
+        Get a character's team.
+
+        Returns:
+            int: 0 for allies, 1 for foes.
+        """
+        return self.__team[id(character)]
+
+    def subscribe(self, callback):
+        """
+        Listen for changes to the battle.
+
+        `callback` is called with the event's name, followed by its arguments:
+            - "changed" (character): A character's hitpoints or buffs changed.
+            - "turn" (old, new): The turn moved from index `old` to index `new`.
+            - "display" (text): The display message changed.
+
+        Args:
+            callback (Callable): The function to call.
+        """
+        self.__listeners.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Stop `callback` from listening for changes to the battle.
+        """
+        if callback in self.__listeners:
+            self.__listeners.remove(callback)
+
+    def _emit(self, event: str, *args):
+        for callback in self.__listeners:
+            callback(event, *args)
+
     def set_display(self, text: str, length: int) -> None:
         """
         Set the current "display" message.
         
         Args:
             text (str): The display message.
-            length (int): How long the message should be up for.
+            length (int): How long the message should be up for, in seconds.
         """
         self.__display["text"] = text
-        self.__display["length"] = length
+        self.__display["deadline"] = time.monotonic() + length
+        self._emit("display", text)
 
 
-    def get_display(self, decrement: float = 0.0) -> tuple[str, float]:
+    def get_display(self) -> tuple[str, float]:
         """
         Get the current set "display" message for the battle.
 
-        If `decrement` is set, will automatically decrement the timer.
+        Messages are timed using a monotonic clock, so they last just as long no matter how often this is called.
 
         Automatically clears any expired messages.
 
-        Args:
-            decrement (float): Decrement internal timer.
-
         Returns:
-            tuple[str, int]: The current display message.
+            tuple[str, float]: The current display message, and how long it has left (in seconds).
         """
+        remaining = self.__display["deadline"] - time.monotonic()
 
-        if decrement and self.__display["length"] > 0:
-            self.__display["length"] = self.__display["length"] - decrement
-        elif self.__display["length"] < 0:
-            self.set_display("", 0)
+        if remaining <= 0:
+            if self.__display["text"]:
+                self.set_display("", 0)
+            return self.__display["text"], 0.0
 
-        return self.__display["text"], self.__display["length"]
+        return self.__display["text"], remaining
 
     def find_foe(self, foe_name: str):
         """
@@ -302,6 +637,30 @@ class Battle:
         
         raise ValueError(f"No such foe with name '{foe_name}'")
 
+    def valid_targets(self, actor: BattleCharacter, attack: Attack) -> list[BattleCharacter]:
+        """
+        Get every living character `actor` can target using `attack`.
+
+        Args:
+            actor (BattleCharacter): The attacking character.
+            attack (Attack): The attack to use.
+
+        Returns:
+            list[BattleCharacter]: All valid targets.
+        """
+        living = [_ for _ in self.__party if _.alive]
+
+        if attack.target in [Target.FOE, Target.A_FOE]:
+            return [_ for _ in living if not self._on_same_team(_, actor)]
+        elif attack.target in [Target.ALLY, Target.A_ALLY]:
+            return [_ for _ in living if self._on_same_team(_, actor)]
+        elif attack.target == Target.SELF:
+            return [actor]
+        elif attack.target == Target.OTHER:
+            return [_ for _ in living if _ is not actor]
+        else:
+            return living
+
     def _on_same_team(self, a: BattleCharacter, b: BattleCharacter) -> bool:
         """
         Check if `a` is on the same team as `b`.
@@ -309,20 +668,24 @@ class Battle:
         Returns:
             bool: Whether both characters exist on the same team.
         """
-        if (a in self.__allies and b in self.__allies) or (a in self.__foes and b in self.__foes):
-            return True
-        return False
+        return self.__team.get(id(a), -1) == self.__team.get(id(b), -2)
 
     def next_turn(self):
         """
             Increment the internal turn counter.
         """
-        battle_party = self.__allies+self.__foes
+        self.__actions.extend(self.__pending if self.__pending else (self.__turn, -1, -1))
+        self.__pending = None
 
+        old = self.__turn
         self.__turn += 1
-        self.__turn %= len(battle_party)
+        self.__turn %= len(self.__party)
 
-        self._trigger_turn(battle_party[self.__turn])
+        self._trigger_turn(self.__party[self.__turn])
+
+        if self.__listeners:
+            self._emit("turn", old, self.__turn)
+            self._emit("changed", self.__party[self.__turn]) # buffs have ticked down
 
     def _trigger_turn(self, character: BattleCharacter):
         """
@@ -330,10 +693,7 @@ class Battle:
         """
         # print(f"TURN: {character.name}")
 
-        for buff in character.buffs:
-            buff.on_turn()
-            if buff.buff_length <= 0:
-                character.buffs.remove(buff)
+        character._tick_buffs()
 
 
     def attack(self, whom: BattleCharacter, by: BattleCharacter, using: Attack):
@@ -342,6 +702,8 @@ class Battle:
 
         Buff attacks must have a target, even if they are type a_ally/a_foe, however damage will only be dealt if that Attack
         has any.
+
+        Area attacks are relative to `by`: a_ally hits everyone on their team, a_foe everyone on the other.
         """
         # print(f"{by.name} -> {whom.name} ({using.name})")
 
@@ -352,25 +714,55 @@ class Battle:
         elif (using.target == "self" and whom != by) or (using.target == "other" and whom == by):
             raise InvalidTargetError(f"Attack '{using.name}' ('{by.name}') cannot target '{whom.name}', only characters of type '{using.target.name}'")
 
-        # targets all allies
-        if using.target == Target.A_ALLY:
-            for ally in self.__allies:
-                ally.damage(using.damage)
-                
-                if using.buff:
-                    ally.add_buff(using.buff)
-        elif using.target == Target.A_FOE:
-            for foe in self.__foes:
-                foe.damage(using.damage)
-
-                if using.buff:
-                    foe.add_buff(using.buff)
+        self.__pending = (self.index_of(by), by.attacks.index(using), self.index_of(whom))
+        by._trigger_attack()
+
+        # targets an entire team
+        if using.target in [Target.A_ALLY, Target.A_FOE]:
+            team = self.team_of(by) if using.target == Target.A_ALLY else 1 - self.team_of(by)
+            self._attack_team(team, using)
+            changed = self.__allies if team == 0 else self.__foes
         elif using.target in [Target.ALLY, Target.FOE, Target.SELF, Target.OTHER]:
             whom.damage(using.damage)
 
             if using.buff:
                 whom.add_buff(using.buff)
+            changed = [whom]
+        else:
+            changed = []
+
+        if self.__listeners:
+            self._emit("changed", by) # `on_attack` buffs may have changed them
+            for char in changed:
+                self._emit("changed", char)
+
+
 
+    def replay(self, actions: list[tuple[int, int, int]]):
+        """
+        Replay logged actions, ending each turn after its action.
+
+        The battle must have been freshly created, with the same characters (in the same state) and seed as
+        the battle that logged them.
+
+        Args:
+            actions (list[tuple[int, int, int]]): The actions, as returned by `actions`.
+        """
+        for actor, attack, target in actions:
+            if attack >= 0:
+                by = self.__party[actor]
+                self.attack(self.__party[target], by, by.attacks[attack])
+            self.next_turn()
+
+    def _attack_team(self, team: int, using: Attack):
+        """
+        Apply an area attack to every character on `team`.
+        """
+        for char in (self.__allies if team == 0 else self.__foes):
+            char.damage(using.damage)
+
+            if using.buff:
+                char.add_buff(using.buff)
 
 
 def create_units(name: str, sex: str, hitpoints: int, attacks: list[Attack], i: int = 1) -> list[BattleCharacter]:
@@ -401,12 +793,15 @@ class EvadeBuff(Buff):
     def on_attacked(self, original_damage):
         # print(f"attacked! ({self.name}:{original_damage})")
 
-        if random.randint(1, 3) == 1:
+        if self.rng.randint(1, 3) == 1:
             # print("evade!")
             return 0
         else:
             return original_damage
 
+    def damage_outcomes(self, original_damage):
+        return [(1/3, 0), (2/3, original_damage)]
+
 
 class WeakenedBuff(Buff):
     def __init__(self, buff_length = 1):
@@ -0,0 +1,341 @@
+"""
+Foe AI for WLW battles.
+
+Every AI implements `FoeAI.choose`, picking an attack and a target for whichever character's turn it is.
+Smarter AIs search over a `BattleState`, a cheap snapshot of the battle that can be copied and advanced
+without touching the real characters (or rolling any of the battle's dice).
+"""
+import time
+from wlw.utils.battle import Battle, BattleCharacter, Attack, Buff, Target
+
+class FoeAI:
+    """
+    Base class for all foe AIs.
+
+    Assign one to `Battle.foe_ai` to change how foes behave.
+    """
+    def choose(self, battle: Battle, actor: BattleCharacter) -> tuple[Attack, BattleCharacter] | None:
+        """
+        Choose an attack and its target for `actor`.
+
+        Should be overridden by any child classes.
+
+        Args:
+            battle (Battle): The ongoing battle.
+            actor (BattleCharacter): The character whose turn it is.
+
+        Returns:
+            tuple[Attack, BattleCharacter] | None: The attack and its target, or None to skip the turn.
+        """
+        raise NotImplementedError(f"AI '{self.__class__.__name__}' does not implement choose()!")
+
+class RandomAI(FoeAI):
+    """
+    Picks a random attack, then a random valid target for it, using the battle's `ai_rng`.
+    """
+    def choose(self, battle, actor):
+        if not actor.attacks:
+            return None
+
+        attack = actor.attacks[battle.ai_rng.randint(0, len(actor.attacks)-1)]
+        targets = battle.valid_targets(actor, attack)
+        if not targets:
+            return None
+
+        return attack, battle.ai_rng.choice(targets)
+
+class BattleState:
+    """
+    Snapshot of a battle, holding only what attacks can change.
+
+    States are immutable and hashable, so they can be shared between search branches and used as
+    transposition table keys.
+    """
+    __slots__ = ("turn", "hitpoints", "buffs")
+
+    def __init__(self, turn: int, hitpoints: tuple[float, ...], buffs: tuple[tuple[tuple[Buff, int], ...], ...]):
+        self.turn = turn
+        self.hitpoints = hitpoints
+        self.buffs = buffs # (buff, turns left) pairs per character
+
+    @classmethod
+    def capture(cls, battle: Battle) -> "BattleState":
+        """
+        Take a snapshot of `battle`.
+
+        Args:
+            battle (Battle): The battle to capture.
+
+        Returns:
+            BattleState: The battle's current state.
+        """
+        party = battle.party
+        return cls(battle.turn,
+                   tuple(_.hitpoints for _ in party),
+                   tuple(tuple((b, b.expires_at - c.turns_taken) for b in c.buffs) for c in party))
+
+    def key(self) -> tuple:
+        return (self.turn, self.hitpoints, self.buffs)
+
+class BattleModel:
+    """
+    Rules of a battle, applied to `BattleState`s instead of the real characters.
+
+    Chance (e.g. evading) is taken from each buff's `damage_outcomes`. Area attacks use the expected damage
+    per character instead of branching on every combination of outcomes.
+    """
+    def __init__(self, battle: Battle):
+        party = battle.party
+        self.size = len(party)
+        self.teams = tuple(battle.team_of(_) for _ in party)
+        self.attacks = tuple(tuple(_.attacks) for _ in party)
+
+    def winner(self, state: BattleState) -> int | None:
+        """
+        Get the team that won in `state`, if the battle is over.
+
+        Returns:
+            int | None: The winning team (0 for allies, 1 for foes), or None if both teams are still standing.
+        """
+        standing = set(self.teams[i] for i, hp in enumerate(state.hitpoints) if hp > 0)
+        if len(standing) == 2:
+            return None
+        return standing.pop() if standing else 1
+
+    def targets(self, state: BattleState, actor: int, attack: Attack) -> list[int]:
+        """
+        Get every valid target of `attack`. Area attacks only return one, since the target doesn't matter.
+        """
+        living = [i for i, hp in enumerate(state.hitpoints) if hp > 0]
+        team = self.teams[actor]
+
+        if attack.target in [Target.FOE, Target.A_FOE]:
+            out = [i for i in living if self.teams[i] != team]
+        elif attack.target in [Target.ALLY, Target.A_ALLY]:
+            out = [i for i in living if self.teams[i] == team]
+        elif attack.target == Target.SELF:
+            out = [actor]
+        elif attack.target == Target.OTHER:
+            out = [i for i in living if i != actor]
+        else:
+            out = living
+
+        if attack.target in [Target.A_ALLY, Target.A_FOE]:
+            return out[:1]
+        return out
+
+    def actions(self, state: BattleState, actor: int) -> list[tuple[int, int]]:
+        """
+        Get every (attack index, target index) pair available to `actor`.
+        """
+        return [(a, t) for a, attack in enumerate(self.attacks[actor]) for t in self.targets(state, actor, attack)]
+
+    def apply(self, state: BattleState, actor: int, action: tuple[int, int] | None) -> list[tuple[float, BattleState]]:
+        """
+        Apply `action` by `actor`, then move on to the next turn.
+
+        Args:
+            state (BattleState): The state to start from.
+            actor (int): The acting character's index.
+            action (tuple[int, int] | None): The attack and target indices, or None to skip the turn.
+
+        Returns:
+            list[tuple[float, BattleState]]: Every possible resulting state, with its probability.
+        """
+        if action is None:
+            return [(1.0, self.advance(state.turn, state.hitpoints, state.buffs))]
+
+        attack = self.attacks[actor][action[0]]
+        target = action[1]
+
+        if attack.target in [Target.A_ALLY, Target.A_FOE]:
+            team = self.teams[actor] if attack.target == Target.A_ALLY else 1 - self.teams[actor]
+            hitpoints = list(state.hitpoints)
+            buffs = list(state.buffs)
+            for i in range(self.size):
+                if self.teams[i] == team:
+                    hitpoints[i] -= sum(p * dmg for p, dmg in self.damage_outcomes(state.buffs[i], attack.damage))
+                    if attack.buff:
+                        buffs[i] = self.with_buff(buffs[i], attack.buff)
+            return [(1.0, self.advance(state.turn, tuple(hitpoints), tuple(buffs)))]
+
+        buffs = state.buffs
+        if attack.buff:
+            buffs = buffs[:target] + (self.with_buff(buffs[target], attack.buff),) + buffs[target+1:]
+
+        out = []
+        for p, dmg in self.damage_outcomes(state.buffs[target], attack.damage):
+            hitpoints = state.hitpoints[:target] + (state.hitpoints[target] - dmg,) + state.hitpoints[target+1:]
+            out.append((p, self.advance(state.turn, hitpoints, buffs)))
+        return out
+
+    def advance(self, turn: int, hitpoints: tuple, buffs: tuple) -> BattleState:
+        """
+        Move on to the next turn, ticking down the buffs of whoever's turn it is.
+        """
+        turn = (turn + 1) % self.size
+        ticked = tuple((b, left-1) for b, left in buffs[turn] if left > 1)
+        return BattleState(turn, hitpoints, buffs[:turn] + (ticked,) + buffs[turn+1:])
+
+    @staticmethod
+    def with_buff(buffs: tuple, buff: Buff) -> tuple:
+        return buffs + ((buff, buff.hot + buff.buff_length),)
+
+    @staticmethod
+    def damage_outcomes(buffs: tuple, damage: int) -> list[tuple[float, float]]:
+        """
+        Get every amount of damage `damage` could turn into after passing through `buffs`, with its probability.
+        """
+        outcomes = {damage: 1.0}
+        for buff, _ in buffs:
+            if "on_attacked" not in buff.HOOKS:
+                continue
+
+            new = {}
+            for dmg, p in outcomes.items():
+                for q, out in buff.damage_outcomes(dmg):
+                    new[out] = new.get(out, 0.0) + p * q
+            outcomes = new
+        return [(p, dmg) for dmg, p in outcomes.items()]
+
+class _SearchTimeout(Exception):
+    pass
+
+class GreedyAI(FoeAI):
+    """
+    Picks whichever action leaves its team best off right away, without looking any further ahead.
+    """
+    WIN_SCORE = 10000
+    ALIVE_SCORE = 10
+
+    def evaluate(self, model: BattleModel, state: BattleState, team: int) -> float:
+        """
+        Score `state` from `team`'s point of view. Higher is better.
+
+        Args:
+            model (BattleModel): The battle's rules.
+            state (BattleState): The state to score.
+            team (int): The team to score for.
+
+        Returns:
+            float: The state's score.
+        """
+        winner = model.winner(state)
+        if winner is not None:
+            return self.WIN_SCORE if winner == team else -self.WIN_SCORE
+
+        score = 0.0
+        for i, hp in enumerate(state.hitpoints):
+            if hp > 0:
+                score += (hp + self.ALIVE_SCORE) if model.teams[i] == team else -(hp + self.ALIVE_SCORE)
+        return score
+
+    def choose(self, battle, actor):
+        model = BattleModel(battle)
+        state = BattleState.capture(battle)
+        index = battle.index_of(actor)
+        team = model.teams[index]
+
+        best, best_score = None, None
+        for action in model.actions(state, index):
+            score = sum(p * self.evaluate(model, s, team) for p, s in model.apply(state, index, action))
+            if best_score is None or score > best_score:
+                best, best_score = action, score
+
+        return self._to_choice(battle, actor, best)
+
+    @staticmethod
+    def _to_choice(battle: Battle, actor: BattleCharacter, action: tuple[int, int] | None) -> tuple[Attack, BattleCharacter] | None:
+        if action is None:
+            return None
+        return actor.attacks[action[0]], battle.party[action[1]]
+
+class ExpectimaxAI(GreedyAI):
+    """
+    Depth-limited expectimax search.
+
+    The acting team maximises its score, the other team is assumed to minimise it, and chance outcomes
+    are averaged. Searches with iterative deepening until `max_depth` or `time_budget` is reached,
+    whichever comes first, sharing a transposition table between iterations.
+    """
+    def __init__(self, max_depth: int = 4, time_budget: float = 0.05):
+        """
+        Args:
+            max_depth (int): The furthest number of turns to look ahead.
+            time_budget (float): How long to search for per turn, in seconds.
+        """
+        self.max_depth = max_depth
+        self.time_budget = time_budget
+
+        self.__table: dict[tuple, float] = {}
+        self.__deadline = 0.0
+        self.__reached = 0
+        self.__nodes = 0
+
+    @property
+    def reached_depth(self) -> int:
+        """
+        How deep the last search got before it ran out of time.
+
+        Returns:
+            int: The last fully searched depth.
+        """
+        return self.__reached
+
+    def choose(self, battle, actor):
+        model = BattleModel(battle)
+        state = BattleState.capture(battle)
+        index = battle.index_of(actor)
+        team = model.teams[index]
+
+        actions = model.actions(state, index)
+        if not actions:
+            return None
+
+        self.__table = {}
+        self.__deadline = time.monotonic() + self.time_budget
+        self.__reached = 0
+        self.__nodes = 0
+
+        best = actions[0]
+        for depth in range(1, self.max_depth+1):
+            try:
+                scores = {action: self.__expect(model, model.apply(state, index, action), depth-1, team) for action in actions}
+            except _SearchTimeout:
+                break
+
+            best = max(actions, key=scores.__getitem__)
+            self.__reached = depth
+            actions.sort(key=scores.__getitem__, reverse=True) # search the best moves first next time
+
+        self.__table = {}
+        return self._to_choice(battle, actor, best)
+
+    def __expect(self, model: BattleModel, outcomes: list[tuple[float, BattleState]], depth: int, team: int) -> float:
+        return sum(p * self.__search(model, s, depth, team) for p, s in outcomes)
+
+    def __search(self, model: BattleModel, state: BattleState, depth: int, team: int) -> float:
+        if depth == 0 or model.winner(state) is not None:
+            return self.evaluate(model, state, team)
+
+        key = (state.key(), depth)
+        if key in self.__table:
+            return self.__table[key]
+
+        # only check the clock every so often, it's slower than the search itself
+        # the first depth always finishes, so there's a move to fall back to
+        self.__nodes += 1
+        if self.__nodes % 64 == 0 and self.__reached and time.monotonic() > self.__deadline:
+            raise _SearchTimeout
+
+        actor = state.turn
+        actions = model.actions(state, actor) if state.hitpoints[actor] > 0 else []
+
+        if not actions: # dead or stuck, the turn is skipped
+            score = self.__expect(model, model.apply(state, actor, None), depth-1, team)
+        else:
+            scores = [self.__expect(model, model.apply(state, actor, _), depth-1, team) for _ in actions]
+            score = max(scores) if model.teams[actor] == team else min(scores)
+
+        self.__table[key] = score
+        return score
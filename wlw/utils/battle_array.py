@@ -0,0 +1,115 @@
+"""
+Array backed battles for WLW.
+
+Keeps per-character battle state in flat arrays instead of on each character, so large encounters
+(such as those made with `create_units`) can be updated in bulk.
+
+Uses NumPy if it's installed, otherwise falls back to the `array` module.
+"""
+from array import array
+from wlw.utils.battle import Battle, BattleCharacter, Attack
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class ArrayBattle(Battle):
+    """
+    Battle that stores hitpoints, teams and buff counts as arrays.
+
+    Characters' `hitpoints` are bound to the battle's arrays, so they stay accurate while the battle
+    is running. Call `release` once the battle is over to move them back onto the characters.
+
+    Area attacks are applied as a single masked update to every character without buffs, only
+    characters with buffs are damaged one at a time.
+
+    Buffs still tick one character at a time, since each turn only advances the character whose turn it is.
+    Characters without buffs skip ticking entirely. Try it with `python -m wlw.battle_sim --array`.
+    """
+    def __init__(self, allies: list[BattleCharacter], foes: list[BattleCharacter], seed: int = None, foe_ai = None):
+        super().__init__(allies, foes, seed, foe_ai)
+
+        size = len(self.party)
+        if numpy:
+            self.hp = numpy.zeros(size, dtype=numpy.int64)
+            self.team = numpy.array([0]*len(allies) + [1]*len(foes), dtype=numpy.int8)
+            self.buff_count = numpy.zeros(size, dtype=numpy.int32)
+        else:
+            self.hp = array("q", [0]*size)
+            self.team = array("b", [0]*len(allies) + [1]*len(foes))
+            self.buff_count = array("l", [0]*size)
+
+        for i, char in enumerate(self.party):
+            char._bind_hitpoints(self.hp, i)
+            self.buff_count[i] = len(char.buffs)
+
+    @property
+    def alive(self):
+        """
+        Which characters are alive, by party index.
+
+        Returns:
+            A boolean mask (NumPy) or list of bools.
+        """
+        if numpy:
+            return self.hp > 0
+        return [_ > 0 for _ in self.hp]
+
+    def team_alive(self, team: int) -> bool:
+        """
+        Whether anyone on `team` is still alive.
+
+        Args:
+            team (int): 0 for allies, 1 for foes.
+        """
+        if numpy:
+            return bool(((self.team == team) & (self.hp > 0)).any())
+        return any([hp > 0 for hp, t in zip(self.hp, self.team) if t == team])
+
+    def release(self):
+        """
+        Unbind every character's hitpoints from the battle's arrays.
+        """
+        for char in self.party:
+            char._unbind_hitpoints()
+
+    def _attack_team(self, team: int, using: Attack):
+        party = self.party
+
+        if numpy:
+            members = self.team == team
+            self.hp[members & (self.buff_count == 0)] -= using.damage # characters without buffs take damage as-is
+            buffed = numpy.flatnonzero(members & (self.buff_count > 0))
+            targets = numpy.flatnonzero(members)
+        else:
+            targets = [i for i, t in enumerate(self.team) if t == team]
+            buffed = []
+            for i in targets:
+                if self.buff_count[i]:
+                    buffed.append(i)
+                else:
+                    self.hp[i] -= using.damage
+
+        for i in buffed: # buffs may change the damage, so these need to go through the character
+            party[i].damage(using.damage)
+
+        if using.buff:
+            for i in targets:
+                party[i].add_buff(using.buff)
+                self.buff_count[i] = len(party[i].buffs)
+
+    def attack(self, whom: BattleCharacter, by: BattleCharacter, using: Attack):
+        super().attack(whom, by, using)
+
+        if using.buff: # single target buffs
+            i = self.index_of(whom)
+            self.buff_count[i] = len(whom.buffs)
+
+    def _trigger_turn(self, character: BattleCharacter):
+        i = self.index_of(character)
+        if not self.buff_count[i]: # nothing to tick
+            return
+
+        super()._trigger_turn(character)
+        self.buff_count[i] = len(character.buffs)
@@ -0,0 +1,248 @@
+"""
+Retained battle scene for WLW.
+
+Keeps track of what is on screen during a battle, and only redraws the parts that changed. The battle
+pushes changes to the scene as events (see `Battle.subscribe`), so the scene never has to poll characters.
+"""
+from wlw.utils.battle import Battle, BattleCharacter
+from wlw.utils.renderer import Renderer
+
+class Panel:
+    """
+    A character's box on screen.
+    """
+    HEIGHT = 10
+
+    def __init__(self, character: BattleCharacter, index: int, team: int):
+        self.character = character
+        self.index = index
+        self.team = team
+
+        self.x = 0
+        self.y = 0
+        self.width = 0
+        self.dirty = True
+
+class BattleScene:
+    """
+    BattleScene class.
+
+    Draws the character panels, turn header, battle message, status bar and 'view' overlay of a battle,
+    each only when it is marked dirty.
+    """
+    def __init__(self, renderer: Renderer, battle: Battle):
+        """
+        Args:
+            renderer (Renderer): The renderer to draw with.
+            battle (Battle): The battle to draw. The scene subscribes to it until `close` is called.
+        """
+        self.renderer = renderer
+        self.battle = battle
+
+        self.__panels = [Panel(char, i, battle.team_of(char)) for i, char in enumerate(battle.party)]
+        self.__turns = 0 # turns played, for the header
+
+        self.__size = (0, 0)
+        self.__selected = 0
+        self.__status = ""
+        self.__viewing: BattleCharacter | None = None
+
+        self.__header_dirty = True
+        self.__message_dirty = True
+        self.__status_dirty = True
+        self.__view_dirty = True
+
+        battle.subscribe(self.__on_event)
+
+    @property
+    def selected(self) -> int:
+        """
+        The index of the currently selected character.
+
+        Returns:
+            int: The selected character's index.
+        """
+        return self.__selected
+
+    @selected.setter
+    def selected(self, to: int):
+        if to != self.__selected:
+            self.__panels[self.__selected].dirty = True
+            self.__panels[to].dirty = True
+            self.__selected = to
+
+    @property
+    def status(self) -> str:
+        """
+        The status bar's text.
+
+        Returns:
+            str: The status bar.
+        """
+        return self.__status
+
+    @status.setter
+    def status(self, to: str):
+        if to != self.__status:
+            self.__status = to
+            self.__status_dirty = True
+
+    @property
+    def viewing(self) -> BattleCharacter | None:
+        """
+        The character shown in the 'view' overlay, if any.
+
+        Returns:
+            BattleCharacter | None: The viewed character.
+        """
+        return self.__viewing
+
+    @viewing.setter
+    def viewing(self, to: BattleCharacter | None):
+        if to is not self.__viewing:
+            self.__viewing = to
+            self.renderer.stdscr.clear()
+            self.invalidate()
+
+    def invalidate(self):
+        """
+        Mark the entire scene as dirty, so it will be fully redrawn.
+        """
+        for panel in self.__panels:
+            panel.dirty = True
+        self.__header_dirty = self.__message_dirty = self.__status_dirty = self.__view_dirty = True
+
+    def resize(self, h: int, w: int):
+        """
+        Lay the scene out for an `h` by `w` screen. Does nothing if the size hasn't changed.
+        """
+        if (h, w) == self.__size:
+            return
+        self.renderer.stdscr.clear() # nothing is redrawn unless it's dirty, so leftovers would stay forever
+        self.__size = (h, w)
+
+        box_width = max([len(_.name) for _ in self.battle.party]) + 5 + len(str(len(self.__panels))) # auto resize based on maximum name length
+        for team, y in [(1, 0), (0, h-Panel.HEIGHT-1)]:
+            panels = [_ for _ in self.__panels if _.team == team]
+            box_offset = (w-(len(panels)*box_width))//(len(panels)+1)
+
+            x = box_offset
+            for panel in panels:
+                panel.x, panel.y, panel.width = x, y, box_width
+                x += box_width+box_offset
+
+        self.invalidate()
+
+    def close(self):
+        """
+        Stop listening to the battle.
+        """
+        self.battle.unsubscribe(self.__on_event)
+
+    def draw(self) -> bool:
+        """
+        Redraw every dirty part of the scene.
+
+        Returns:
+            bool: Whether anything was drawn.
+        """
+        self.battle.get_display() # expires the message, if it's due
+
+        drawn = False
+        if self.__viewing is not None:
+            if self.__view_dirty:
+                self.__draw_view()
+                drawn = True
+        else:
+            for panel in self.__panels:
+                if panel.dirty:
+                    self.__draw_panel(panel)
+                    drawn = True
+
+            if self.__header_dirty:
+                party = self.battle.party
+                self.__draw_centered(self.__size[0]//2-1, f"TURN {self.__turns+1} ({party[self.battle.turn].name})")
+                self.__header_dirty = False
+                drawn = True
+
+            if self.__message_dirty:
+                self.__draw_centered(self.__size[0]//2, f"{self.battle.get_display()[0]}")
+                self.__message_dirty = False
+                drawn = True
+
+        if self.__status_dirty:
+            self.renderer.place_line(0, self.__size[0]-1, self.__status)
+            self.renderer.stdscr.clrtoeol()
+            self.__status_dirty = False
+            drawn = True
+
+        return drawn
+
+    def __on_event(self, event: str, *args):
+        if event == "changed":
+            panel = self.__panels[self.battle.index_of(args[0])]
+            panel.dirty = True
+            if panel.character is self.__viewing:
+                self.__view_dirty = True
+        elif event == "turn":
+            self.__turns += 1
+            self.__panels[args[0]].dirty = True
+            self.__panels[args[1]].dirty = True
+            self.__header_dirty = True
+        elif event == "display":
+            self.__message_dirty = True
+
+    def __draw_centered(self, y: int, text: str):
+        self.renderer.stdscr.move(y, 0)
+        self.renderer.stdscr.clrtoeol()
+        self.renderer.place_line(self.__size[1]//2-len(text)//2, y, text)
+
+    def __draw_panel(self, panel: Panel):
+        char = panel.character
+        title = f"> {panel.index}:{char.name} <" if panel.index == self.battle.turn else f"{panel.index}:{char.name}"
+        if panel.index == self.__selected:
+            color = self.renderer.color_green_black if panel.team == 0 else self.renderer.color_red_black
+        else:
+            color = -1
+
+        x, y, width = panel.x, panel.y, panel.width
+        self.renderer.draw_box(x, y, x+width, y+Panel.HEIGHT)
+        self.renderer.place_line((x+1)+(width//2)-(len(title)//2), y+1, title, color=color)
+        self.renderer.place_line((x+1), y+2, "─"*width)
+        self.renderer.place_line((x+1), y+3, f"HP:{char.hitpoints}" if char.hitpoints > 0 else "!DOWN!")
+        self.renderer.place_line((x+1), y+5, "─"*width)
+
+        for b, buff in enumerate(char.buffs):
+            self.renderer.place_line((x+1), y+6+b, f"{buff.name}:{buff.buff_length}T")
+
+        panel.dirty = False
+
+    def __draw_view(self):
+        h, w = self.__size
+        padding_x, padding_y = 5, 2
+        display = self.__viewing
+
+        title_color = self.renderer.color_green_black if self.battle.team_of(display) == 0 else self.renderer.color_red_black
+        title = f"\"{display.name}\" ({self.battle.index_of(display)})"
+
+        self.renderer.draw_box(padding_x, padding_y, w-padding_x, h-padding_y)
+        self.renderer.place_line((w//2)-len(title)//2, padding_y+1, title, color=title_color) # title
+
+        self.renderer.place_line(padding_x+1, padding_y+3, "─"*(w-padding_x*2)) # line
+        stats_title = " STATS "
+        self.renderer.place_line((w//2)-(len(stats_title)//2), padding_y+3, stats_title)
+        self.renderer.place_line(padding_x+1, padding_y+4, f"HP:{display.hitpoints}") # HP
+
+        self.renderer.place_line(padding_x+1, padding_y+6, "─"*(w-padding_x*2)) # line
+        buff_title = " ACTIVE BUFFS "
+        self.renderer.place_line((w//2)-(len(buff_title)//2), padding_y+6, buff_title)
+        for i, buff in enumerate(display.buffs):
+            self.renderer.place_line(padding_x+1, padding_y+7+i, f"{i} - {buff.name}:{buff.buff_length}T")
+
+        self.renderer.place_line(padding_x+1, padding_y+8+len(display.buffs), "─"*(w-padding_x*2)) # line
+        atk_title = " ATTACKS "
+        self.renderer.place_line((w//2)-(len(atk_title)//2), padding_y+8+len(display.buffs), atk_title)
+        for i, atk in enumerate(display.attacks):
+            self.renderer.place_line(padding_x+1, padding_y+9+len(display.buffs)+i, f"{atk.name} ({atk.damage}/{atk.buff.name if atk.buff else "NONE"}): '{atk.description}'")
+
+        self.__view_dirty = False
@@ -1,7 +1,10 @@
 from wlw.utils.manager import Manager
 from wlw.utils.renderer import Renderer
-from wlw.utils.errors import ThreadError
+from wlw.utils.errors import ThreadError, ChapterLoadError
 import threading
+import time
+import inspect
+import ast
 
 class Chapter:
     """
@@ -26,6 +29,21 @@ class Chapter:
         Should be overridden by any child classes.
         """
         raise NotImplementedError(f"Chapter '{self.title}' does not implement start()!")
+
+    def pause(self, seconds: float):
+        """
+        Pause the chapter for `seconds`.
+
+        Should be used instead of `time.sleep`, since pauses are skipped while the
+        Manager's checkpoint is being replayed.
+
+        Args:
+            seconds (float): How long to pause for.
+        """
+        if self.manager.checkpoint.replaying:
+            return
+
+        time.sleep(seconds)
     
 class ChapterThread(threading.Thread):
     """
@@ -48,4 +66,91 @@ class ChapterThread(threading.Thread):
         super(ChapterThread, self).join(timeout)
         if self.exc:
             raise ThreadError("Chapter Thread crashed unexpectedly!") from self.exc
-        return self.ret
\ No newline at end of file
+        return self.ret
+
+
+class LazyChapter:
+    """
+    Stand-in for a chapter module that has not been loaded yet.
+
+    Exposes the chapter's metadata (`CHAPTER_NUMBER`, `CHAPTER_TITLE`) immediately, but only loads
+    the actual module once any other attribute (such as `Main`) is accessed.
+    """
+    def __init__(self, name: str, number: int, title: str, loader: callable):
+        """
+        Args:
+            name (str): The chapter's module name.
+            number (int): The chapter's number.
+            title (str): The chapter's title.
+            loader (callable): Called with no arguments to load the chapter's module.
+        """
+        self.__name__ = name
+        self.CHAPTER_NUMBER = number
+        self.CHAPTER_TITLE = title
+        self.__loader = loader
+        self.__module = None
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Whether the chapter's module has been loaded yet.
+        """
+        return self.__module is not None
+
+    @property
+    def module(self):
+        """
+        The chapter's module, loading it if required.
+
+        Raises:
+            ChapterLoadError: The module could not be loaded, or isn't a valid chapter.
+        """
+        if self.__module is None:
+            try:
+                module = self.__loader()
+            except Exception as e:
+                raise ChapterLoadError(f"Error loading chapter {self.__name__}: {e}") from e
+
+            if not (hasattr(module, 'Main') and inspect.isclass(module.Main) and issubclass(module.Main, Chapter)):
+                raise ChapterLoadError(f"{self.__name__} does not define a valid Main class inheriting from Chapter.")
+
+            self.__module = module
+
+        return self.__module
+
+    def __getattr__(self, item: str):
+        # only called for attributes we don't have, so metadata never triggers a load
+        if item.startswith("_LazyChapter__"):
+            raise AttributeError(item)
+        return getattr(self.module, item)
+
+    def __repr__(self):
+        return f"<LazyChapter {self.__name__} ({self.CHAPTER_NUMBER}: {self.CHAPTER_TITLE}, loaded: {self.loaded})>"
+
+def read_chapter_metadata(source: str | bytes) -> tuple[int, str] | None:
+    """
+    Read a chapter's `CHAPTER_NUMBER` and `CHAPTER_TITLE` constants from its source, without running it.
+
+    Both constants must be assigned literals at the module level.
+
+    Args:
+        source (str | bytes): The chapter's source code.
+
+    Returns:
+        tuple[int, str] | None: The chapter's number and title, or None if either is missing.
+    """
+    found = {}
+
+    for node in ast.parse(source).body:
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Name) and target.id in ["CHAPTER_NUMBER", "CHAPTER_TITLE"]:
+                try:
+                    found[target.id] = ast.literal_eval(node.value)
+                except ValueError:
+                    pass
+
+    if "CHAPTER_NUMBER" in found and "CHAPTER_TITLE" in found:
+        return found["CHAPTER_NUMBER"], found["CHAPTER_TITLE"]
+    return None
@@ -2,6 +2,7 @@
 Character class for WLW.
 """
 import time
+import bisect
 from enum import StrEnum
 from wlw.utils.errors import *
 from wlw.utils.formatting import format_line, get_format_max_length, FormatType
@@ -13,6 +14,21 @@ class Sex(StrEnum):
     MALE = "m"
     FEMALE = "f"
 
+_UNSET = object() # affinity level that hasn't been looked up yet
+
+def affinity_table(levels: dict[str, int]) -> tuple[tuple[int, ...], tuple[str, ...]]:
+    """
+    Sort affinity levels into a table that can be bisected.
+
+    Args:
+        levels (dict[str, int]): Each level's name, and the affinity it starts at.
+
+    Returns:
+        tuple[tuple[int, ...], tuple[str, ...]]: The thresholds in ascending order, and their level names.
+    """
+    ordered = sorted(levels.items(), key=lambda _: _[1])
+    return tuple(_[1] for _ in ordered), tuple(_[0] for _ in ordered)
+
 class Character:
     """
     Character class.
@@ -22,6 +38,18 @@ class Character:
     Special characters may be excluded from several functions, and should be used for characters such as the
     narrator or "system".
     """
+    AFFINITY_LEVELS = affinity_table({
+        "ADORED": 95,
+        "CHERISHED": 80,
+        "CLOSE": 50,
+        "TRUSTED": 20,
+        "NEUTRAL": 0,
+        "TENSE": -10,
+        "DISLIKED": -20,
+        "HATED": -50,
+        "DESPISED": -80
+    }) # shared by every character without tiers of their own
+
     def __init__(self, name: str, sex: Sex = Sex.MALE, affinity: int = 0, special: bool = False, hidden: bool = False):
         """
         Args:
@@ -52,19 +80,54 @@ class Character:
         self.__current_text_thought = False
         self.__current_text_lock = False
         self.__affinity = affinity
-        self.__AFFINITY_LEVELS = {
-            "ADORED": 95,
-            "CHERISHED": 80,
-            "CLOSE": 50,
-            "TRUSTED": 20,
-            "NEUTRAL": 0,
-            "TENSE": -10,
-            "DISLIKED": -20,
-            "HATED": -50,
-            "DESPISED": -80
-        }
+        self.__affinity_levels = None # custom tiers, see `set_affinity_levels`
+        self.__level = _UNSET # cached affinity level, cleared whenever affinity changes
         self.__inventory = []
         self.__special = special
+        self._manager = None # set by the Manager upon registration, never saved
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.pop("_manager", None) # runtime only, the Manager will re-bind on registration
+        state.pop("_Character__level", None)
+        return state
+
+    def __setstate__(self, state: dict):
+        # older saves kept a copy of the default levels on every character
+        levels = state.pop("_Character__AFFINITY_LEVELS", None)
+        if levels is not None and affinity_table(levels) != Character.AFFINITY_LEVELS:
+            state.setdefault("_Character__affinity_levels", affinity_table(levels))
+
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_Character__affinity_levels", None)
+        self._manager = None
+        self.__level = _UNSET
+
+    def __setattr__(self, name: str, value):
+        if name != "hidden" or not getattr(self, "_manager", None):
+            return super().__setattr__(name, value)
+
+        # revealing a character can be rolled back, and is a change like any other
+        self._manager._record(self, name, self.__dict__.get(name))
+        super().__setattr__(name, value)
+        self._manager._changed(self, name)
+
+    def _restore(self, key: str, old):
+        """
+        Undo a change journaled by the Manager's rollback stack.
+
+        Args:
+            key (str): 'affinity' or 'hidden'.
+            old: The value before the change.
+        """
+        if key == "affinity":
+            self.__affinity = old
+            self.__level = _UNSET
+        else:
+            super().__setattr__(key, old)
+
+        if self._manager:
+            self._manager._changed(self, key)
 
     @property
     def name(self):
@@ -113,19 +176,57 @@ class Character:
         For positive levels, the greatest value is returned.
         For negatives, the lowest is returned.
 
+        Looked up once per change to `affinity`, so it's cheap to read every frame.
+
         Returns:
-            str: Character's affinity level.
+            str | None: Character's affinity level, or None if no level covers their affinity.
         """
-        affinity = None
+        if self.__level is _UNSET:
+            thresholds, names = self.__affinity_levels or Character.AFFINITY_LEVELS
+            if self.__affinity >= 0: # the greatest level at or below it
+                i = bisect.bisect_right(thresholds, self.__affinity) - 1
+            else: # negatives are reversed, so the lowest level at or above it
+                i = bisect.bisect_left(thresholds, self.__affinity)
+            self.__level = names[i] if 0 <= i < len(names) else None
+
+        return self.__level
 
-        for level in self.__AFFINITY_LEVELS:
-            if self.__affinity >= 0 and self.__affinity >= self.__AFFINITY_LEVELS[level]:
-                return level
-            # negatives are reversed, so we want the last result.
-            elif self.__affinity < 0 and self.__affinity <= self.__AFFINITY_LEVELS[level]:
-                affinity = level
+    @property
+    def affinity_levels(self) -> dict[str, int]:
+        """
+        The character's affinity levels, and the affinity each starts at.
 
-        return affinity
+        Returns:
+            dict[str, int]: The levels, lowest first.
+        """
+        thresholds, names = self.__affinity_levels or Character.AFFINITY_LEVELS
+        return dict(zip(names, thresholds))
+
+    def set_affinity_levels(self, levels: dict[str, int], replace: bool = False):
+        """
+        Give the character affinity levels of their own.
+
+        Example:
+            ```python
+            self.emi.set_affinity_levels({"DEVOTED": 100, "CLOSE": 40})
+            ```
+
+        Args:
+            levels (dict[str, int]): Each level's name, and the affinity it starts at.
+            replace (bool): Whether to replace the default levels, instead of adding to (or overriding) them.
+
+        Raises:
+            TypeError: A threshold wasn't an 'int'.
+        """
+        for name, threshold in levels.items():
+            if not isinstance(threshold, int) or isinstance(threshold, bool):
+                raise TypeError(f"Threshold for affinity level '{name}' must be 'int', not '{threshold.__class__.__name__}'")
+
+        if not replace:
+            levels = {**self.affinity_levels, **levels}
+
+        self.__affinity_levels = affinity_table(levels) if levels else None
+        self.__level = _UNSET
 
     @property
     def affinity(self):
@@ -141,8 +242,14 @@ class Character:
     def affinity(self, to: int):
         if not isinstance(to, int):
             raise TypeError(f"Affinity value must be 'int', not '{to.__class__.__name__}'")
-    
+
+        if self._manager:
+            self._manager._record(self, "affinity", self.__affinity)
         self.__affinity = to
+        self.__level = _UNSET
+
+        if self._manager:
+            self._manager._changed(self, "affinity")
 
     @property
     def special(self):
@@ -171,6 +278,18 @@ class Character:
 
         return self.__current_text, self.__current_text_index, self.__current_text_thought
 
+    @property
+    def speaking(self) -> bool:
+        """
+        Whether the character is waiting on their current text to be read.
+
+        Locked text doesn't count, since it stays up until it's unlocked.
+
+        Returns:
+            bool: Whether unread, unlocked text is being shown.
+        """
+        return bool(self.__current_text) and not self.__current_text_lock
+
     @property
     def _is_locked(self) -> bool:
         """
@@ -208,6 +327,9 @@ class Character:
         self.__current_text_lock = False
         self._mark_read_text()
 
+        if self._manager:
+            self._manager.checkpoint.mark_line() # locked lines only count once they're released
+
     def _increment_speak_index(self, max: bool = False):
         """
         Increment the text index of the character's speech.
@@ -238,27 +360,42 @@ class Character:
         """
         self.__current_text = []
 
-    def speak(self, text: str, thought: bool = False, lock: bool = False) -> None:
+    def _reset_speech(self):
         """
-        Make a character 'speak'.
-
-        Sets the character's internal speech variables to `text`, then waits
-        for the text to be read, before returning.
+        Clear the character's speech and lock without marking anything as read, e.g. once the game is rolled back.
+        """
+        self.__current_text = []
+        self.__current_text_index = 0
+        self.__current_text_lock = False
 
-        If `lock` is set, this function will immediately return after locking the character's
-        speech.
+    def say(self, text: str, thought: bool = False, lock: bool = False) -> bool:
+        """
+        Make a character 'speak', without waiting for the text to be read.
 
-        If `thought` is set, the renderer will likely display it with italics instead of quotation marks.
+        Used by `speak`, and by anything that can't block, such as the script interpreter. Once `speaking`
+        is False, the text has been read and the line should be marked on the Manager's checkpoint (unless
+        it was locked, which marks it on unlock).
 
         Args:
             text (str): The text for the character to speak.
             thought (bool): Whether the text is a thought.
             lock (bool): Whether to lock the character's speech.
+
+        Returns:
+            bool: Whether the text is being shown. False while the checkpoint is being replayed, where the line is already complete.
         """
 
         if not isinstance(text, str):
             raise TypeError(f"Invalid type '{text.__class__.__name__}'. Expected 'str'")
 
+        checkpoint = self._manager.checkpoint if self._manager else None
+        if checkpoint and checkpoint.skip_line(): # fast-forwarding, nothing should be rendered
+            if lock:
+                self.lock_speech()
+            else:
+                checkpoint.mark_line()
+            return False
+
         fmt = format_line(text) # we need to format here since it's computationally expensive to run RegEx.
 
         self.__current_text = fmt
@@ -268,5 +405,35 @@ class Character:
         if lock:
             self.lock_speech()
 
-        while self.__current_text and not self.__current_text_lock:
+        return True
+
+    def speak(self, text: str, thought: bool = False, lock: bool = False) -> None:
+        """
+        Make a character 'speak'.
+
+        Sets the character's internal speech variables to `text`, then waits
+        for the text to be read, before returning.
+
+        If `lock` is set, this function will immediately return after locking the character's
+        speech.
+
+        If `thought` is set, the renderer will likely display it with italics instead of quotation marks.
+
+        While the Manager's checkpoint is being replayed, returns immediately without displaying anything.
+
+        Args:
+            text (str): The text for the character to speak.
+            thought (bool): Whether the text is a thought.
+            lock (bool): Whether to lock the character's speech.
+        """
+        if not self.say(text, thought, lock) or lock:
+            return
+
+        checkpoint = self._manager.checkpoint if self._manager else None
+        while self.speaking:
+            if checkpoint and checkpoint.interrupted:
+                raise ChapterInterrupt("The chapter was interrupted.")
             time.sleep(0.05)
+
+        if self._manager:
+            self._manager.checkpoint.mark_line()
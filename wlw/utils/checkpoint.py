@@ -0,0 +1,172 @@
+"""
+Intra-section checkpoints for WLW.
+
+Allows the game to resume from any line within a section, instead of only at its entrypoint.
+"""
+
+class Checkpoint:
+    """
+    Checkpoint class.
+
+    Tracks how far the game has progressed within the current section, using a line counter
+    and a log of every choice the user has made since the section started.
+
+    When restored, the section is replayed in a 'fast' mode (no rendering, no waiting) until the
+    checkpoint is reached, then control is handed back to the user.
+    """
+    def __init__(self, on_progress = None):
+        """
+        Args:
+            on_progress (callable | None): Called whenever a line or choice is completed, except while replaying.
+                Used by the Manager to tell whether there's anything new to save.
+        """
+        self.on_progress = on_progress
+
+        self.__line = 0 # completed lines in the current section
+        self.__choices: list[str] = [] # choices made in the current section
+
+        self.__target_line = 0 # line to fast-forward to
+        self.__target_choices: list[str] = [] # choices to replay, in order
+
+        self.__interrupted = False # set to stop the chapter thread wherever it's waiting
+
+    @property
+    def line(self) -> int:
+        """
+        How many lines have been completed in the current section.
+
+        Returns:
+            int: The completed line count.
+        """
+        return self.__line
+
+    @property
+    def choices(self) -> list[str]:
+        """
+        The choices made in the current section, in order.
+
+        Returns:
+            list[str]: The choice log.
+        """
+        return self.__choices
+
+    @property
+    def replaying(self) -> bool:
+        """
+        Whether the checkpoint is still being replayed.
+
+        Returns:
+            bool: True if lines or choices are still waiting to be fast-forwarded.
+        """
+        return self.__line < self.__target_line or len(self.__choices) < len(self.__target_choices)
+
+    @property
+    def interrupted(self) -> bool:
+        """
+        Whether the chapter has been asked to stop. Anything waiting on the user should raise `ChapterInterrupt`.
+
+        Returns:
+            bool: The interrupt status.
+        """
+        return self.__interrupted
+
+    def interrupt(self):
+        """
+        Ask the chapter to stop, wherever it's waiting.
+        """
+        self.__interrupted = True
+
+    def clear_interrupt(self):
+        """
+        Clear the interrupt, once the chapter has stopped.
+        """
+        self.__interrupted = False
+
+    def reset(self):
+        """
+        Reset the current position, usually upon entering a new section.
+
+        Does not clear any pending replay, since the section being replayed will call this as well.
+        """
+        self.__line = 0
+        self.__choices = []
+
+    def restore(self, data: dict):
+        """
+        Restore a checkpoint created by `dump`, preparing it to be replayed.
+
+        Args:
+            data (dict): The dumped checkpoint.
+        """
+        self.reset()
+        self.__target_line = data.get("line", 0)
+        self.__target_choices = list(data.get("choices", []))
+
+    def dump(self) -> dict:
+        """
+        Dump the checkpoint into a saveable format.
+
+        Returns:
+            dict: The line counter and choice log.
+        """
+        return {"line": self.__line, "choices": list(self.__choices)}
+
+    def skip_line(self) -> bool:
+        """
+        Check whether the next line should be skipped (fast-forwarded).
+
+        Skipped lines still need to be counted using `mark_line` once they complete.
+
+        Returns:
+            bool: Whether the line should be skipped.
+        """
+        if self.__line < self.__target_line:
+            return True
+
+        self.__check_reached()
+        return False
+
+    def mark_line(self):
+        """
+        Mark the current line as completed.
+        """
+        replayed = self.__line < self.__target_line
+        self.__line += 1
+        if self.on_progress and not replayed:
+            self.on_progress()
+
+    def replay_choice(self) -> str | None:
+        """
+        Get the next logged choice, if the checkpoint is still being replayed.
+
+        The choice is automatically added to the log again.
+
+        Returns:
+            str | None: The logged choice, or None if there is nothing left to replay.
+        """
+        if len(self.__choices) < len(self.__target_choices):
+            choice = self.__target_choices[len(self.__choices)]
+            self.__choices.append(choice)
+            return choice
+
+        self.__check_reached()
+        return None
+
+    def mark_choice(self, choice: str):
+        """
+        Log a choice made by the user.
+
+        Args:
+            choice (str): The choice's id.
+        """
+        self.__choices.append(choice)
+        if self.on_progress:
+            self.on_progress()
+
+    def __check_reached(self):
+        """
+        Drop the replay target once it has been fully reached, so later sections play normally.
+        """
+        if not self.replaying:
+            self.__target_line = 0
+            self.__target_choices = []
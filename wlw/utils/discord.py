@@ -5,6 +5,9 @@ import json
 import struct
 import socket
 import time
+import threading
+import queue
+import itertools
 from enum import Enum
 from wlw.utils.logger import WLWLogger
 from wlw.utils.errors import *
@@ -22,14 +25,20 @@ class RichPresence:
     Most functions will raise errors upon unexpected results, so ensure proper error handling is done when using this.
     """
     __socket: socket.socket
-    def __init__(self, client_id: str):
+    FRAME_HEADER = struct.Struct("<II") # OpCode, payload length
+
+    def __init__(self, client_id: str, ipc_path: str = None):
         """
         Automatically locates the Discord IPC socket and preps the client for RPC.
 
         Args:
             client_id (str): The client ID to use when communicating with Discord.
+            ipc_path (str | None): The IPC socket to use instead of Discord's, e.g. a `FakeDiscordServer`.
         """
-        if sys.platform == "linux":
+        if ipc_path:
+            self.__ipc_path = ipc_path
+            self.__rpc_supported = True
+        elif sys.platform == "linux":
             self.__ipc_path = os.path.join(os.getenv("XDG_RUNTIME_DIR", "/tmp"),  "discord-ipc-0")
             self.__rpc_supported = True
         else:
@@ -49,6 +58,11 @@ class RichPresence:
         self.__socket = None
         self.__last_payload = {}
 
+        self.__buffer = bytearray() # bytes received but not read yet
+        self.__nonces = itertools.count()
+        self.__responses: dict[str, tuple[int, dict]] = {} # responses that arrived while waiting on another nonce
+        self.__pending: set[str] = set()
+
         log.debug("Ready for RichPresence!")
 
     # properties
@@ -57,7 +71,7 @@ class RichPresence:
         """
         Whether the connection to the IPC socket is active and authenticated.
 
-        If the socket is available and supposedly authenticated, will attempt to reload the current activity.
+        If the socket is available and supposedly authenticated, will ping Discord to make sure.
         
         If any known errors occur, will assume the connection was broken.
 
@@ -69,13 +83,22 @@ class RichPresence:
             return False
         elif self.__socket and self.__authenticated == 1:
             try:
-                op, payload = self.reload_state()
-                return op == 1
+                return self.ping()
             except (socket.error, json.JSONDecodeError, struct.error, ConnectionError, BrokenPipeError, AuthenticationError) as e:
                 return False
         else:
             return False
 
+    @property
+    def connected(self) -> bool:
+        """
+        Whether the client is connected and authenticated, without checking with Discord.
+
+        Returns:
+            bool: Whether the connection is supposedly active.
+        """
+        return self.__socket is not None and self.__authenticated == 1
+
     @property
     def rpc_supported(self) -> bool:
         """
@@ -121,26 +144,7 @@ class RichPresence:
         Returns:
             tuple[int, dict] | None: Discord's response, if any.
         """
-        # assemble the payload
-        payload = {
-            "cmd": "SET_ACTIVITY",
-            "args": {
-                "pid": os.getpid(),
-                "activity": {
-                    "type": type.value,
-                    "state": state,
-                    "details": details,
-                    "timestamps": {
-                        "start": start if start else int(time.time())
-                    },
-                    "assets": {
-                        "large_image": large_image,
-                        "large_text": large_text
-                    }
-                }
-            },
-            "nonce": str(time.time())
-        }
+        payload = self._activity_payload(type, state, details, start, large_image, large_text)
 
         if not self.__can_rpc:
             # we can't update, but we should still save the intended payload
@@ -148,12 +152,12 @@ class RichPresence:
             return None
 
         try:
-            log.debug(f"Updating presence with payload: {payload}.")
-            self.__send_packet(1, payload)
+            log.event("rpc.update", payload=payload)
+            nonce = self._send_request(payload)
             self.__last_payload = payload
 
-            op, payload = self.__read_packet()
-            log.debug(f"Discord responded with OpCode '{op}'.")
+            op, payload = self._wait_response(nonce)
+            log.debug("Discord responded with OpCode '%s'.", op)
             return op, payload
         except (ConnectionError, BrokenPipeError) as e:
             log.warning(f"RPC failed to update with error: {e}. Disabling until further notice.")
@@ -176,14 +180,25 @@ class RichPresence:
         elif not self.__last_payload:
             raise ValueError("No last payload!")
 
-        log.debug(f"Reloading last presence state: {self.__last_payload}")
-        self.__send_packet(1, self.__last_payload)
-
-        op, payload = self.__read_packet()
-        log.debug(f"Discord responded with OpCode '{op}'.")
+        log.event("rpc.reload", payload=self.__last_payload)
+        op, payload = self._wait_response(self._send_request(self.__last_payload))
+        log.debug("Discord responded with OpCode '%s'.", op)
 
         return op, payload
 
+    def ping(self) -> bool:
+        """
+        Check the connection using a PING, which is much cheaper than resending the activity.
+
+        Returns:
+            bool: Whether Discord answered with a PONG.
+        """
+        if not self.__can_rpc:
+            return False
+
+        op, _ = self._wait_response(self._send_request({}, 3))
+        return op == 4
+
     def clear_state(self):
         """
         Sends an empty activity update to Discord, effectively clearing the presence.
@@ -201,22 +216,86 @@ class RichPresence:
             "args": {
                 "pid": os.getpid(),
                 "activity": None
-            },
-            "nonce": str(time.time())
+            }
         }
         log.debug("Clearing presence...")
-        self.__send_packet(1, payload)
+        nonce = self._send_request(payload)
 
         # we don't really need this, but the RPC server will error out if we close without reading
-        op, payload = self.__read_packet()
-        log.debug(f"Discord responded with '{op}'.")
+        op, payload = self._wait_response(nonce)
+        log.debug("Discord responded with '%s'.", op)
 
         self.__last_payload = {}
 
         return op, payload
 
+    def _activity_payload(self, type: ActivityType, state: str, details: str, start: int = None, large_image: str = None, large_text: str = None) -> dict:
+        """
+        Assemble a SET_ACTIVITY payload. See `set_state`.
+        """
+        return {
+            "cmd": "SET_ACTIVITY",
+            "args": {
+                "pid": os.getpid(),
+                "activity": {
+                    "type": type.value,
+                    "state": state,
+                    "details": details,
+                    "timestamps": {
+                        "start": start if start else int(time.time())
+                    },
+                    "assets": {
+                        "large_image": large_image,
+                        "large_text": large_text
+                    }
+                }
+            }
+        }
+
     # manual RPC functions
 
+    def _send_request(self, payload: dict, op: int = 1) -> str:
+        """
+        Send a command without waiting for its response, so several can be in flight at once.
+
+        Args:
+            payload (dict): The command. Given a fresh nonce, replacing any it already had.
+            op (int): The packet's OpCode, 1 (FRAME) for commands or 3 (PING) for pings.
+
+        Returns:
+            str: The request's nonce, to be passed to `_wait_response`.
+        """
+        nonce = str(next(self.__nonces))
+        self.__send_packet(op, payload | {"nonce": nonce})
+        self.__pending.add(nonce)
+        return nonce
+
+    def _wait_response(self, nonce: str) -> tuple[int, dict]:
+        """
+        Wait for the response to the request with `nonce`.
+
+        Responses to other requests that arrive first are kept until they're waited on.
+
+        Raises:
+            KeyError: No request with this nonce is waiting on a response.
+
+        Returns:
+            tuple[int, dict]: OpCode and Payload.
+        """
+        if nonce not in self.__pending:
+            raise KeyError(f"No request with nonce '{nonce}' is in flight!")
+
+        while nonce not in self.__responses:
+            op, payload = self.__read_packet()
+            other = payload.get("nonce") if isinstance(payload, dict) else None
+            if other in self.__pending:
+                self.__responses[other] = (op, payload)
+            else:
+                log.debug("Ignoring unexpected packet (OpCode '%s').", op)
+
+        self.__pending.discard(nonce)
+        return self.__responses.pop(nonce)
+
     def _connect(self) -> socket.socket | None:
         """
         Connect to the Discord IPC socket.
@@ -244,6 +323,7 @@ class RichPresence:
 
         if sock.fileno() != -1:
             self.__socket = sock
+            self.__clear_buffers()
             self.__can_rpc = True
             log.debug("Connection to IPC socket established!")
             return self.__socket
@@ -272,6 +352,20 @@ class RichPresence:
             self.__authenticated = -1
         self.__socket.close()
         self.__socket = None
+        self.__clear_buffers()
+
+    def _reset(self):
+        """
+        Drop the connection to the IPC socket without talking to Discord, usually after it broke.
+        """
+        if self.__socket:
+            try:
+                self.__socket.close()
+            except OSError:
+                pass
+        self.__socket = None
+        self.__authenticated = -1
+        self.__clear_buffers()
 
 
     def _authenticate(self):
@@ -325,8 +419,7 @@ class RichPresence:
 
         data = json.dumps(payload).encode('utf-8') # we can't send dict objects over socket
         # we need to convert these into binary first
-        length = struct.pack('<I', len(data))
-        packet = struct.pack('<I', op) + length + data
+        packet = self.FRAME_HEADER.pack(op, len(data)) + data
         
         self.__socket.sendall(packet)
 
@@ -341,9 +434,259 @@ class RichPresence:
         if not self.__socket:
             raise ConnectionError("IPC socket is not connected!")
 
-        op = struct.unpack('<I', self.__socket.recv(4))[0] # first four bytes are the OpCode
-        length = struct.unpack('<I', self.__socket.recv(4))[0] # next four bytes are the length of the payload
-        data = self.__socket.recv(length) # read the actual payload
+        op, length = self.FRAME_HEADER.unpack(self.__recv_exact(self.FRAME_HEADER.size)) # OpCode, then the length of the payload
+        data = self.__recv_exact(length) # read the actual payload
         payload = json.loads(data.decode('utf-8')) # decode into a dict we can use
 
         return op, payload
+
+    def __recv_exact(self, size: int) -> bytes:
+        """
+        Read exactly `size` bytes from the IPC socket, however many reads it takes.
+
+        Raises:
+            ConnectionError: The socket was closed before enough data arrived.
+        """
+        while len(self.__buffer) < size:
+            chunk = self.__socket.recv(max(65536, size - len(self.__buffer)))
+            if not chunk:
+                raise ConnectionError("IPC socket was closed mid-frame!")
+            self.__buffer += chunk
+
+        data = bytes(self.__buffer[:size])
+        del self.__buffer[:size]
+        return data
+
+    def __clear_buffers(self):
+        """
+        Forget any partially read frames and in-flight requests, they belong to the old connection.
+        """
+        self.__buffer.clear()
+        self.__responses.clear()
+        self.__pending.clear()
+
+
+class TokenBucket:
+    """
+    Simple token bucket rate limiter.
+
+    Holds up to `capacity` tokens, refilling at `rate` tokens per second. Each request takes one.
+    """
+    def __init__(self, capacity: float, rate: float):
+        self.capacity = capacity
+        self.rate = rate
+
+        self.__tokens = capacity
+        self.__updated = time.monotonic()
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+        self.__updated = now
+
+    def take(self) -> bool:
+        """
+        Take a token, if there are any.
+
+        Returns:
+            bool: Whether a token was taken.
+        """
+        self.__refill()
+        if self.__tokens >= 1:
+            self.__tokens -= 1
+            return True
+        return False
+
+    def wait_time(self) -> float:
+        """
+        How long until a token is available, in seconds.
+        """
+        self.__refill()
+        return max(0.0, (1 - self.__tokens) / self.rate)
+
+class PresenceWorker(threading.Thread):
+    """
+    Runs a RichPresence client on a background thread, so a slow or hung Discord never blocks the game.
+
+    Requests are put on a command queue. Only the latest `set_state` is ever sent, and only if it differs from
+    the activity Discord last acknowledged. Updates are rate limited using a token bucket (Discord allows 5 every
+    20 seconds), and the connection is checked every `ping_interval` seconds using a PING, reconnecting with
+    exponential backoff when it breaks.
+    """
+    ActivityType = RichPresence.ActivityType
+    RPC_ERRORS = (OSError, ConnectionError, AuthenticationError, json.JSONDecodeError, struct.error, ValueError, KeyError)
+
+    def __init__(self, rpc: RichPresence, ping_interval: float = 15, min_backoff: float = 1, max_backoff: float = 60, rate_limit: TokenBucket = None):
+        """
+        Args:
+            rpc (RichPresence): The client to run. Should not be used by anything else once the worker starts.
+            ping_interval (float): How often to check the connection, in seconds.
+            min_backoff (float): How long to wait before the first reconnect attempt, in seconds.
+            max_backoff (float): The longest to ever wait between reconnect attempts, in seconds.
+            rate_limit (TokenBucket | None): Limits how often the activity is updated. Defaults to 5 updates per 20 seconds.
+        """
+        super().__init__(name="rpc-worker", daemon=True)
+
+        self.rpc = rpc
+        self.ping_interval = ping_interval
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.rate_limit = rate_limit if rate_limit else TokenBucket(5, 5/20)
+
+        self.__commands = queue.SimpleQueue()
+        self.__lock = threading.Lock()
+        self.__state = None # latest requested state, sent (and resent after reconnecting) by the worker
+        self.__state_pending = False
+        self.__acknowledged = None # the last activity Discord accepted
+
+        self.__backoff = min_backoff
+        self.__next_attempt = 0.0
+        self.__next_ping = 0.0
+
+    @property
+    def connected(self) -> bool:
+        """
+        Whether the worker's client is supposedly connected to Discord.
+
+        Returns:
+            bool: Whether the client is connected and authenticated.
+        """
+        return self.rpc.connected
+
+    def set_state(self, type: RichPresence.ActivityType, state: str, details: str, start: int = None, large_image: str = None, large_text: str = None):
+        """
+        Request a new Presence state, replacing any request that hasn't been sent yet.
+
+        Takes the same arguments as `RichPresence.set_state`, but returns immediately. If `start` isn't
+        supplied, the current state's start is kept.
+        """
+        with self.__lock:
+            if not start:
+                start = self.__state[3] if self.__state else int(time.time())
+            self.__state = (type, state, details, start, large_image, large_text)
+            if self.__state_pending:
+                return
+            self.__state_pending = True
+
+        self.__commands.put("state")
+
+    def clear_state(self):
+        """
+        Request the Presence to be cleared.
+        """
+        with self.__lock:
+            self.__state = None
+            self.__state_pending = False
+        self.__commands.put("clear")
+
+    def stop(self, timeout: float = 2.0):
+        """
+        Clear the Presence, disconnect, and stop the worker.
+
+        Args:
+            timeout (float): How long to wait for the worker to finish, in seconds.
+        """
+        if self.is_alive():
+            self.__commands.put("stop")
+            self.join(timeout)
+
+    def run(self):
+        while True:
+            if not self.rpc.connected and self.rpc.rpc_supported and time.monotonic() >= self.__next_attempt:
+                self.__reconnect()
+
+            try:
+                command = self.__commands.get(timeout=self.__wait_time())
+            except queue.Empty:
+                command = None
+
+            if command == "stop":
+                break
+
+            try:
+                if command == "clear" and self.rpc.connected:
+                    self.rpc.clear_state()
+                    self.__acknowledged = None
+
+                self.__flush_state()
+
+                if self.rpc.connected and time.monotonic() >= self.__next_ping:
+                    self.__next_ping = time.monotonic() + self.ping_interval
+                    if not self.rpc.ping():
+                        log.debug("RPC connection was lost! Attempting to re-establish...")
+                        self.rpc._reset()
+            except self.RPC_ERRORS as e:
+                log.debug("RPC request failed (%s), reconnecting.", e)
+                self.rpc._reset()
+
+        try:
+            self.rpc._disconnect()
+        except self.RPC_ERRORS:
+            self.rpc._reset()
+
+    def __flush_state(self):
+        """
+        Send the latest requested state, unless it's already shown or the rate limit has been hit.
+        """
+        if not self.rpc.connected:
+            return
+
+        with self.__lock:
+            if not self.__state_pending:
+                return
+            payload = self.rpc._activity_payload(*self.__state)
+
+            activity = payload["args"]["activity"]
+            if activity == self.__acknowledged: # nothing changed
+                self.__state_pending = False
+                return
+            elif not self.rate_limit.take(): # try again once there's a token
+                return
+            self.__state_pending = False
+
+        log.event("rpc.update", payload=payload)
+        op, reply = self.rpc._wait_response(self.rpc._send_request(payload))
+        if op == 1 and reply.get("evt") != "ERROR":
+            self.__acknowledged = activity
+        else:
+            log.debug("Discord rejected the activity update: %s", reply)
+
+    def __wait_time(self) -> float | None:
+        """
+        How long the worker can wait for a command before it has to do something on its own.
+        """
+        now = time.monotonic()
+        if self.rpc.connected:
+            wait = self.__next_ping - now
+            if self.__state_pending:
+                wait = min(wait, self.rate_limit.wait_time())
+            return max(0.0, wait)
+        elif self.rpc.rpc_supported:
+            return max(0.0, self.__next_attempt - now)
+        return None # nothing to do but wait for commands
+
+    def __reconnect(self):
+        """
+        Attempt to (re)connect and authenticate, then queue the latest state to be restored.
+
+        Waits twice as long before the next attempt every time this fails.
+        """
+        try:
+            self.rpc._reset()
+            if self.rpc._connect() is None:
+                raise ConnectionError("IPC socket is unavailable.")
+            self.rpc._authenticate()
+        except self.RPC_ERRORS as e:
+            self.rpc._reset()
+            self.__next_attempt = time.monotonic() + self.__backoff
+            log.debug("Unable to connect to Discord (%s), retrying in %ss.", e, self.__backoff)
+            self.__backoff = min(self.__backoff * 2, self.max_backoff)
+            return
+
+        # Discord forgets the activity along with the connection
+        with self.__lock:
+            self.__acknowledged = None
+            self.__state_pending = self.__state is not None
+
+        self.__backoff = self.min_backoff
+        self.__next_ping = time.monotonic() + self.ping_interval
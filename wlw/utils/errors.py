@@ -49,3 +49,21 @@ class PlatformError(Exception):
     Platform not supported.
     """
     pass
+
+class ChapterLoadError(Exception):
+    """
+    The chapter could not be loaded.
+    """
+    pass
+
+class ChapterInterrupt(Exception):
+    """
+    The chapter was stopped while waiting on the user, e.g. to roll it back.
+    """
+    pass
+
+class PackageError(Exception):
+    """
+    The package is invalid, corrupt, or unsupported.
+    """
+    pass
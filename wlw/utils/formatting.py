@@ -6,6 +6,11 @@ Provides several useful methods and classes for formatting text in WLW.
 import re
 from enum import Enum
 
+FORMAT_CACHE_SIZE = 4096 # most lines are only ever formatted once per playthrough, but the cache is kept between launches
+
+_regex = None
+_format_cache: dict[str, list[tuple["FormatType", str|float]]] = {}
+
 class FormatType(Enum):
     """
     Formatting types that should be used for all format related functions.
@@ -38,13 +43,22 @@ def format_line(text: str):
     """
     Creates a list of tuples containing text styles from a string that can allow for formatted printing.
 
+    Results are cached, see `format_cache`.
+
     Args:
         text (str): The text to format.
 
     Returns:
         list[tuple[FormatType, str|float]]: The formatted text, split by formatting styles and their values.
     """
-    regex = FormatType.compile_regex() # get all of the compiled regex patterns for each format
+    global _regex
+
+    if text in _format_cache:
+        return list(_format_cache[text])
+
+    if _regex is None:
+        _regex = FormatType.compile_regex() # get all of the compiled regex patterns for each format
+    regex = _regex
 
     out = []
     pos = 0
@@ -79,7 +93,30 @@ def format_line(text: str):
             out.append((None, text[pos:]))
             break
 
-    return out
+    if len(_format_cache) < FORMAT_CACHE_SIZE:
+        _format_cache[text] = out
+    return list(out)
+
+def format_cache() -> dict[str, list[tuple[FormatType, str|float]]]:
+    """
+    Get every line `format_line` has cached.
+
+    Returns:
+        dict[str, list[tuple[FormatType, str|float]]]: Formatted lines, by their original text.
+    """
+    return _format_cache
+
+def preload_format_cache(lines: dict[str, list[tuple[FormatType, str|float]]]):
+    """
+    Fill `format_line`'s cache with lines formatted previously, e.g. in an earlier launch.
+
+    Args:
+        lines (dict[str, list[tuple[FormatType, str|float]]]): Formatted lines, by their original text.
+    """
+    for text, fmt in lines.items():
+        if len(_format_cache) >= FORMAT_CACHE_SIZE:
+            break
+        _format_cache.setdefault(text, fmt)
 
 def get_format_up_to(fmt: list[tuple[FormatType, str|float]], pos: int) -> list[tuple[FormatType, str|float]]:
     """
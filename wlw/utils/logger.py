@@ -1,37 +1,183 @@
+import atexit
 import logging
-import time
+import logging.handlers
+import multiprocessing
+import os
+import queue
 
-LOG_LEVEL = logging.DEBUG
+def _resolve_level(level: int | str) -> tuple[int | str, str | None]:
+    """
+    Check a level's name, falling back to DEBUG if it's unknown.
+
+    Args:
+        level (int | str): The level, either as a number or its name (e.g. "INFO").
+
+    Returns:
+        tuple[int | str, str | None]: The level to use, and the unknown name (if it was unknown).
+    """
+    if not isinstance(level, str):
+        return level, None
+    if level.upper() not in logging.getLevelNamesMapping():
+        return logging.DEBUG, level
+    return level.upper(), None
+
+LOG_LEVEL, _unknown_level = _resolve_level(os.environ.get("WLW_LOG_LEVEL", "DEBUG")) # warned about by the first WLWLogger
+LOG_PATH = "wlw.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024 # rotate once the log gets this big
+LOG_BACKUPS = 3
+LOG_FORMAT = '%(asctime)s:%(threadName)s/%(module)s/[%(levelname)s] - %(message)s'
+
+# one pipeline is shared by every WLWLogger, see `_get_queue_handler`
+_queue_handler: logging.handlers.QueueHandler | None = None
+_file_handler: logging.Handler | None = None
+_listener: logging.handlers.QueueListener | None = None
+
+class StructuredMessage:
+    """
+    A log message made up of an event name and fields, only formatted once it's written to the log.
+
+    Fields are formatted on the logging thread, so avoid passing objects that may still change.
+    """
+    __slots__ = ("event", "fields")
+
+    def __init__(self, event: str, fields: dict):
+        self.event = event
+        self.fields = fields
+
+    def __str__(self):
+        return " ".join([self.event] + [f"{key}={value!r}" for key, value in self.fields.items()])
+
+class WLWFormatter(logging.Formatter):
+    """
+    Formatter that writes records marked as `blank` as completely blank lines.
+    """
+    def format(self, record):
+        if getattr(record, "blank", False):
+            return ""
+        return super().format(record)
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves formatting to the listener thread, instead of formatting on the calling thread.
+    """
+    def prepare(self, record):
+        return record
+
+def _get_queue_handler() -> logging.handlers.QueueHandler:
+    """
+    Get the handler every WLWLogger logs through, starting the logging thread if needed.
+
+    Records are put on a queue and written to a rotating log file by a background QueueListener,
+    so logging never waits on disk.
+    """
+    global _queue_handler, _file_handler, _listener
+
+    if _queue_handler is None:
+        _file_handler = logging.handlers.RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding="utf-8", delay=True)
+        _file_handler.setFormatter(WLWFormatter(LOG_FORMAT))
+
+        # every run gets a fresh log, the last one is kept as a backup
+        # worker processes only append, otherwise they'd rotate the main process's log away
+        if multiprocessing.parent_process() is None and os.path.exists(LOG_PATH) and os.path.getsize(LOG_PATH):
+            _file_handler.doRollover()
+
+        log_queue = queue.SimpleQueue()
+        _queue_handler = _DeferredQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, _file_handler, respect_handler_level=True)
+        _listener.start()
+        atexit.register(stop_logging)
+
+    return _queue_handler
+
+class _DirectQueue:
+    """
+    Stand-in queue that writes records straight to the log file.
+    """
+    def put_nowait(self, record: logging.LogRecord):
+        _file_handler.handle(record)
+
+def _after_fork():
+    """
+    Forked processes (e.g. pool workers) don't inherit the logging thread, and usually exit without running
+    `atexit`, so they write to the log file directly instead.
+    """
+    global _listener
+
+    if _queue_handler is not None:
+        _listener = None
+        _queue_handler.queue = _DirectQueue()
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+def stop_logging():
+    """
+    Write out every queued record and stop the logging thread.
+
+    Called automatically on exit. Safe to call more than once.
+    """
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _file_handler is not None:
+        _file_handler.close()
+
+def set_level(level: int | str):
+    """
+    Change the level of every WLWLogger at runtime.
+
+    Args:
+        level (int | str): The new level, either as a number or its name (e.g. "INFO").
+    """
+    global LOG_LEVEL
+
+    LOG_LEVEL, unknown = _resolve_level(level)
+    loggers = [_ for _ in list(logging.Logger.manager.loggerDict.values()) if isinstance(_, WLWLogger)]
+    for logger in loggers:
+        logger.setLevel(LOG_LEVEL)
+
+    if unknown and loggers:
+        loggers[0].warning("Unknown log level '%s', using DEBUG instead.", unknown)
 
 class WLWLogger(logging.Logger):
     """
     Custom logger class that implements special utility functions.
 
-    Automatically sets the file handler and formatter on __init__.
+    Automatically attaches the shared, queued file handler on __init__.
     """
     def __init__(self, name, level = 0):
         super().__init__(name, level)
 
+        global _unknown_level
+
         self.setLevel(LOG_LEVEL)
-        # self.log_file_handler = logging.FileHandler(f"wlw_{str(time.time()).split('.')[0]}.log", "w")
-        self.log_file_handler = logging.FileHandler("wlw.log", "w")
-        self.log_formatter = logging.Formatter('%(asctime)s:%(threadName)s/%(module)s/[%(levelname)s] - %(message)s')
-        self.log_file_handler.setFormatter(self.log_formatter)
-        self.addHandler(self.log_file_handler)
+        self.addHandler(_get_queue_handler())
+
+        if _unknown_level:
+            self.warning("Unknown WLW_LOG_LEVEL '%s', using DEBUG instead.", _unknown_level)
+            _unknown_level = None
 
 
+    def event(self, event: str, level: int = logging.DEBUG, **fields):
+        """
+        Log a structured record, made up of an event name and fields.
+
+        Nothing is formatted unless `level` is enabled, and even then only once the record is written.
+
+        Args:
+            event (str): The event's name, e.g. "rpc.update".
+            level (int): The level to log at.
+            **fields: The event's fields.
+        """
+        if self.isEnabledFor(level):
+            self.log(level, StructuredMessage(event, fields), stacklevel=2)
+
     def log_blank(self):
         """
         Insert a completely blank line into the log file.
 
-        Should be threadsafe, but use sparingly just in case.
+        Ignores the logger's level.
         """
-        for handler in self.handlers:
-            if isinstance(handler, logging.FileHandler):
-                handler.acquire() # ensure we're still threadsafe
-                try:
-                    handler.stream.write("\n")
-                    handler.flush()
-                finally:
-                    handler.release()
-
+        self.handle(self.makeRecord(self.name, logging.INFO, "", 0, "", (), None, extra={"blank": True}))
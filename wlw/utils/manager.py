@@ -1,18 +1,72 @@
 import pickle
 import os
+import mmap
+import struct
 import logging
 import hashlib
 import time
+import contextlib
 from wlw.utils.character import Character
+from wlw.utils.checkpoint import Checkpoint
+from wlw.utils.rollback import RollbackStack, TrackedDict, ROLLBACK_BUDGET
 from wlw.utils.errors import *
 from wlw.utils.logger import WLWLogger
 from wlw.utils.formatting import FormatType
-from wlw.utils.xor import obfuscate
+from wlw.utils.xor import obfuscate_into
+
+SAVE_MAGIC = b"WLWS"
+SAVE_VERSION = 1
+SAVE_HEADER = struct.Struct("<4sH") # magic, version. followed by the obfuscated, pickled save
 
 logging.setLoggerClass(WLWLogger)
 log = logging.getLogger("WLWLogger")
 log: WLWLogger
 
+class ChangeEvent:
+    """
+    Changes made to the game's state, coalesced.
+
+    Only records what changed, subscribers should read the current values from the Manager.
+    """
+    def __init__(self):
+        self.persistent: set[str] = set() # changed persistent keys
+        self.characters: dict[str, set[str]] = {} # changed attributes, by character name
+        self.section = False # whether the section changed
+        self.progress = False # whether lines, choices or history moved on. only tracked by `Manager.dirty`
+
+    def add(self, target, key):
+        """
+        Add a change.
+
+        Args:
+            target (TrackedDict | Character): What changed.
+            key: The persistent key, or the character's attribute.
+        """
+        if isinstance(target, Character):
+            self.characters.setdefault(target._name, set()).add(key)
+        else:
+            self.persistent.add(key)
+
+    def copy(self) -> "ChangeEvent":
+        """
+        Copy the event, so it can be restored later.
+
+        Returns:
+            ChangeEvent: The copy.
+        """
+        event = ChangeEvent()
+        event.persistent = set(self.persistent)
+        event.characters = {name: set(keys) for name, keys in self.characters.items()}
+        event.section = self.section
+        event.progress = self.progress
+        return event
+
+    def __bool__(self):
+        return bool(self.persistent or self.characters or self.section or self.progress)
+
+    def __repr__(self):
+        return f"<ChangeEvent persistent={sorted(self.persistent)} characters={self.characters} section={self.section} progress={self.progress}>"
+
 class Manager:
     """
     Manager class.
@@ -20,7 +74,12 @@ class Manager:
     Manages import game data, such as characters, persistent data and history, allowing for
     save and load functionality.
     """
-    def __init__(self, save_path: str):
+    def __init__(self, save_path: str, rollback_budget: int = ROLLBACK_BUDGET):
+        """
+        Args:
+            save_path (str): Where to save the game.
+            rollback_budget (int): Roughly how many bytes the rollback journal may take up.
+        """
         self.save_path = save_path
 
         self.__obfuscation_key = save_path
@@ -29,8 +88,17 @@ class Manager:
 
         self.__current_section = {"chapter": None, "section": None}
         self.__characters: list[Character] = [] # game characters
-        self.__persistent: dict = {} # persistent data
+        self.__rollback = RollbackStack(rollback_budget) # in-memory snapshots, for rolling back choices
+        self.__persistent: dict = self.__track({}) # persistent data
         self.__history: list[tuple[FormatType, str]] = [] # history of text
+        self.__checkpoint = Checkpoint(self.__progressed) # position within the current section
+        self.__section_state = None # pickled characters/persistent data, as they were when the section started
+
+        self.__subscribers = [] # called with a ChangeEvent whenever the game's state changes
+        self.__pending = ChangeEvent() # changes made within the current batch
+        self.__batch_depth = 0
+        self.__batch_undo: list[tuple] = [] # (target, key, old value), to undo a failed batch
+        self.__dirty = ChangeEvent() # changes made since the last save or load
 
     @property
     def characters(self):
@@ -71,6 +139,202 @@ class Manager:
     def history(self):
         return self.__history
 
+    @property
+    def checkpoint(self):
+        """
+        The game's position within the current section.
+
+        Returns:
+            Checkpoint: The current checkpoint.
+        """
+        return self.__checkpoint
+
+    @property
+    def rollback(self):
+        """
+        Snapshots taken since the current chapter started, which the game can be rolled back to.
+
+        Returns:
+            RollbackStack: The rollback stack.
+        """
+        return self.__rollback
+
+    @property
+    def dirty(self) -> ChangeEvent:
+        """
+        Everything changed since the game was last saved or loaded, including progress through the current section.
+
+        Empty (falsy) if saving would write nothing new, in which case `save` skips writing.
+
+        Returns:
+            ChangeEvent: The unsaved changes.
+        """
+        return self.__dirty
+
+    def __progressed(self):
+        # called by the checkpoint whenever a line or choice is completed (outside of replays)
+        self.__dirty.progress = True
+
+    def __track(self, persistent: dict) -> TrackedDict:
+        # persistent data reports every change to the rollback journal and subscribers
+        persistent = TrackedDict(persistent)
+        persistent._journal = self._record
+        persistent._notify = self._changed
+        return persistent
+
+    def _record(self, target, key, old):
+        """
+        Journal a change, before it's made, so it can be rolled back.
+
+        Args:
+            target (TrackedDict | Character): What's being changed.
+            key: The persistent key, or the character's attribute.
+            old: Its value before the change.
+        """
+        self.__rollback.record(target, key, old)
+        if self.__batch_depth:
+            self.__batch_undo.append((target, key, old))
+
+    def _changed(self, target, key):
+        """
+        Report a change, once it's been made. Subscribers are notified immediately, or once the current batch ends.
+
+        Args:
+            target (TrackedDict | Character): What changed.
+            key: The persistent key, or the character's attribute.
+        """
+        self.__pending.add(target, key)
+        self.__dirty.add(target, key)
+        if not self.__batch_depth:
+            self.__emit()
+
+    def subscribe(self, callback):
+        """
+        Call `callback` with a `ChangeEvent` whenever characters, persistent data or the section change.
+
+        Callbacks run on whichever thread made the change, usually the chapter thread.
+
+        Args:
+            callback (callable): The subscriber.
+        """
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """
+        Stop calling a subscriber.
+
+        Args:
+            callback (callable): The subscriber.
+        """
+        self.__subscribers.remove(callback)
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Apply several changes at once, notifying subscribers with a single event once every change is made.
+
+        If the block raises, every change made within it is undone and nothing is emitted. Batches can be nested,
+        only the outermost one emits.
+
+        Example:
+            ```python
+            with self.manager.batch():
+                self.emi.affinity += 1
+                self.manager.persistent["nihira_emil_s1-mavrn_defend"] = True
+            ```
+        """
+        self.__batch_depth += 1
+        start = len(self.__batch_undo)
+        dirty = self.__dirty.copy()
+        try:
+            yield self
+        except BaseException:
+            undo, self.__batch_undo[start:] = self.__batch_undo[start:], []
+            for target, key, old in reversed(undo):
+                target._restore(key, old)
+            self.__dirty = dirty # undone changes have nothing left to save
+            if self.__batch_depth == 1: # nothing happened, as far as subscribers know
+                self.__pending = ChangeEvent()
+            raise
+        finally:
+            self.__batch_depth -= 1
+
+        if not self.__batch_depth:
+            self.__batch_undo = []
+            self.__emit()
+
+    def __emit(self):
+        # hand the pending changes to subscribers, as a single event
+        event, self.__pending = self.__pending, ChangeEvent()
+        if not event:
+            return
+
+        for callback in list(self.__subscribers):
+            callback(event)
+
+    def take_frame(self, kind: str = "choice"):
+        """
+        Take a rollback frame at the current position. Renderers call this whenever choices are set.
+
+        Args:
+            kind (str): 'choice', or 'section' for the start of a section.
+        """
+        self.__rollback.push(kind, self.__current_section, self.__checkpoint.dump())
+
+    def begin_rollback(self, chapter_title: str, section_name: str):
+        """
+        Drop every rollback frame, then take one for the section a chapter is starting at.
+
+        Chapters don't call `set_section` for their entrypoint, so this is called instead.
+
+        Args:
+            chapter_title (str): The chapter's title.
+            section_name (str): The section the chapter is starting at.
+        """
+        self.__rollback.clear()
+        self.__rollback.push("section", {"chapter": chapter_title, "section": section_name}, self.__checkpoint.dump())
+
+    @property
+    def can_rewind(self) -> bool:
+        """
+        Whether there is a choice to roll back to.
+        """
+        return self.__rollback.target(len(self.__checkpoint.choices)) is not None
+
+    def rewind(self) -> str | None:
+        """
+        Roll back to the last choice made.
+
+        Characters and persistent data are returned to how they were when the choice's section started,
+        and the checkpoint is restored, so replaying the section stops at the choice.
+
+        The chapter should be stopped before calling this, then restarted from the returned section.
+
+        Returns:
+            str | None: The section to restart, or None if there was nothing to roll back to.
+        """
+        index = self.__rollback.target(len(self.__checkpoint.choices))
+        if index is None:
+            return None
+
+        with self.batch(): # undoing is a change like any other, subscribers get a single event for it
+            section, frame = self.__rollback.rollback(index)
+            self.__current_section = dict(section.section)
+            self.__checkpoint.restore(frame.checkpoint)
+            self.__section_state = self.__dump_state()
+            self.__pending.section = self.__dirty.section = True
+
+        for char in self.__characters:
+            char._reset_speech()
+
+        log.info("Rolled back to '%s' (%s choices in).", section.section["section"], len(frame.checkpoint["choices"]))
+        return section.section["section"]
+
+    def __dump_state(self) -> bytes:
+        return pickle.dumps({
+            "characters": [_ for _ in self.__characters if not _.special],
+            "persistent": self.__persistent})
+
     def set_section(self, chapter_title: str, section_name: str):
         """
         Set the game's position, which will be used to resume upon loading.
@@ -80,6 +344,16 @@ class Manager:
             section_name: The section to jump to.
         """
         self.__current_section = {"chapter": chapter_title, "section": section_name}
+        self.__checkpoint.reset()
+
+        # sections are replayed from their start when resuming from a checkpoint, so anything
+        # they change needs to be saved as it was before the section ran.
+        self.__section_state = self.__dump_state()
+        self.__rollback.push("section", self.__current_section, self.__checkpoint.dump())
+
+        self.__pending.section = self.__dirty.section = True
+        if not self.__batch_depth:
+            self.__emit()
 
     def register_character(self, character: Character):
         """
@@ -93,14 +367,17 @@ class Manager:
         Returns:
             Character: The Character object supplied to this method.
         """
-        log.debug(f"Registering character '{character._name}' (hidden: {character.hidden})...")
+        log.debug("Registering character '%s' (hidden: %s)...", character._name, character.hidden)
         character_match = [_ for _ in self.__characters if _._name == character._name]
 
         if character_match:
-            log.debug(f"Using saved values for '{character._name}', already present.")
+            log.debug("Using saved values for '%s', already present.", character._name)
+            character_match[0]._manager = self
             return character_match[0]
         else:
+            character._manager = self
             self.__characters.append(character)
+            self.__dirty.add(character, "registered")
             return character
 
     def get_character(self, name: str):
@@ -128,6 +405,7 @@ class Manager:
         hid = hashlib.sha256(f"{text}{id(text)}".encode()).hexdigest()
         if not self._in_history(hid):
             self.__history.append({"hid": hid, "thought": thought, "title": title, "text": text})
+            self.__dirty.progress = True
             if len(self.__history) > self.HISTORY_MAX:
                 self.__history = self.history[len(self.__history)-self.HISTORY_MAX:]
 
@@ -150,7 +428,19 @@ class Manager:
         Save game data to the save file.
 
         Special characters are excluded from the save file and are not persistent.
+
+        If a section is in progress, characters and persistent data are saved as they were when it
+        started, alongside the checkpoint needed to replay it.
+
+        Skipped if nothing changed since the game was last saved or loaded, see `dirty`.
+
+        Returns:
+            bool: Whether the save file was written.
         """
+        if not self.__dirty and os.path.exists(self.save_path):
+            log.debug("Nothing changed since the last save, skipping.")
+            return False
+
         save_dir = os.path.dirname(self.save_path)
         log.info("Saving game data...")
         if not os.path.exists(save_dir):
@@ -158,16 +448,28 @@ class Manager:
             os.mkdir(save_dir)
             log.debug(f"Created new save directory at: '{save_dir}'")
 
+        if self.__section_state:
+            state = pickle.loads(self.__section_state)
+        else:
+            state = {"characters": [_ for _ in self.__characters if not _.special], "persistent": self.__persistent}
+
+        save = pickle.dumps({
+            "current_section": self.__current_section,
+            "checkpoint": self.__checkpoint.dump(),
+            "history": self.__history,
+            "characters": state["characters"],
+            "persistent": state["persistent"]})
+
+        data = bytearray(SAVE_HEADER.size + len(save))
+        SAVE_HEADER.pack_into(data, 0, SAVE_MAGIC, SAVE_VERSION)
+        obfuscate_into(self.__obfuscation_key.encode(), save, data, SAVE_HEADER.size)
+
         with open(self.save_path, "wb") as f:
-            save = pickle.dumps({
-                "current_section": self.__current_section,
-                "history": self.__history,
-                "characters": [_ for _ in self.__characters if not _.special],
-                "persistent": self.__persistent})
-            
-            pickle.dump({"!!WLW-SAVE-FILE_DO-NOT-EDIT!!": obfuscate(self.__obfuscation_key.encode(), save)}, f)
+            f.write(data)
+        self.__dirty = ChangeEvent()
 
         log.info(f"Successfully wrote game data to '{self.save_path}'.")
+        return True
 
     def load(self):
         """
@@ -180,21 +482,52 @@ class Manager:
         if not os.path.exists(self.save_path):
             raise FileNotFoundError(f"Save file '{self.save_path}' does not exist.")
 
-        with open(self.save_path, "rb") as f:
-            try:
-                raw = pickle.load(f) # load the save file container and depickle it
-                data = pickle.loads(obfuscate(self.__obfuscation_key.encode(), raw["!!WLW-SAVE-FILE_DO-NOT-EDIT!!"])) # deobfuscate, then reconstruct the save
-            except pickle.UnpicklingError as e:
-                raise BadSaveError("Save file is invalid or corrupt!") from e
-            except UnicodeDecodeError as e: # deobfuscation errors, should hide as much context as possible
-                raise BadSaveError(f"Save file is malformed! ({e})") from None
-
-            try:
-                self.__history = data["history"]
-                self.__characters = data["characters"]
-                self.__persistent = data["persistent"]
-                self.__current_section = data["current_section"]
-            except KeyError as e: # bad keys, user likely changed something or the file is outdated.
-                raise BadSaveError(f"Save data is malformed! ({e})") from None
+        try:
+            data = pickle.loads(self.__read_save())
+        except pickle.UnpicklingError as e:
+            raise BadSaveError("Save file is invalid or corrupt!") from e
+        except (UnicodeDecodeError, ValueError, EOFError, KeyError, TypeError, struct.error) as e: # deobfuscation errors, should hide as much context as possible
+            raise BadSaveError(f"Save file is malformed! ({e})") from None
+
+        try:
+            self.__history = data["history"]
+            self.__characters = data["characters"]
+            self.__persistent = self.__track(data["persistent"])
+            self.__current_section = data["current_section"]
+            self.__checkpoint.restore(data.get("checkpoint", {})) # older saves won't have a checkpoint
+            self.__section_state = None
+            self.__dirty = ChangeEvent()
+        except KeyError as e: # bad keys, user likely changed something or the file is outdated.
+            raise BadSaveError(f"Save data is malformed! ({e})") from None
 
         log.info(f"Successfully read game data from '{self.save_path}'.")
+
+    def __read_save(self) -> bytearray:
+        """
+        Read and deobfuscate the save file.
+
+        The file is memory mapped and deobfuscated into a single buffer, so the only copy of the save held
+        in memory is the one being depickled. Saves from before the current format (a pickled dict holding
+        the obfuscated save) are still read.
+
+        Returns:
+            bytearray: The pickled save.
+        """
+        key = self.__obfuscation_key.encode()
+
+        with open(self.save_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if data[:len(SAVE_MAGIC)] == SAVE_MAGIC:
+                _, version = SAVE_HEADER.unpack_from(data, 0)
+                if version != SAVE_VERSION:
+                    raise BadSaveError(f"Save file uses format version {version}, expected {SAVE_VERSION}.")
+
+                save = bytearray(len(data) - SAVE_HEADER.size)
+                with memoryview(data) as view, view[SAVE_HEADER.size:] as stored:
+                    obfuscate_into(key, stored, save)
+                return save
+
+            # legacy save, the obfuscated save is wrapped in another pickle
+            with memoryview(data) as view:
+                save = bytearray(pickle.loads(view)["!!WLW-SAVE-FILE_DO-NOT-EDIT!!"])
+            obfuscate_into(key, save, save) # in place
+            return save
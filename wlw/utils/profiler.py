@@ -0,0 +1,142 @@
+"""
+Startup profiler for WLW.
+
+Measures how long every module takes to import and how long each startup phase takes, then writes a breakdown
+to a file. Only depends on the standard library, so it can be installed before anything else is imported.
+"""
+import sys
+import time
+import importlib.abc
+
+class _TimedLoader(importlib.abc.Loader):
+    """
+    Wraps a module's loader, timing how long it takes to execute.
+    """
+    def __init__(self, loader, profiler: "StartupProfiler"):
+        self.__loader = loader
+        self.__profiler = profiler
+
+    def create_module(self, spec):
+        return self.__loader.create_module(spec)
+
+    def exec_module(self, module):
+        self.__profiler._enter()
+        start = time.perf_counter()
+        try:
+            self.__loader.exec_module(module)
+        finally:
+            self.__profiler._exit(module.__name__, time.perf_counter() - start)
+
+    def __getattr__(self, name): # e.g. get_source, is_package
+        return getattr(self.__loader, name)
+
+class StartupProfiler(importlib.abc.MetaPathFinder):
+    """
+    StartupProfiler class.
+
+    Installed at the front of `sys.meta_path`, where it times every module imported afterwards.
+    Phases are marked using `mark`, each one lasting until the next.
+    """
+    def __init__(self):
+        self.__start = time.perf_counter()
+        self.__last = self.__start
+        self.__phases: list[tuple[str, float]] = []
+
+        self.__imports: dict[str, tuple[float, float]] = {} # module: (total, self)
+        self.__children: list[float] = [] # time spent importing children, per import in progress
+        self.__finding = False
+
+    def install(self):
+        """
+        Start timing imports.
+        """
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        """
+        Stop timing imports.
+        """
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target = None):
+        if self.__finding:
+            return None
+
+        # let the rest of the finders find it, then wrap whatever they found
+        self.__finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self.__finding = False
+
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _enter(self):
+        self.__children.append(0.0)
+
+    def _exit(self, name: str, elapsed: float):
+        children = self.__children.pop()
+        self.__imports[name] = (elapsed, elapsed - children)
+        if self.__children:
+            self.__children[-1] += elapsed
+
+    def mark(self, phase: str):
+        """
+        End the current phase, naming it `phase`.
+
+        Args:
+            phase (str): What happened during the phase.
+        """
+        now = time.perf_counter()
+        self.__phases.append((phase, now - self.__last))
+        self.__last = now
+
+    @property
+    def elapsed(self) -> float:
+        """
+        How long it has been since the profiler was created, in seconds.
+        """
+        return time.perf_counter() - self.__start
+
+    def report(self, limit: int = 30) -> str:
+        """
+        Create the breakdown.
+
+        Args:
+            limit (int): How many of the slowest imports to include.
+
+        Returns:
+            str: The breakdown, as text.
+        """
+        lines = [f"Startup took {self.elapsed*1000:.1f} ms", "", "Phases:"]
+        for phase, elapsed in self.__phases:
+            lines.append(f"  {elapsed*1000:8.2f} ms  {phase}")
+
+        total_imports = sum(own for _, own in self.__imports.values())
+        lines += ["", f"Imports ({len(self.__imports)} modules, {total_imports*1000:.1f} ms):", f"  {'self':>9}  {'total':>9}  module"]
+        for name, (total, own) in sorted(self.__imports.items(), key=lambda _: _[1][1], reverse=True)[:limit]:
+            lines.append(f"  {own*1000:6.2f} ms  {total*1000:6.2f} ms  {name}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Stop timing imports, then write the breakdown to `path`.
+
+        Args:
+            path (str): Where to write the breakdown.
+        """
+        self.uninstall()
+        with open(path, "w") as f:
+            f.write(self.report())
@@ -4,6 +4,8 @@ import logging
 import textwrap
 from wlw.utils.logger import WLWLogger
 from wlw.utils.battle import Battle
+from wlw.utils.checkpoint import Checkpoint
+from wlw.utils.errors import *
 
 logging.setLoggerClass(WLWLogger)
 log = logging.getLogger("WLWLogger")
@@ -17,8 +19,16 @@ class Renderer:
 
     Additionally, contains several important user-related methods.
     """
-    def __init__(self, stdscr: curses.window):
+    def __init__(self, stdscr: curses.window, checkpoint: Checkpoint = None, on_choices = None):
+        """
+        Args:
+            stdscr (curses.window): The curses window to render to.
+            checkpoint (Checkpoint | None): The Manager's checkpoint, used to log and replay choices.
+            on_choices (callable | None): Called whenever choices are set, before they're shown. Used to take rollback frames.
+        """
         self.stdscr = stdscr
+        self.checkpoint = checkpoint
+        self.on_choices = on_choices
 
         curses.start_color()
         curses.use_default_colors()
@@ -190,32 +200,67 @@ class Renderer:
 
         self.clear_choices()
 
+        if self.on_choices: # taken while replaying too, so frames are the same after a rollback
+            self.on_choices()
+
+        if self.checkpoint and self.checkpoint.replaying: # the choice is already known, don't show it
+            return
+
         self.__choices = choices[::-1]
-        log.debug(f"User choices is now: {self.__choices}")
+        log.event("choices.set", choices=self.__choices)
 
-    def wait_choice(self) -> str:
+    def poll_choice(self) -> str | None:
         """
-        Halt the current thread until a choice has been made, then return that choice.
+        Check whether a choice has been made, without waiting for one.
 
-        Clears the choice menu and screen upon exit.
+        Clears the choice menu and screen once a choice was made.
+
+        If the checkpoint is being replayed, the logged choice is returned immediately instead.
 
         Returns:
-            str: The user's choice.
+            str | None: The user's choice, or None if they haven't chosen yet.
         """
+        if self.checkpoint:
+            out = self.checkpoint.replay_choice()
+            if out is not None:
+                self.clear_choices()
+                return out
 
-        while not self.user_chose:
-            time.sleep(0.1)
+        if not self.user_chose:
+            return None
 
         out = self.user_chose
+        if self.checkpoint:
+            self.checkpoint.mark_choice(out)
 
         self.clear_choices()
         self.stdscr.clear()
 
         return out
 
-    def start_battle(self, battle: Battle):
+    def wait_choice(self) -> str:
         """
-        Set the game's active 'battle', then wait for the battle to conclude.
+        Halt the current thread until a choice has been made, then return that choice.
+
+        Clears the choice menu and screen upon exit.
+
+        If the checkpoint is being replayed, the logged choice is returned immediately instead.
+
+        Returns:
+            str: The user's choice.
+        """
+        while (out := self.poll_choice()) is None:
+            if self.checkpoint and self.checkpoint.interrupted:
+                raise ChapterInterrupt("The chapter was interrupted.")
+            time.sleep(0.1)
+
+        return out
+
+    def begin_battle(self, battle: Battle):
+        """
+        Set the game's active 'battle', without waiting for it to conclude.
+
+        The battle is over once `battle` is None again, with its result in `battle_result`.
 
         Args:
             battle (Battle): The battle instance.
@@ -223,7 +268,18 @@ class Renderer:
         self.__battle = battle
         self.__battle_result = -1
 
+    def start_battle(self, battle: Battle):
+        """
+        Set the game's active 'battle', then wait for the battle to conclude.
+
+        Args:
+            battle (Battle): The battle instance.
+        """
+        self.begin_battle(battle)
+
         while self.__battle_result == -1:
+            if self.checkpoint and self.checkpoint.interrupted:
+                raise ChapterInterrupt("The chapter was interrupted.")
             time.sleep(0.1)
 
         out = self.__battle_result
@@ -0,0 +1,265 @@
+"""
+In-memory rollback for WLW.
+
+Instead of copying the game's state whenever a snapshot is taken, every change to persistent data and character
+affinity is written to an undo journal. A snapshot (frame) is just a position in that journal, so taking one
+costs nothing, and rolling back only has to undo the changes made since.
+"""
+import sys
+import logging
+from wlw.utils.logger import WLWLogger
+
+logging.setLoggerClass(WLWLogger)
+log = logging.getLogger("WLWLogger")
+log: WLWLogger
+
+ROLLBACK_BUDGET = 1 << 20 # bytes of journal to keep, roughly
+_MISSING = object() # old value of keys that didn't exist yet
+
+class TrackedDict(dict):
+    """
+    Dict that reports every change (with the value it replaced) to a journal.
+
+    Pickles as a plain dict, so saves never depend on it.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._journal = None # called with (self, key, old value) before every change
+        self._notify = None # called with (self, key) after every change, including undos
+
+    def __record(self, key):
+        if self._journal:
+            self._journal(self, key, self.get(key, _MISSING))
+
+    def __changed(self, key):
+        if self._notify:
+            self._notify(self, key)
+
+    def __setitem__(self, key, value):
+        self.__record(key)
+        super().__setitem__(key, value)
+        self.__changed(key)
+
+    def __delitem__(self, key):
+        self.__record(key)
+        super().__delitem__(key)
+        self.__changed(key)
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super().pop(key, *default)
+
+        self.__record(key)
+        value = super().pop(key)
+        self.__changed(key)
+        return value
+
+    def popitem(self):
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def clear(self):
+        for key in list(self):
+            del self[key]
+
+    def _restore(self, key, old):
+        # undo a change, without recording it
+        if old is _MISSING:
+            super().pop(key, None)
+        else:
+            super().__setitem__(key, old)
+        self.__changed(key)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+class Frame:
+    """
+    A point the game can be rolled back to.
+    """
+    def __init__(self, kind: str, section: dict, checkpoint: dict, position: int):
+        """
+        Args:
+            kind (str): 'section' for the start of a section, or 'choice' for a choice being offered.
+            section (dict): The Manager's section (chapter and section name).
+            checkpoint (dict): The Manager's dumped checkpoint.
+            position (int): How long the journal was when the frame was taken.
+        """
+        self.kind = kind
+        self.section = section
+        self.checkpoint = checkpoint
+        self.position = position
+
+    def __repr__(self):
+        return f"<Frame {self.kind} {self.section['section']} ({len(self.checkpoint['choices'])} choices, line {self.checkpoint['line']})>"
+
+class RollbackStack:
+    """
+    RollbackStack class.
+
+    Keeps frames taken at the start of every section and at every choice, and the journal needed to return
+    to them. Once the journal outgrows its budget, the oldest sections (and their choices) are dropped, including
+    the current one if it alone is over budget, so the journal never takes up more than the budget.
+
+    Rolling back to a choice undoes everything since its section started, then replays the section up to the
+    choice using the Manager's checkpoint, the same way a save is resumed.
+    """
+    def __init__(self, budget: int = ROLLBACK_BUDGET):
+        """
+        Args:
+            budget (int): Roughly how many bytes the journal may take up.
+        """
+        self.budget = budget
+
+        self.__frames: list[Frame] = []
+        self.__journal: list[tuple] = [] # (target, key, old value)
+        self.__size = 0
+        self.__undoing = False
+
+    @property
+    def frames(self) -> list[Frame]:
+        """
+        Every frame that can still be rolled back to, oldest first.
+        """
+        return self.__frames
+
+    @property
+    def size(self) -> int:
+        """
+        Roughly how many bytes the journal takes up.
+        """
+        return self.__size
+
+    def clear(self):
+        """
+        Drop every frame, e.g. once a new chapter starts.
+        """
+        self.__frames = []
+        self.__journal = []
+        self.__size = 0
+
+    def record(self, target, key, old):
+        """
+        Journal a change, before it's made.
+
+        Args:
+            target (TrackedDict | Character): What changed.
+            key: The key that changed, or the attribute for characters.
+            old: The value it had, or `_MISSING` if it didn't exist.
+        """
+        if self.__undoing or not self.__frames:
+            return
+
+        self.__journal.append((target, key, old))
+        self.__size += 64 + sys.getsizeof(old) # tuple and references, plus the value itself
+
+        while self.__size > self.budget and self.__frames:
+            self.__drop_oldest()
+
+    def push(self, kind: str, section: dict, checkpoint: dict):
+        """
+        Take a frame.
+
+        Entering a section that was just entered (such as when it's restarted after a rollback) doesn't take another.
+        Choices always belong to the newest section, since a chapter's entrypoint never sets the Manager's section.
+
+        Args:
+            kind (str): 'section' or 'choice'.
+            section (dict): The Manager's section.
+            checkpoint (dict): The Manager's dumped checkpoint.
+        """
+        top = self.__frames[-1] if self.__frames else None
+        if kind == "choice" and self.__section_of(len(self.__frames)-1) == -1: # its section was dropped, nothing to replay it from
+            return
+        if kind == "section" and top and top.kind == "section" and top.section == section and top.position == len(self.__journal):
+            return
+
+        if kind == "choice" and (start := self.__section_of(len(self.__frames)-1)) != -1:
+            section = self.__frames[start].section
+        self.__frames.append(Frame(kind, dict(section), checkpoint, len(self.__journal)))
+
+    def target(self, choices_made: int) -> int | None:
+        """
+        Find the frame of the last choice that has already been made.
+
+        Args:
+            choices_made (int): How many choices have been made in the current section.
+
+        Returns:
+            int | None: The frame's index, or None if there is nothing to roll back to.
+        """
+        current = self.__section_of(len(self.__frames)-1)
+        newest = True
+
+        for i in range(len(self.__frames)-1, -1, -1):
+            frame = self.__frames[i]
+            if frame.kind != "choice":
+                continue
+            # the newest choice is still being offered if nothing was chosen since, so skip it
+            if newest and i > current and len(frame.checkpoint["choices"]) == choices_made:
+                newest = False
+                continue
+            newest = False
+            if self.__section_of(i) != -1:
+                return i
+        return None
+
+    def rollback(self, index: int) -> tuple[Frame, Frame]:
+        """
+        Undo every change made since the section of the frame at `index` started, dropping every newer frame.
+
+        Args:
+            index (int): The frame's index, see `target`.
+
+        Returns:
+            tuple[Frame, Frame]: The section's frame (now the newest), and the frame rolled back to.
+        """
+        frame = self.__frames[index]
+        start = self.__section_of(index)
+        section = self.__frames[start]
+
+        self.__undoing = True
+        try:
+            while len(self.__journal) > section.position:
+                target, key, old = self.__journal.pop()
+                self.__size -= 64 + sys.getsizeof(old)
+                target._restore(key, old)
+        finally:
+            self.__undoing = False
+
+        del self.__frames[start+1:]
+        log.debug("Rolled back to %s (via %s).", frame, section)
+        return section, frame
+
+    def __section_of(self, index: int) -> int:
+        # the frame of the section the frame at index is in, -1 if it was dropped
+        for i in range(index, -1, -1):
+            if self.__frames[i].kind == "section":
+                return i
+        return -1
+
+    def __drop_oldest(self):
+        # drop the oldest section, along with its choices, since they can't be rolled back to without it.
+        # if that was the current section, nothing is left to roll back to until the next section starts.
+        dropped = self.__frames.pop(0)
+        while self.__frames and self.__frames[0].kind != "section":
+            self.__frames.pop(0)
+
+        # changes made before the (new) oldest frame are only needed to roll back further
+        cut = self.__frames[0].position if self.__frames else len(self.__journal)
+        for _, _, old in self.__journal[:cut]:
+            self.__size -= 64 + sys.getsizeof(old)
+        del self.__journal[:cut]
+
+        for frame in self.__frames:
+            frame.position -= cut
+        log.debug("Rollback journal over budget, dropped frames up to %s.", dropped)
@@ -0,0 +1,436 @@
+"""
+Declarative chapters for WLW.
+
+Instead of a `start` method calling `speak`/`wait_choice` on a thread, a script chapter describes itself as data:
+a table of characters, and a script made of nodes, split into sections. The script is compiled into a flat node
+table once, then run by `ScriptRunner` a step at a time on the main thread.
+
+Example:
+    ```python
+    class Main(ScriptChapter):
+        CHARACTERS = {
+            "nih": {"name": "Nihira Khimaris", "sex": Sex.FEMALE, "affinity": 0, "hidden": True},
+            "narr": {"name": "Narrator", "special": True}
+        }
+        SCRIPT = {
+            "start": [
+                label("ask"),
+                say("narr", "Who will you choose to follow?", thought=True, lock=True),
+                choice([("Nihira", "female", None), ("... [COMING SOON!]", "male", "ask")], store="player_route"),
+                goto("f_intro")
+            ],
+            "f_intro": [ # sections other than 'start' are saved upon entry, so they can be resumed
+                say("nih", "Arcallis."),
+                pause(0.5),
+                when("player_route", "female", "f_end"),
+                ...
+            ]
+        }
+    ```
+
+Sections and labels share a single namespace, and every section ends the chapter unless it jumps elsewhere.
+"""
+import sys
+import time
+import logging
+from enum import IntEnum
+from wlw.utils.chapter import Chapter
+from wlw.utils.character import Character
+from wlw.utils.errors import ChapterLoadError, SectionNotFoundError
+from wlw.utils.logger import WLWLogger
+
+logging.setLoggerClass(WLWLogger)
+log = logging.getLogger("WLWLogger")
+log: WLWLogger
+
+class Op(IntEnum):
+    """
+    Script node types.
+    """
+    SAY = 0 # who, text, (thought, lock)
+    PAUSE = 1 # seconds
+    CHOICE = 2 # options [(title, id, target)], store
+    JUMP = 3 # target
+    WHEN = 4 # key, value, target
+    STORE = 5 # key, value
+    AFFINITY = 6 # who, amount
+    REVEAL = 7 # who
+    BATTLE = 8 # factory, win target, lose target
+    SECTION = 9 # name
+    END = 10
+    LABEL = 11 # name, only exists before compilation
+
+# node constructors, for writing scripts
+
+def say(who: str, text: str, thought: bool = False, lock: bool = False) -> tuple:
+    """
+    A character speaks `text`, see `Character.speak`.
+    """
+    return (Op.SAY, who, text, (thought, lock))
+
+def pause(seconds: float) -> tuple:
+    """
+    Wait for `seconds`. Skipped while replaying a checkpoint.
+    """
+    return (Op.PAUSE, seconds, None, None)
+
+def choice(options: list[tuple[str, str, str | None]], store: str = None) -> tuple:
+    """
+    Let the player choose between `options`, each a `(title, id, target)` tuple.
+
+    Jumps to the chosen option's target label, or carries on if it's None. The chosen id is written to
+    `persistent[store]`, if set. Any locked characters are unlocked once a choice is made.
+    """
+    return (Op.CHOICE, tuple(tuple(_) for _ in options), store, None)
+
+def label(name: str) -> tuple:
+    """
+    Mark a place in the script that can be jumped to.
+    """
+    return (Op.LABEL, name, None, None)
+
+def goto(target: str) -> tuple:
+    """
+    Jump to a label or section.
+    """
+    return (Op.JUMP, target, None, None)
+
+def when(key: str, value, target: str) -> tuple:
+    """
+    Jump to `target` if `persistent[key]` is `value`.
+    """
+    return (Op.WHEN, key, value, target)
+
+def store(key: str, value) -> tuple:
+    """
+    Set `persistent[key]` to `value`.
+    """
+    return (Op.STORE, key, value, None)
+
+def affinity(who: str, amount: int) -> tuple:
+    """
+    Change a character's affinity by `amount`.
+    """
+    return (Op.AFFINITY, who, amount, None)
+
+def reveal(who: str) -> tuple:
+    """
+    Stop hiding a character's name.
+    """
+    return (Op.REVEAL, who, None, None)
+
+def battle(factory: str, win: str = None, lose: str = None) -> tuple:
+    """
+    Start the battle returned by the chapter's `factory` method, jumping to `win` or `lose` depending on the result.
+    """
+    return (Op.BATTLE, factory, win, lose)
+
+def end() -> tuple:
+    """
+    End the chapter.
+    """
+    return (Op.END, None, None, None)
+
+class NodeTable:
+    """
+    NodeTable class.
+
+    A compiled script: every node in a single list, with labels resolved to indexes and character aliases checked.
+    """
+    def __init__(self, nodes: list[tuple], labels: dict[str, int], sections: list[str]):
+        """
+        Args:
+            nodes (list[tuple]): The compiled nodes, each a `(Op, a, b, c)` tuple.
+            labels (dict[str, int]): Every label and section, and the index it starts at.
+            sections (list[str]): Every section's name.
+        """
+        self.nodes = nodes
+        self.labels = labels
+        self.sections = sections
+
+    def targets(self, index: int) -> list[int]:
+        """
+        Find every node that can run directly after the node at `index`.
+
+        Args:
+            index (int): The node's index.
+
+        Returns:
+            list[int]: The indexes of the following nodes.
+        """
+        op, a, b, c = self.nodes[index]
+        if op == Op.END:
+            return []
+        elif op == Op.JUMP:
+            return [a]
+        elif op == Op.WHEN:
+            return [index+1, c]
+        elif op == Op.CHOICE:
+            return list(dict.fromkeys(index+1 if target is None else target for _, _, target in a))
+        elif op == Op.BATTLE:
+            return list(dict.fromkeys(index+1 if target is None else target for target in (b, c)))
+        return [index+1]
+
+    def reachable(self, section: str = "start") -> set[int]:
+        """
+        Find every node that can be reached from `section`.
+
+        Args:
+            section (str): The section to start from.
+
+        Returns:
+            set[int]: The indexes of every reachable node.
+        """
+        seen = set()
+        pending = [self.labels[section]]
+        while pending:
+            index = pending.pop()
+            if index not in seen:
+                seen.add(index)
+                pending.extend(self.targets(index))
+        return seen
+
+def compile_script(script: dict[str, list[tuple]], characters: dict[str, dict]) -> NodeTable:
+    """
+    Compile a chapter's script into a node table.
+
+    Args:
+        script (dict[str, list[tuple]]): The script, as sections of nodes.
+        characters (dict[str, dict]): The chapter's characters, by alias.
+
+    Returns:
+        NodeTable: The compiled script.
+
+    Raises:
+        ChapterLoadError: The script is invalid, e.g. it jumps to a label that doesn't exist.
+    """
+    if "start" not in script:
+        raise ChapterLoadError("Script does not define a 'start' section.")
+
+    nodes = []
+    labels = {}
+
+    def add_label(name: str):
+        if name in labels:
+            raise ChapterLoadError(f"Label '{name}' is defined more than once.")
+        labels[name] = len(nodes)
+
+    # first pass, flatten sections and find labels
+    for section, section_nodes in script.items():
+        add_label(section)
+        if section != "start": # 'start' is never saved, same as regular chapters
+            nodes.append((Op.SECTION, section, None, None))
+
+        for node in section_nodes:
+            op = Op(node[0])
+            if op == Op.LABEL:
+                add_label(node[1])
+                continue
+            if op in (Op.SAY, Op.AFFINITY, Op.REVEAL) and node[1] not in characters:
+                raise ChapterLoadError(f"Section '{section}' uses unknown character '{node[1]}'.")
+            nodes.append((op, *node[1:]))
+
+        nodes.append((Op.END, None, None, None))
+
+    def resolve(target: str | None) -> int | None:
+        if target is None:
+            return None
+        if target not in labels:
+            raise ChapterLoadError(f"Script jumps to unknown label '{target}'.")
+        return labels[target]
+
+    # second pass, resolve jumps
+    for i, (op, a, b, c) in enumerate(nodes):
+        if op == Op.JUMP:
+            nodes[i] = (op, resolve(a), b, c)
+        elif op == Op.WHEN:
+            nodes[i] = (op, a, b, resolve(c))
+        elif op == Op.CHOICE:
+            nodes[i] = (op, tuple((title, id, resolve(target)) for title, id, target in a), b, c)
+        elif op == Op.BATTLE:
+            nodes[i] = (op, a, resolve(b), resolve(c))
+
+    return NodeTable(nodes, labels, list(script))
+
+class ScriptChapter(Chapter):
+    """
+    Base class for declarative chapters.
+
+    Subclasses only define `CHARACTERS` (keyword arguments for `Character`, by alias) and `SCRIPT` (see the
+    module's docstring). Methods are only needed for battles.
+    """
+    CHARACTERS: dict[str, dict] = {}
+    SCRIPT: dict[str, list[tuple]] = {}
+
+    def __init__(self, manager, renderer):
+        super().__init__(manager, renderer)
+        self.title = getattr(sys.modules.get(type(self).__module__), "CHAPTER_TITLE", self.title)
+
+        self.characters = {alias: self.manager.register_character(Character(**kwargs)) for alias, kwargs in self.CHARACTERS.items()}
+
+    @classmethod
+    def table(cls) -> NodeTable:
+        """
+        The chapter's compiled script. Compiled once per chapter.
+
+        Returns:
+            NodeTable: The compiled script.
+        """
+        if "_table" not in cls.__dict__:
+            cls._table = compile_script(cls.SCRIPT, cls.CHARACTERS)
+        return cls._table
+
+    def runner(self, section: str = "start") -> "ScriptRunner":
+        """
+        Create an interpreter for the chapter, starting at `section`.
+
+        Args:
+            section (str): The section to start at.
+
+        Returns:
+            ScriptRunner: The interpreter.
+
+        Raises:
+            SectionNotFoundError: No such section exists.
+        """
+        if section not in self.table().sections:
+            raise SectionNotFoundError(f"Section '{section}' does not exist within chapter '{self.title}'.")
+        return ScriptRunner(self, section)
+
+    def start(self):
+        """
+        Run the whole script, blocking like a regular chapter. Only for use on a `ChapterThread`.
+        """
+        runner = self.runner()
+        while runner.step():
+            time.sleep(0.01)
+
+class ScriptRunner:
+    """
+    ScriptRunner class.
+
+    Interprets a script chapter's node table. Never blocks, so it can be stepped by the main loop directly,
+    instead of needing a chapter thread.
+    """
+    def __init__(self, chapter: ScriptChapter, section: str = "start"):
+        """
+        Args:
+            chapter (ScriptChapter): The chapter to run.
+            section (str): The section to start at.
+        """
+        self.chapter = chapter
+        self.section = section
+        self.name = f"{type(chapter).__module__}.{section}"
+
+        self.__table = chapter.table()
+        self.__pc = self.__table.labels[section]
+        self.__waiting = None # what the current node is waiting on, if anything
+        self.__finished = False
+
+    @property
+    def finished(self) -> bool:
+        """
+        Whether the chapter has ended.
+        """
+        return self.__finished
+
+    def step(self) -> bool:
+        """
+        Run as many nodes as possible, until one has to wait on the player (or a pause).
+
+        Returns:
+            bool: Whether the chapter is still running.
+        """
+        while not self.__finished:
+            # everything changed in a step reaches subscribers as a single event. sections save, so they're run
+            # outside of the batch, where a failing node can't undo what was already written
+            with self.chapter.manager.batch():
+                while not self.__finished:
+                    if self.__waiting and not self.__resume():
+                        return True
+
+                    node = self.__table.nodes[self.__pc]
+                    if node[0] == Op.SECTION:
+                        break
+                    self.__pc += 1
+                    self.__run(*node)
+
+            if not self.__finished: # stopped at a section
+                node = self.__table.nodes[self.__pc]
+                self.__pc += 1
+                self.__run(*node)
+
+        return False
+
+    def __run(self, op: Op, a, b, c):
+        chapter = self.chapter
+        manager = chapter.manager
+
+        if op == Op.SAY:
+            thought, lock = c
+            char = chapter.characters[a]
+            if char.say(b, thought, lock) and not lock:
+                self.__waiting = (Op.SAY, char)
+        elif op == Op.PAUSE:
+            if not manager.checkpoint.replaying:
+                self.__waiting = (Op.PAUSE, time.monotonic() + a)
+        elif op == Op.CHOICE:
+            chapter.renderer.set_choices([{"title": title, "id": id} for title, id, _ in a])
+            self.__waiting = (Op.CHOICE, a, b)
+        elif op == Op.JUMP:
+            self.__pc = a
+        elif op == Op.WHEN:
+            if manager.persistent.get(a) == b:
+                self.__pc = c
+        elif op == Op.STORE:
+            manager.persistent[a] = b
+        elif op == Op.AFFINITY:
+            chapter.characters[a].affinity += b
+        elif op == Op.REVEAL:
+            chapter.characters[a].hidden = False
+        elif op == Op.BATTLE:
+            chapter.renderer.begin_battle(getattr(chapter, a)())
+            self.__waiting = (Op.BATTLE, b, c)
+        elif op == Op.SECTION:
+            manager.set_section(chapter.title, a)
+            manager.save()
+        elif op == Op.END:
+            self.__finished = True
+
+    def __resume(self) -> bool:
+        # check whether whatever we're waiting on is done, continuing from it if so
+        op, *args = self.__waiting
+        chapter = self.chapter
+
+        if op == Op.SAY:
+            if args[0].speaking:
+                return False
+            chapter.manager.checkpoint.mark_line()
+        elif op == Op.PAUSE:
+            if time.monotonic() < args[0]:
+                return False
+        elif op == Op.CHOICE:
+            chosen = chapter.renderer.poll_choice()
+            if chosen is None:
+                return False
+
+            options, key = args
+            if key:
+                chapter.manager.persistent[key] = chosen
+            for char in chapter.characters.values():
+                if char._is_locked:
+                    char.unlock_speech()
+
+            target = next((target for _, id, target in options if id == chosen), None)
+            if target is not None:
+                self.__pc = target
+        elif op == Op.BATTLE:
+            if chapter.renderer.battle is not None:
+                return False
+
+            target = args[0] if chapter.renderer.battle_result == 1 else args[1]
+            if target is not None:
+                self.__pc = target
+
+        self.__waiting = None
+        return True
@@ -1,7 +1,41 @@
 """
 Xor related functions.
 """
-def obfuscate(key: bytes, data: bytes) -> bytes:
+XOR_CHUNK_SIZE = 1 << 16 # bytes XORed at once, rounded down to a multiple of the key's length
+
+def obfuscate_into(key: bytes, data, out, offset: int = 0) -> int:
+    """
+    (de)Obfuscate data into a preallocated buffer using XOR with the obfuscation key.
+
+    Works on any buffer (bytes, bytearray, mmap, memoryview slices), so large inputs never need to be copied
+    first. Chunks are XORed as big integers, which is much faster than going byte by byte.
+
+    Args:
+    key (bytes): The obfuscation key.
+    data: Buffer holding the data to (de)obfuscate.
+    out: Writable buffer to write the result to, at least `offset + len(data)` bytes long. May be `data` itself.
+    offset (int): Where in `out` to start writing.
+
+    Returns:
+    int: How many bytes were written.
+    """
+    data = memoryview(data).cast("B")
+    out = memoryview(out).cast("B")
+    length = len(data)
+
+    chunk_size = max(XOR_CHUNK_SIZE // len(key), 1) * len(key) # keeps every chunk aligned to the key
+    pad = key * (chunk_size // len(key))
+    pad_int = int.from_bytes(pad, "little")
+
+    for start in range(0, length, chunk_size):
+        end = min(start + chunk_size, length)
+        size = end - start
+        mask = pad_int if size == chunk_size else int.from_bytes(pad[:size], "little")
+        out[offset+start:offset+end] = (int.from_bytes(data[start:end], "little") ^ mask).to_bytes(size, "little")
+
+    return length
+
+def obfuscate(key: bytes, data) -> bytes:
     """
     (de)Obfuscate data using XOR with the obfuscation key.
 
@@ -16,4 +50,6 @@ def obfuscate(key: bytes, data: bytes) -> bytes:
     Returns:
     bytes: (de)Obfuscated data.
     """
-    return bytes([b ^ key[i % len(key)] for i, b in enumerate(data)])
+    out = bytearray(len(data))
+    obfuscate_into(key, data, out)
+    return bytes(out)